@@ -9,7 +9,6 @@ from flask import Flask, request, session, g
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from dotenv import load_dotenv
-from azure.storage.blob import BlobServiceClient
 
 # Import blueprints (unchanged)
 from backend.routes.publish import publish_bp
@@ -50,8 +49,17 @@ from backend.routes.email_change import email_change_bp
 from backend.sockets.recording_events import register_socketio_events
 from backend.routes.recording_studio import recording_studio_bp
 from backend.routes.audio_pipeline import audio_pipeline_bp
+from backend.routes.jobs import jobs_bp
+from backend.sockets.job_events import register_job_events
+from backend.services.jobService import start_embedded_worker
 from backend.utils.scheduler import start_scheduler
 from backend.utils.credit_scheduler import init_credit_scheduler
+from backend.utils.model_registry import preload_models, get_model_metrics
+from backend.utils.ai_cache import get_ai_cache_metrics
+from backend.utils.sfx_generation import get_sfx_store_metrics
+from backend.utils.transcript_store import get_transcript_store_metrics
+from backend.utils.blob_storage import get_blob_metrics
+from backend.services.rss_Service import rss_feed_cache, get_feed_cache_metrics
 from backend.utils import venvupdate
 from backend.services.activateVerificationService import verify_activation_file_exists
 from backend.utils.email_clicks import email_clicks_bp
@@ -114,6 +122,7 @@ def create_app():
     app.register_blueprint(recording_studio_bp)
     app.register_blueprint(publish_bp)
     app.register_blueprint(audio_pipeline_bp)
+    app.register_blueprint(jobs_bp)
     app.register_blueprint(email_change_bp)
     app.register_blueprint(email_clicks_bp, url_prefix='/tracking')
 
@@ -130,12 +139,19 @@ def init_extensions(app):
     global socketio
     socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True, async_mode='eventlet')
     register_socketio_events(socketio)
+    register_job_events(socketio)
 
 
 def initialize_background_jobs(app):
     # Initialize these once per worker carefully
     start_scheduler(app)
     init_credit_scheduler(app)
+    # Only loads models when MODEL_PRELOAD is set; otherwise they load on first use
+    preload_models()
+    # Long AI/audio jobs run in worker processes, outside the eventlet hub
+    start_embedded_worker()
+    # Keeps recently viewed RSS feeds revalidated ahead of their TTL
+    rss_feed_cache.start_refresher()
 
 
 def configure_logging():
@@ -178,6 +194,30 @@ with app.app_context():
 def health():
     return "OK", 200
 
+@app.route("/health/models")
+def health_models():
+    return get_model_metrics(), 200
+
+@app.route("/health/ai_cache")
+def health_ai_cache():
+    return get_ai_cache_metrics(), 200
+
+@app.route("/health/sfx_cache")
+def health_sfx_cache():
+    return get_sfx_store_metrics(), 200
+
+@app.route("/health/transcript_store")
+def health_transcript_store():
+    return get_transcript_store_metrics(), 200
+
+@app.route("/health/blob")
+def health_blob():
+    return get_blob_metrics(), 200
+
+@app.route("/health/feed_cache")
+def health_feed_cache():
+    return get_feed_cache_metrics(), 200
+
 configure_logging()
 init_extensions(app)
 initialize_background_jobs(app)
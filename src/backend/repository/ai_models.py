@@ -1,10 +1,11 @@
 from datetime import datetime
 from bson import ObjectId
-from flask import Response, jsonify
+from flask import jsonify
 import gridfs
 from gridfs.errors import NoFile
 from backend.database.mongo_connection import get_fs, get_db  # ✅ Import get_db
 from backend.repository.episode_repository import EpisodeRepository
+from backend.utils.file_streaming import send_gridfs_file
 
 episode_repo = EpisodeRepository()
 
@@ -27,8 +28,7 @@ def fetch_file(file_id: str):
         if not file_obj:
             return jsonify({"error": "File not found"}), 404
 
-        file_data = file_obj.read()
-        file_type = file_obj.metadata.get("type", "audio")
+        file_type = (file_obj.metadata or {}).get("type", "audio")
         if file_type == "video":
             mimetype = "video/mp4"
         elif file_type == "audio":
@@ -36,11 +36,7 @@ def fetch_file(file_id: str):
         else:
             mimetype = "application/octet-stream"
 
-        return Response(
-            file_data,
-            mimetype=mimetype,
-            headers={"Content-Disposition": f"attachment; filename={file_obj.filename}"}
-        )
+        return send_gridfs_file(file_obj, mimetype=mimetype)
     except gridfs.errors.NoFile:
         return jsonify({"error": "File not found."}), 404
     except Exception as e:
@@ -59,4 +55,15 @@ def get_file_by_id(file_id: str):
         file_obj = fs.get(ObjectId(file_id))
         return file_obj.read(), file_obj.filename
     except NoFile:
-        raise FileNotFoundError("File not found in GridFS.")
\ No newline at end of file
+        raise FileNotFoundError("File not found in GridFS.")
+
+
+def delete_file(file_id: str) -> bool:
+    """
+    Remove a file from GridFS. Returns False if it was already gone.
+    """
+    try:
+        fs.delete(ObjectId(file_id))
+        return True
+    except NoFile:
+        return False
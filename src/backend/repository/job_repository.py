@@ -0,0 +1,112 @@
+import logging
+import uuid
+from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument
+from backend.database.mongo_connection import get_db
+
+logger = logging.getLogger(__name__)
+db = get_db()
+
+
+def ensure_job_indexes():
+    db.Jobs.create_index([("status", ASCENDING), ("createdAt", ASCENDING)])
+    db.Jobs.create_index([("updatedAt", ASCENDING)])
+    db.Jobs.create_index([("userId", ASCENDING), ("createdAt", ASCENDING)])
+
+
+def create_job(user_id, job_type, payload):
+    now = datetime.utcnow()
+    job = {
+        "_id": str(uuid.uuid4()),
+        "userId": user_id,
+        "type": job_type,
+        "payload": payload,
+        "status": "queued",
+        "progress": 0,
+        "message": "Queued",
+        "result": None,
+        "resultFileId": None,
+        "error": None,
+        "attempts": 0,
+        "workerId": None,
+        "createdAt": now,
+        "updatedAt": now,
+        "startedAt": None,
+        "finishedAt": None,
+        "heartbeatAt": None,
+    }
+    db.Jobs.insert_one(job)
+    return job
+
+
+def get_job(job_id):
+    return db.Jobs.find_one({"_id": job_id})
+
+
+def update_job(job_id, updates):
+    updates = dict(updates)
+    updates["updatedAt"] = datetime.utcnow()
+    return db.Jobs.update_one({"_id": job_id}, {"$set": updates})
+
+
+def claim_next_job(worker_id, job_types=None):
+    """Atomically move the oldest queued job to running for this worker."""
+    now = datetime.utcnow()
+    query = {"status": "queued"}
+    if job_types:
+        query["type"] = {"$in": list(job_types)}
+    return db.Jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "workerId": worker_id,
+                "message": "Started",
+                "startedAt": now,
+                "heartbeatAt": now,
+                "updatedAt": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("createdAt", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def heartbeat_jobs(job_ids):
+    if job_ids:
+        db.Jobs.update_many({"_id": {"$in": list(job_ids)}, "status": "running"}, {"$set": {"heartbeatAt": datetime.utcnow()}})
+
+
+def release_running_job(job_id, updates):
+    """Apply updates only if the job is still running (it may have finished meanwhile); returns whether it was."""
+    updates = dict(updates)
+    updates["updatedAt"] = datetime.utcnow()
+    return db.Jobs.update_one({"_id": job_id, "status": "running"}, {"$set": updates}).modified_count == 1
+
+
+def requeue_stale_jobs(stale_before, max_attempts):
+    """Jobs whose worker stopped heart-beating go back to the queue, or fail once out of attempts."""
+    now = datetime.utcnow()
+    stale = {"status": "running", "heartbeatAt": {"$lt": stale_before}}
+    failed = db.Jobs.update_many(
+        dict(stale, attempts={"$gte": max_attempts}),
+        {"$set": {"status": "failed", "error": "Worker stopped responding", "finishedAt": now, "updatedAt": now}},
+    )
+    requeued = db.Jobs.update_many(
+        dict(stale, attempts={"$lt": max_attempts}),
+        {"$set": {"status": "queued", "workerId": None, "message": "Requeued", "updatedAt": now}},
+    )
+    return requeued.modified_count, failed.modified_count
+
+
+def find_jobs_updated_since(since, seen_ids=(), limit=200):
+    """
+    Jobs updated at or after `since`, oldest first. Jobs sharing the boundary
+    timestamp are kept (several can be written in the same millisecond) unless
+    their id is in seen_ids, i.e. already returned at that timestamp.
+    """
+    query = {"updatedAt": {"$gte": since}}
+    if seen_ids:
+        query = {"$or": [{"updatedAt": {"$gt": since}}, {"updatedAt": since, "_id": {"$nin": list(seen_ids)}}]}
+    return list(db.Jobs.find(query).sort([("updatedAt", ASCENDING), ("_id", ASCENDING)]).limit(limit))
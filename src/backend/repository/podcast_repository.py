@@ -1,4 +1,7 @@
+import os
 import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from backend.database.mongo_connection import collection
 from backend.models.podcasts import PodcastSchema
@@ -14,6 +17,32 @@ from backend.repository.episode_repository import (
 
 logger = logging.getLogger(__name__)
 
+# Feed artwork/metadata copied onto podcast documents is refreshed in the background once older than this.
+RSS_REFRESH_MAX_AGE_SECONDS = int(os.getenv("RSS_REFRESH_MAX_AGE_SECONDS", str(6 * 3600)))
+RSS_REFRESH_WORKERS = int(os.getenv("RSS_REFRESH_WORKERS", "4"))
+
+_refresh_lock = threading.Lock()
+_refresh_executor = None
+_refreshing = set()
+_indexes_ready = False
+
+
+def rss_summary_fields(rss_data):
+    """Feed artwork and metadata stored on the podcast document, so reads never touch the feed."""
+    pub_dates = [ep.get("pubDate") for ep in rss_data.get("episodes") or [] if ep.get("pubDate")]
+    return {
+        "rssImage": rss_data.get("imageUrl"),
+        "rssMeta": {
+            "title": rss_data.get("title"),
+            "description": rss_data.get("description"),
+            "language": rss_data.get("language"),
+            "author": rss_data.get("author"),
+            "lastBuildDate": rss_data.get("lastBuildDate"),
+            "episodeCount": len(rss_data.get("episodes") or []),
+            "latestEpisodeDate": max(pub_dates) if pub_dates else None,
+        },
+    }
+
 
 class PodcastRepository:
     def __init__(self):
@@ -21,6 +50,67 @@ class PodcastRepository:
         self.activity_service = ActivityService()  # Add this line
         self.episode_repo = EpisodeRepository()  # Initialize EpisodeRepository
         self.rss_service = RSSService()  # Initialize RSSService instance
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        global _indexes_ready
+        if _indexes_ready:
+            return
+        try:
+            # Listing and detail lookups filter on accountId
+            self.collection.create_index("accountId")
+            _indexes_ready = True
+        except Exception as e:
+            logger.warning(f"Could not create Podcasts indexes: {e}")
+
+    @staticmethod
+    def _rss_is_stale(podcast_doc):
+        checked_at = podcast_doc.get("rssCheckedAt")
+        if not checked_at:
+            return True
+        if checked_at.tzinfo is None:
+            checked_at = checked_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - checked_at).total_seconds() > RSS_REFRESH_MAX_AGE_SECONDS
+
+    def refresh_rss_fields(self, podcast_id, rss_url):
+        """Fetch the feed (through the feed cache) and store its artwork and metadata on the podcast."""
+        update = {"rssCheckedAt": datetime.now(timezone.utc)}
+        try:
+            rss_data, status_code = self.rss_service.fetch_rss_feed(rss_url)
+            if status_code == 200 and rss_data:
+                update.update(rss_summary_fields(rss_data))
+                update["rssError"] = None
+            else:
+                update["rssError"] = (rss_data or {}).get("error") or f"HTTP {status_code}"
+        except Exception as e:
+            update["rssError"] = str(e)
+        try:
+            self.collection.update_one({"_id": podcast_id, "rssFeed": rss_url}, {"$set": update})
+            logger.info(f"Refreshed RSS fields for podcast {podcast_id} (image: {update.get('rssImage')})")
+        except Exception as e:
+            logger.error(f"Failed to store RSS fields for podcast {podcast_id}: {e}", exc_info=True)
+
+    def _run_rss_refresh(self, podcast_id, rss_url):
+        try:
+            self.refresh_rss_fields(podcast_id, rss_url)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(podcast_id)
+
+    def _schedule_rss_refresh(self, podcast_doc, force=False):
+        """Queue a background refresh of the denormalized feed fields when they are missing or stale."""
+        global _refresh_executor
+        rss_url = podcast_doc.get("rssFeed")
+        if not rss_url or not (force or self._rss_is_stale(podcast_doc)):
+            return
+        podcast_id = str(podcast_doc["_id"])
+        with _refresh_lock:
+            if podcast_id in _refreshing:
+                return
+            _refreshing.add(podcast_id)
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(max_workers=RSS_REFRESH_WORKERS, thread_name_prefix="rss-refresh")
+        _refresh_executor.submit(self._run_rss_refresh, podcast_id, rss_url)
 
     @staticmethod
     def get_podcasts_by_user_id(user_id):
@@ -102,6 +192,9 @@ class PodcastRepository:
             # Insert into database
             result = self.collection.insert_one(podcast_item)  # self.collection is Podcasts
             if result.inserted_id:
+                # Fill in feed artwork/metadata without holding up the response
+                self._schedule_rss_refresh(podcast_item)
+
                 # --- Add activity log for podcast creation using ActivityService ---
                 try:
                     self.activity_service.log_activity(
@@ -171,22 +264,9 @@ class PodcastRepository:
                 
                 logger.debug(f"Processing podcast for dropdown: _id={podcast_doc['_id']}, podName='{podcast_doc['podName']}'")
 
-                # Set image URL from RSS feed if available
-                if podcast_doc.get("rssFeed"):
-                    try:
-                        # Ensure self.rss_service is initialized if you use it here
-                        # For now, assuming it's available or this logic is adapted
-                        rss_data, status_code = self.rss_service.fetch_rss_feed(podcast_doc["rssFeed"])
-                        if status_code == 200 and rss_data and rss_data.get("imageUrl"):
-                            # Update the podcast in the database with the RSS image URL
-                            self.collection.update_one(
-                                {"_id": podcast_doc["_id"]},
-                                {"$set": {"rssImage": rss_data["imageUrl"]}}
-                            )
-                            podcast_doc["rssImage"] = rss_data["imageUrl"]
-                            logger.info(f"Updated podcast {podcast_doc['_id']} with RSS image URL: {rss_data['imageUrl']}")
-                    except Exception as e:
-                        logger.error(f"Failed to fetch RSS data for podcast {podcast_doc['_id']} during get_podcasts: {e}", exc_info=True)
+                # Feed artwork (rssImage) is stored on the document; refresh it in the background when stale
+                self._schedule_rss_refresh(podcast_doc)
+
                 # Ensure logoUrl is set (for frontend image display)
                 if not podcast_doc.get("logoUrl") and podcast_doc.get("imageUrl"): # Check imageUrl from RSS or other sources
                     podcast_doc["logoUrl"] = podcast_doc["imageUrl"]
@@ -225,17 +305,11 @@ class PodcastRepository:
 
             podcast["_id"] = str(podcast["_id"])
             
-            # Set image URL from RSS feed if available
-            if podcast.get("rssFeed"):
-                try:
-                    rss_data, status_code = self.rss_service.fetch_rss_feed(podcast["rssFeed"])
-                    if status_code == 200 and rss_data and rss_data.get("imageUrl"):
-                        # Use the RSS image URL directly
-                        podcast["imageUrl"] = rss_data["imageUrl"]
-                        logger.info(f"Using RSS image URL for podcast {podcast_id}: {rss_data['imageUrl']}")
-                except Exception as e:
-                    logger.error(f"Failed to fetch RSS data for podcast {podcast_id}: {e}")
-            
+            # Use the stored RSS image URL; refresh it in the background when stale
+            if podcast.get("rssImage"):
+                podcast["imageUrl"] = podcast["rssImage"]
+            self._schedule_rss_refresh(podcast)
+
             # Ensure logoUrl is set (for frontend image display)
             if not podcast.get("logoUrl") and podcast.get("imageUrl"):
                 podcast["logoUrl"] = podcast["imageUrl"]
@@ -340,6 +414,8 @@ class PodcastRepository:
             result = self.collection.update_one(
                 {"_id": podcast_id}, {"$set": update_data}
             )
+            if update_data.get("rssFeed") and update_data["rssFeed"] != podcast.get("rssFeed"):
+                self._schedule_rss_refresh({**podcast, **update_data}, force=True)
 
             if result.modified_count == 1:
                 return {"message": "Podcast updated successfully"}, 200
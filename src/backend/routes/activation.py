@@ -7,8 +7,7 @@ import logging
 import random
 from io import BytesIO
 from backend.utils.email_utils import send_email
-from backend.utils.blob_storage import upload_file_to_blob
-from azure.storage.blob import BlobServiceClient
+from backend.utils.blob_storage import upload_file_to_blob, get_blob_content
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,27 +21,6 @@ BLOB_CONTAINER = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "podmanagerfiles")
 SCRAPED_XML_BLOB_PATH = "activate/scraped.xml"
 ACTIVATED_JSON_BLOB_PATH = "activate/activated_emails.json"
 
-def get_blob_content(container_name, blob_path):
-    """Read a blob directly from Azure Blob Storage without downloading to a file"""
-    try:
-        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-        if not connection_string:
-            logger.error("AZURE_STORAGE_CONNECTION_STRING environment variable not set.")
-            return None
-            
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-        
-        # Download blob content directly to memory
-        download_stream = blob_client.download_blob()
-        content = download_stream.readall()
-        
-        logger.info(f"Successfully read blob: {blob_path}")
-        return content
-    except Exception as e:
-        logger.error(f"Error reading blob {blob_path}: {e}", exc_info=True)
-        return None
-
 def load_activated_emails():
     """Load the activated emails tracking JSON from blob storage"""
     try:
@@ -105,7 +83,7 @@ def get_podcast_logo_from_rss(rss_url):
             
         from backend.services.rss_Service import RSSService
         rss_service = RSSService()
-        rss_data, status = rss_service.fetch_rss_feed(rss_url)
+        rss_data, status = rss_service.fetch_rss_feed(rss_url, cache=False)
         
         if status == 200 and rss_data and rss_data.get("imageUrl"):
             logo_url = rss_data.get("imageUrl")
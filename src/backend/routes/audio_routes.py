@@ -2,14 +2,17 @@
 import logging
 import requests
 import json
-from flask import Blueprint, request, jsonify, g, Response,session
+from flask import Blueprint, request, jsonify, g, session
 
 from backend.services.audioService import AudioService
 from backend.services.subscriptionService import SubscriptionService
 from backend.services.creditService import consume_credits
+from backend.services.jobService import async_requested, submit_job, submit_upload_job, job_accepted_response
 from backend.utils.blob_storage import upload_file_to_blob  
 from backend.utils.subscription_access import get_max_duration_limit
-from backend.utils.ai_utils import check_audio_duration,insufficient_credits_response
+from backend.utils.ai_utils import insufficient_credits_response
+from backend.utils.upload_ingest import ingest_upload
+from backend.utils.file_streaming import proxy_stream
 from backend.repository.edit_repository import create_edit_entry
 from backend.repository.episode_repository import EpisodeRepository
 
@@ -26,7 +29,6 @@ def audio_enhancement():
     audio_file = request.files["audio"]
     episode_id = request.form["episode_id"]
     filename = audio_file.filename
-    audio_bytes = audio_file.read()
 
     try:
         user_id = g.user_id
@@ -40,10 +42,17 @@ def audio_enhancement():
         plan = subscription.get("plan", "FREE")
         max_duration = get_max_duration_limit(plan)
 
-        check_audio_duration(audio_bytes, max_duration_seconds=max_duration)
-        logger.info("Audio duration validated for enhancement")
-
-        blob_url = audio_service.enhance_audio(audio_bytes, filename, episode_id)
+        # ffmpeg reads the local copy; with keep_original=true the upload is also kept in Blob, streamed as
+        # staged blocks that are only committed once the duration check has passed
+        ingest_target = {}
+        if request.form.get("keep_original", "").lower() in ("true", "1", "yes"):
+            podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
+            ingest_target = dict(target="blob", container="podmanagerfiles",
+                                 blob_path=f"users/{user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/original_{filename}")
+        with ingest_upload(audio_file, filename, keep_local=True, max_duration=max_duration, **ingest_target) as upload:
+            logger.info("Audio duration validated for enhancement")
+            blob_url = audio_service.enhance_audio(None, filename, episode_id,
+                                                   audio_path=upload.path, source_url=upload.url)
         return jsonify({"enhanced_audio_url": blob_url,
                         "clipUrl": blob_url})
     
@@ -61,12 +70,8 @@ def get_enhanced_audio():
         return jsonify({"error": "Missing URL"}), 400
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
         content_type = "audio/mpeg" if url.lower().endswith(".mp3") else "audio/wav"
-
-        return Response(response.content, content_type=content_type)
+        return proxy_stream(url, mimetype=content_type)
     except Exception as e:
         logger.error(f"Error fetching enhanced audio from blob: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -115,10 +120,14 @@ def isolate_voice():
     audio_file = request.files["audio"]
     episode_id = request.form["episode_id"]
     filename = audio_file.filename
-    audio_bytes = audio_file.read()
 
     try:
-        blob_url = audio_service.isolate_voice(audio_bytes, filename, episode_id)
+        if async_requested():
+            job = submit_upload_job(user_id, "voice_isolation", audio_file, filename, episode_id=episode_id)
+            return job_accepted_response(job)
+
+        with ingest_upload(audio_file, filename, keep_local=True, probe=False) as upload:
+            blob_url = audio_service.isolate_voice(None, filename, episode_id, audio_path=upload.path)
         return jsonify({"isolated_blob_url": blob_url})  
     except Exception as e:
         logger.error(f"Error during voice isolation: {str(e)}")
@@ -132,8 +141,7 @@ def get_isolated_audio():
         return jsonify({"error": "Missing URL"}), 400
     
     try:
-        response = requests.get(url)
-        return Response(response.content, content_type="audio/wav")
+        return proxy_stream(url, mimetype="audio/wav")
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -216,6 +224,9 @@ def ai_cut_audio():
         except ValueError as e:
             return insufficient_credits_response("ai_audio_cutting", e)
 
+        if async_requested():
+            return job_accepted_response(submit_job(g.user_id, "ai_cut", {"file_id": file_id, "episode_id": episode_id}))
+
         result = audio_service.ai_cut_audio_from_id(file_id, episode_id=episode_id)
         return jsonify(result)
 
@@ -285,11 +296,8 @@ def get_clipped_audio():
         return jsonify({"error": "Missing URL"}), 400
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
         content_type = "audio/mpeg" if url.lower().endswith(".mp3") else "audio/wav"
-        return Response(response.content, content_type=content_type)
+        return proxy_stream(url, mimetype=content_type)
     except Exception as e:
         logger.error(f"Error fetching clipped audio from blob: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -308,9 +316,13 @@ def ai_cut_from_blob():
         audio_file = request.files["audio"]
         episode_id = request.form["episode_id"]
         filename = audio_file.filename
-        audio_bytes = audio_file.read()
 
-        result = audio_service.ai_cut_audio(audio_bytes, filename, episode_id)
+        if async_requested():
+            job = submit_upload_job(g.user_id, "ai_cut", audio_file, filename, episode_id=episode_id)
+            return job_accepted_response(job)
+
+        with ingest_upload(audio_file, filename, keep_local=True, probe=False) as upload:
+            result = audio_service.ai_cut_audio(None, filename, episode_id, audio_path=upload.path)
         return jsonify(result)
     except Exception as e:
         logger.error(f"AI cut from blob failed: {str(e)}")
@@ -342,11 +354,8 @@ def get_cleaned_audio():
         return jsonify({"error": "Missing URL"}), 400
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-
         content_type = "audio/mpeg" if url.lower().endswith(".mp3") else "audio/wav"
-        return Response(response.content, content_type=content_type)
+        return proxy_stream(url, mimetype=content_type)
     except Exception as e:
         logger.error(f"Error fetching cleaned audio from blob: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -356,10 +365,16 @@ def plan_and_mix_sfx():
     if "audio" not in request.files:
         return jsonify({"error": "Missing audio file"}), 400
 
-    audio_bytes = request.files["audio"].read()
+    audio_file = request.files["audio"]
 
     try:
-        data = audio_service.plan_and_mix_sfx(audio_bytes)
+        if async_requested():
+            job = submit_upload_job(g.user_id, "plan_and_mix_sfx", audio_file, audio_file.filename or "sfx_input.wav")
+            return job_accepted_response(job)
+
+        # Planning and mixing work on the whole clip in memory (pydub segments and the mixed
+        # WAV), so there is nothing to gain from a disk copy here
+        data = audio_service.plan_and_mix_sfx(audio_file.read())
         return jsonify(data)
     except Exception as e:
         logger.error(f"Error generating SFX plan & mix: {e}", exc_info=True)
@@ -367,9 +382,6 @@ def plan_and_mix_sfx():
     
 @audio_bp.route("/proxy_audio")
 def proxy_audio():
-    from flask import request, Response
-    import requests
-
     url = request.args.get("url")
     logger.info(f"🛰️ Proxy fetching: {url}")
 
@@ -377,15 +389,11 @@ def proxy_audio():
         return jsonify({"error": "Missing 'url' query param"}), 400
 
     try:
-        r = requests.get(url, stream=True, timeout=10)
-        if r.status_code != 200:
-            logger.warning(f"❌ Upstream fetch failed with status {r.status_code}")
-            return jsonify({"error": f"Upstream fetch failed: {r.status_code}"}), r.status_code
-
-        return Response(
-            r.iter_content(chunk_size=4096),
-            content_type=r.headers.get("Content-Type", "audio/mpeg"),
-        )
+        return proxy_stream(url, default_mimetype="audio/mpeg")
+    except requests.HTTPError as e:
+        status = e.response.status_code
+        logger.warning(f"❌ Upstream fetch failed with status {status}")
+        return jsonify({"error": f"Upstream fetch failed: {status}"}), status
     except Exception as e:
         logger.error(f"❌ Failed to proxy fetch: {e}")
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,25 @@
+# jobs.py
+import logging
+from flask import Blueprint, jsonify, g
+
+from backend.repository.job_repository import get_job
+from backend.services.jobService import serialize_job
+
+logger = logging.getLogger(__name__)
+jobs_bp = Blueprint("jobs_bp", __name__)
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    if not g.user_id:
+        return jsonify({"error": "Authentication required"}), 401
+
+    job = get_job(job_id)
+    if not job or job.get("userId") != g.user_id:
+        return jsonify({"error": "Job not found"}), 404
+
+    try:
+        return jsonify(serialize_job(job))
+    except Exception as e:
+        logger.error(f"Error reading job {job_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
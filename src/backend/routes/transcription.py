@@ -3,15 +3,7 @@ import os
 import base64
 import logging
 import base64
-import subprocess
-from datetime import datetime
 from flask import Blueprint, request, jsonify, render_template, session,Response, g
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
-import soundfile as sf
-import tempfile
 import requests
 from elevenlabs.client import ElevenLabs
 from backend.database.mongo_connection import get_fs, get_db
@@ -19,11 +11,14 @@ from backend.services.transcriptionService import TranscriptionService
 from backend.services.subscriptionService import SubscriptionService
 from backend.services.audioService import AudioService
 from backend.services.videoService import VideoService
+from backend.services.waveformService import WaveformService
 from backend.services.creditService import consume_credits
-from backend.repository.edit_repository import save_transcription_edit
-from backend.repository.ai_models import fetch_file, save_file, get_file_by_id
+from backend.services.jobService import async_requested, submit_job, job_accepted_response
+from backend.services.jobHandlers import transcribe_and_save
+from backend.repository.ai_models import fetch_file, save_file, get_file_by_id, delete_file
 from backend.utils.subscription_access import get_max_duration_limit
-from backend.utils.ai_utils import get_osint_info, create_podcast_scripts_paid, text_to_speech_with_elevenlabs,check_audio_duration
+from backend.utils.ai_utils import get_osint_info, create_podcast_scripts_paid, text_to_speech_with_elevenlabs
+from backend.utils.upload_ingest import ingest_upload
 
 
 transcription_bp = Blueprint("transcription", __name__)
@@ -36,6 +31,7 @@ client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
 transcription_service = TranscriptionService()
 audio_service = AudioService()
 video_service = VideoService()
+waveform_service = WaveformService()
 subscription_service = SubscriptionService()
 
 @transcription_bp.route("/transcribe", methods=["POST"])
@@ -45,9 +41,7 @@ def transcribe():
 
     file = request.files["file"]
     filename = file.filename
-    file_ext = os.path.splitext(filename)[-1].lower()
-    is_video = file_ext in ["mp4", "mov", "avi", "mkv", "webm"]
-    
+
     try:
         user_id = session.get("user_id")
 
@@ -62,23 +56,6 @@ def transcribe():
                 "redirect": "/store"
             }), 403
 
-        # Extract audio if needed
-        if is_video:
-            temp_video_path = f"/tmp/{filename}"
-            temp_audio_path = temp_video_path.replace(file_ext, ".wav")
-
-            file.save(temp_video_path)
-            subprocess.run(
-                f'ffmpeg -i "{temp_video_path}" -ac 1 -ar 16000 "{temp_audio_path}" -y',
-                shell=True, check=True
-            )
-            with open(temp_audio_path, "rb") as f:
-                audio_bytes = f.read()
-            os.remove(temp_video_path)
-            os.remove(temp_audio_path)
-        else:
-            audio_bytes = file.read()
-
         # Subscribe plan and duration validation
         subscription = subscription_service.get_user_subscription(user_id)
         subscription_plan = subscription["plan"] if subscription else "FREE"
@@ -87,30 +64,29 @@ def transcribe():
         max_duration = get_max_duration_limit(subscription_plan)
         logger.info(f"Max transcription duration allowed: {max_duration} seconds")
 
-        # Check audio duration
-        logger.info("Checking uploaded audio duration...")
-        check_audio_duration(audio_bytes, max_duration_seconds=max_duration)
-        logger.info("Audio duration is within the allowed limit.")
-
-        # Transcription process
-        logger.info(f"Starting transcription for file: {filename}")
-        result = transcription_service.transcribe_audio(audio_bytes, filename)
-        logger.info("Transcription completed successfully.")
-
-        # Save as transcription edit
         episode_id = request.form.get("episode_id") or request.args.get("episode_id")
-        transcription_text = result["full_transcript"]
-        sentiment_result = transcription_service.get_sentiment_and_sfx(transcription_text)
-
-        save_transcription_edit(
-            user_id=user_id,
-            episode_id=episode_id,
-            transcript_text=transcription_text,
-            raw_transcript=result["raw_transcription"],
-            sentiment=sentiment_result["emotions"],
-            emotion=sentiment_result["emotions"],
-            filename=filename
-        )
+        run_async = async_requested()
+
+        # Stream the upload into GridFS and a local file, probing format and duration on the way
+        # (an oversized upload is rejected before it is committed). Transcription decodes from the
+        # local file, so the upload is never held in memory.
+        metadata = {"type": "job_input", "job_type": "transcribe"} if run_async else {"type": "transcription"}
+        with ingest_upload(file, filename, target="gridfs", metadata=metadata, keep_local=True,
+                           max_duration=max_duration) as upload:
+            logger.info("Audio duration is within the allowed limit.")
+            try:
+                if run_async:
+                    # The job reads the stored upload and removes it when it ends
+                    job = submit_job(user_id, "transcribe",
+                                     {"input_file_id": upload.file_id, "filename": filename, "episode_id": episode_id})
+                    return job_accepted_response(job)
+
+                # Transcription process (video audio is extracted by the decoder), saved as a transcription edit
+                result = transcribe_and_save(user_id, episode_id, None, filename,
+                                             audio_path=upload.path, file_id=upload.file_id)
+            except Exception:
+                delete_file(upload.file_id)
+                raise
         return jsonify(result)
 
     except ValueError as e:
@@ -282,81 +258,35 @@ def ai_cut_audio():
 # get audio info
 @transcription_bp.route("/get_audio_info", methods=["POST"])
 def get_audio_info():
-    """Generate waveform and get duration of uploaded audio file, now using MongoDB GridFS."""
+    """Store the uploaded audio, compute its waveform peaks and return the duration."""
 
     if "audio" not in request.files:
         logger.error("ERROR: No audio file provided")
         return jsonify({"error": "No audio file provided"}), 400
 
     try:
-        # Retrieve the uploaded file
+        # Stream the upload into GridFS, keeping one local copy on disk for the peaks pass
         audio_file = request.files["audio"]
         filename = audio_file.filename
-
-        # Save the original file to MongoDB
-        file_id = fs.put(
-            audio_file.read(),
-            filename=filename,
-            metadata={
-                "upload_timestamp": datetime.utcnow(),
-                "type": "transcription",
-            },  # Add type
-        )
-
-        # Retrieve the file from GridFS for processing
-        file_data = fs.get(file_id).read()
-        logger.info(f"Retrieved original file from GridFS with ID: {file_id}")
-
-        # Save to a temporary file for analysis
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            temp_file.write(file_data)
-            temp_file_path = temp_file.name
-        logger.info(f"Temporary file created at: {temp_file_path}")
-
-        # Load audio using SoundFile
-        data, sample_rate = sf.read(temp_file_path)
-
-        # Check if the audio is empty
-        if data is None or len(data) == 0:
-            logger.error("ERROR: Loaded audio is empty")
-            return jsonify({"error": "Loaded audio is empty"}), 500
-
-        duration = len(data) / sample_rate
-        logger.info(f"Audio duration: {duration} seconds")
-
-        # Generate waveform image
-        waveform_filename = f"waveform_{filename}"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as wf_temp:
-            waveform_path = wf_temp.name
-
-        fig, ax = plt.subplots(figsize=(10, 3))
-        time_axis = np.linspace(0, duration, num=len(data))
-        ax.plot(time_axis, data, color="blue")
-        ax.set_xlabel("Time (seconds)")
-        ax.set_ylabel("Amplitude")
-        plt.savefig(waveform_path)
-        plt.close(fig)
-
-        # Save waveform to MongoDB GridFS with upload_timestamp
-        with open(waveform_path, "rb") as wf:
-            waveform_file_id = fs.put(
-                wf.read(),
-                filename=waveform_filename,
-                metadata={
-                    "upload_timestamp": datetime.utcnow(),
-                    "type": "transcription",
-                },  # Add type
-            )
-        logger.info(f"Waveform saved to MongoDB GridFS with ID: {waveform_file_id}")
-        # Cleanup temp files
-        os.remove(temp_file_path)
-        os.remove(waveform_path)
+        with ingest_upload(audio_file, filename, target="gridfs", keep_local=True,
+                           metadata={"type": "transcription"}) as upload:
+            file_id = upload.file_id
+
+            # Min/max peaks at several zoom levels, computed in one streaming pass
+            try:
+                waveform = waveform_service.create_waveform(None, filename, audio_file_id=str(file_id),
+                                                            audio_path=upload.path)
+            except ValueError as e:
+                logger.error(f"ERROR: {e}")
+                return jsonify({"error": str(e)}), 500
+        logger.info(f"Audio duration: {waveform['duration']} seconds")
 
         return jsonify(
             {
-                "duration": duration,
+                "duration": waveform["duration"],
                 "audio_file_id": str(file_id),  # Send correct file ID for actual audio
-                "waveform": str(waveform_file_id),  # Send waveform file ID
+                "waveform": waveform["waveform_file_id"],  # Peaks file ID, served by /get_waveform
+                "waveform_levels": waveform["levels"],
             }
         )
     except Exception as e:
@@ -364,6 +294,33 @@ def get_audio_info():
         return jsonify({"error": f"Failed to process audio: {str(e)}"}), 500
 
 
+@transcription_bp.route("/get_waveform/<waveform_id>", methods=["GET"])
+def get_waveform(waveform_id):
+    """
+    One zoom level of stored waveform peaks.
+    ?samples_per_pixel=N or ?pixels=WIDTH picks the level; ?format=dat returns
+    audiowaveform binary instead of JSON.
+    """
+    try:
+        fmt = request.args.get("format", "json")
+        result = waveform_service.get_level(
+            waveform_id,
+            samples_per_pixel=request.args.get("samples_per_pixel", type=int),
+            pixels=request.args.get("pixels", type=int),
+            fmt=fmt,
+        )
+        if fmt == "dat":
+            response = Response(result, content_type="application/octet-stream")
+        else:
+            response = jsonify(result)
+        # Peaks for a stored file never change
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
+    except Exception as e:
+        logger.error(f"ERROR: Failed to load waveform {waveform_id} - {str(e)}")
+        return jsonify({"error": f"Failed to load waveform: {str(e)}"}), 404
+
+
 @transcription_bp.route("/ai_edits_index", methods=["GET"])
 def render_ai_edits_index():
     episode_id = request.args.get("episodeId")
@@ -1,6 +1,6 @@
 # video_routes.py
 import logging
-from flask import Blueprint, request, jsonify, Response, g
+from flask import Blueprint, request, jsonify, g
 
 from bson import ObjectId
 import gridfs
@@ -9,6 +9,8 @@ from backend.services.videoService import VideoService
 from backend.repository.ai_models import get_file_data  # if you use it elsewhere
 from backend.database.mongo_connection import get_fs
 from backend.services.creditService import consume_credits
+from backend.services.jobService import async_requested, submit_job, job_accepted_response
+from backend.utils.file_streaming import send_gridfs_file
 
 
 fs = get_fs()
@@ -23,11 +25,10 @@ def ai_videoedit():
         return jsonify({"error": "No video file provided"}), 400
 
     video_file = request.files["video"]
-    video_bytes = video_file.read()
     filename = video_file.filename
 
     try:
-        video_id = video_service.upload_video(video_bytes, filename)
+        video_id = video_service.upload_video(video_file, filename)
         return jsonify({"message": "Video uploaded", "video_id": video_id})
     except Exception as e:
         logger.error(f"Error uploading video: {str(e)}")
@@ -51,6 +52,9 @@ def ai_videoenhance():
                 "redirect": "/store"
             }), 403
 
+        if async_requested():
+            return job_accepted_response(submit_job(g.user_id, "video_enhance", {"video_id": video_id}))
+
         processed_id = video_service.enhance_video(video_id)
         return jsonify({"processed_video_id": processed_id})
     except Exception as e:
@@ -99,14 +103,7 @@ def get_video(file_id: str):
         if not file_obj:
             return jsonify({"error": "File not found"}), 404
 
-        file_data = file_obj.read()
-        return Response(
-            file_data,
-            mimetype="video/mp4",
-            headers={
-                "Content-Disposition": f"attachment; filename={file_obj.filename}"
-            },
-        )
+        return send_gridfs_file(file_obj, mimetype="video/mp4")
     except gridfs.errors.NoFile:
         return jsonify({"error": "File not found."}), 404
     except Exception as e:
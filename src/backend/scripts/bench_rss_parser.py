@@ -0,0 +1,143 @@
+"""
+Benchmark: the legacy feedparser + ElementTree parse of parse_rss_data vs.
+rss_parser.parse_feed on a generated podcast feed (5,000 items by default).
+
+One item in ten has only a media:content element and no <enclosure>, which is
+what sent the legacy code into its per-entry scan over every <item>. The legacy
+baseline needs feedparser and bs4; it is skipped if they are not installed.
+
+Usage:
+    python src/backend/scripts/bench_rss_parser.py [items]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+# Adjust path to import from sibling directories
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
+sys.path.append(os.path.join(project_root, "src"))
+
+from backend.utils.rss_parser import parse_feed  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+logging.getLogger("backend.utils.rss_parser").setLevel(logging.WARNING)
+
+
+def synthetic_feed(items: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" '
+        'xmlns:media="http://search.yahoo.com/mrss/">',
+        "<channel><title>Benchmark Show</title><link>https://example.com</link>",
+        "<description><![CDATA[<p>A <b>generated</b> show &amp; feed</p>]]></description>",
+        "<language>en</language><itunes:author>Bench Host</itunes:author>",
+        "<itunes:owner><itunes:name>Bench Host</itunes:name><itunes:email>host@example.com</itunes:email></itunes:owner>",
+        '<itunes:image href="https://example.com/art.jpg"/>',
+        '<itunes:category text="Technology"><itunes:category text="Tech News"/></itunes:category>',
+    ]
+    for n in range(items, 0, -1):
+        published = start + timedelta(days=n)
+        body = escape(f"<p>Episode {n} notes with <a href='https://example.com/{n}'>links</a> "
+                      + "and a fair amount of text. " * rng.randint(5, 40) + "</p>")
+        url = f"https://cdn.example.com/ep{n}.mp3"
+        media = (f'<media:content url="{url}" type="audio/mpeg" fileSize="{rng.randint(10**6, 10**8)}"/>'
+                 if n % 10 == 0 else f'<enclosure url="{url}" type="audio/mpeg" length="{rng.randint(10**6, 10**8)}"/>')
+        parts.append(
+            f"<item><title>Episode {n}</title><guid>ep-{n}</guid>"
+            f"<pubDate>{format_datetime(published)}</pubDate><description>{body}</description>"
+            f"<itunes:duration>{rng.randint(0, 2)}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}</itunes:duration>"
+            f"<itunes:episode>{n}</itunes:episode>{media}</item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode("utf-8")
+
+
+def legacy_parse(content: bytes) -> int:
+    """The previous parse_rss_data, trimmed to its costly steps, kept here as the baseline."""
+    import feedparser
+    from bs4 import BeautifulSoup
+
+    def sanitize(text):
+        return BeautifulSoup(text, "html.parser").get_text() if text else None
+
+    feed = feedparser.parse(content)
+    root = ET.fromstring(content)
+    all_items_xml = root.findall(".//item")
+    episodes = []
+    for entry in feed.entries:
+        episode = {
+            "title": entry.get("title"),
+            "description": sanitize(entry.get("description") or entry.get("summary")),
+            "summary": sanitize(entry.get("summary") or entry.get("itunes_summary")),
+            "subtitle": sanitize(entry.get("subtitle") or entry.get("itunes_subtitle")),
+            "audio": None,
+        }
+        for enc in entry.get("enclosures", []):
+            if enc.get("type", "").startswith("audio/"):
+                episode["audio"] = enc.get("href")
+                break
+        if episode["audio"] is None:
+            for item in all_items_xml:
+                if item.findtext("title") == episode["title"]:
+                    media = item.find("media:content", {"media": "http://search.yahoo.com/mrss/"})
+                    episode["audio"] = media.attrib.get("url") if media is not None else None
+                    break
+        episodes.append(episode)
+    return len(episodes)
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def peak_memory(fn, *args, **kwargs) -> int:
+    """Peak traced allocation of one call (run separately: tracing slows the code down)."""
+    tracemalloc.start()
+    fn(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    content = synthetic_feed(items)
+    logger.info(f"Feed: {items} items, {len(content) / 1e6:.1f} MB")
+
+    parsed, parsed_seconds = timed(parse_feed, content, "bench://feed")
+    peak = peak_memory(parse_feed, content, "bench://feed")
+    missing = sum(1 for ep in parsed["episodes"] if not ep["audio"])
+    logger.info(f"parse_feed:            {parsed_seconds:.3f}s, peak {peak / 1e6:.1f} MB, "
+                f"{len(parsed['episodes'])} episodes, {missing} without audio")
+
+    since = parsed["episodes"][len(parsed["episodes"]) // 100]["pubDate"]
+    recent, seconds = timed(parse_feed, content, "bench://feed", since=since)
+    logger.info(f"parse_feed (since):    {seconds:.3f}s, {len(recent['episodes'])} new episodes")
+    latest, seconds = timed(parse_feed, content, "bench://feed", limit=50)
+    logger.info(f"parse_feed (limit 50): {seconds:.3f}s, {len(latest['episodes'])} episodes")
+
+    try:
+        count, legacy_seconds = timed(legacy_parse, content)
+    except ImportError as e:
+        logger.info(f"Legacy baseline skipped ({e})")
+        return
+    legacy_peak = peak_memory(legacy_parse, content)
+    logger.info(f"legacy parse:          {legacy_seconds:.3f}s, peak {legacy_peak / 1e6:.1f} MB, {count} episodes")
+    logger.info(f"Speedup:               {legacy_seconds / parsed_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
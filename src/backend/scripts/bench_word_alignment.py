@@ -0,0 +1,91 @@
+"""
+Benchmark: legacy per-sentence fuzzy window search vs. align_sentences on a
+synthetic 90-minute transcript (~150 words per minute).
+
+The legacy search is too slow to run over the full episode, so it is timed on
+the first few sentences and extrapolated.
+
+Usage:
+    python src/backend/scripts/bench_word_alignment.py [minutes] [legacy_sample_sentences]
+"""
+import os
+import sys
+import time
+import random
+import difflib
+import logging
+
+# Adjust path to import from sibling directories
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
+sys.path.append(os.path.join(project_root, "src"))
+
+from backend.utils.word_alignment import align_sentences  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+VOCABULARY = (
+    "we talked about the show and how growth comes from listeners who care about "
+    "the topic every week our guest shared a story about building trust over time "
+    "and why honest conversations matter more than numbers on a dashboard"
+).split()
+
+
+def legacy_fuzzy(sentence: str, word_timings: list, threshold: float = 0.7) -> dict:
+    """Copy of ai_utils.get_sentence_timestamps_fuzzy, kept here as the baseline."""
+    from_word_list = [w["word"].lower().strip(".,!?") for w in word_timings]
+    target_words = sentence.lower().strip().split()
+    best_score, best_start, best_end = 0, 0, 0
+    for i in range(len(from_word_list)):
+        for j in range(i + 1, min(i + len(target_words) + 5, len(from_word_list) + 1)):
+            score = difflib.SequenceMatcher(None, " ".join(target_words), " ".join(from_word_list[i:j])).ratio()
+            if score > best_score and score >= threshold:
+                best_score, best_start, best_end = score, i, j - 1
+    if best_score >= threshold:
+        return {"start": word_timings[best_start]["start"], "end": word_timings[best_end]["end"]}
+    return {"start": 0.0, "end": 0.5}
+
+
+def synthetic_episode(minutes: int, seed: int = 7):
+    rng = random.Random(seed)
+    total_words = minutes * 150
+    word_timings, sentences, t = [], [], 0.0
+    while len(word_timings) < total_words:
+        length = rng.randint(6, 25)
+        words = [rng.choice(VOCABULARY) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + ".")
+        for k, word in enumerate(words):
+            duration = rng.uniform(0.2, 0.5)
+            text = word + ("." if k == length - 1 else "")
+            word_timings.append({"word": text, "start": round(t, 2), "end": round(t + duration, 2)})
+            t += duration + rng.uniform(0.0, 0.15)
+    return sentences, word_timings
+
+
+def main():
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 90
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    sentences, word_timings = synthetic_episode(minutes)
+    logger.info(f"Episode: {minutes} min, {len(word_timings)} words, {len(sentences)} sentences")
+
+    started = time.perf_counter()
+    aligned = align_sentences(sentences, word_timings)
+    aligned_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy = [legacy_fuzzy(s, word_timings) for s in sentences[:sample]]
+    legacy_seconds = time.perf_counter() - started
+    legacy_estimate = legacy_seconds / sample * len(sentences)
+
+    agree = sum(1 for a, b in zip(aligned, legacy) if a == b)
+
+    logger.info(f"align_sentences (all):   {aligned_seconds:.3f}s")
+    logger.info(f"legacy fuzzy ({sample} sent.): {legacy_seconds:.2f}s -> ~{legacy_estimate:.0f}s for the episode")
+    logger.info(f"Estimated speedup:       {legacy_estimate / aligned_seconds:.0f}x")
+    logger.info(f"Agreement on sample:     {agree}/{sample}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: per-sentence zero-shot loop vs. batched classify_zero_shot.
+
+Usage:
+    python src/backend/scripts/bench_zero_shot.py [num_sentences] [batch_size]
+"""
+import os
+import sys
+import time
+import random
+import logging
+
+# Adjust path to import from sibling directories
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
+sys.path.append(os.path.join(project_root, "src"))
+
+from backend.utils.model_registry import get_pipeline  # noqa: E402
+from backend.utils.batch_inference import classify_zero_shot  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+LABELS = ["filler", "important", "redundant", "off-topic"]
+WORDS = (
+    "so um we started the show talking about marketing and you know the thing is "
+    "growth comes from listeners who actually care about the topic we cover every week "
+    "like I mean honestly the guest had a great point about building trust over time"
+).split()
+
+
+def synthetic_transcript(num_sentences: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(num_sentences):
+        length = rng.randint(5, 30)
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize())
+    return ". ".join(sentences)
+
+
+def main():
+    num_sentences = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    sentences = [s for s in synthetic_transcript(num_sentences).split(". ") if s.strip()]
+    classifier = get_pipeline("zero_shot")  # load outside the timed sections
+
+    started = time.perf_counter()
+    loop_results = [classifier(s, candidate_labels=LABELS) for s in sentences]
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched_results = classify_zero_shot(sentences, LABELS, batch_size=batch_size, classifier=classifier)
+    batched_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for a, b in zip(loop_results, batched_results)
+        if a["sequence"] != b["sequence"] or a["labels"][0] != b["labels"][0]
+    )
+
+    logger.info(f"Sentences:        {len(sentences)}")
+    logger.info(f"Per-sentence loop: {loop_seconds:.2f}s")
+    logger.info(f"Batched ({batch_size}):     {batched_seconds:.2f}s")
+    logger.info(f"Speedup:          {loop_seconds / batched_seconds:.1f}x")
+    logger.info(f"Top-label mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
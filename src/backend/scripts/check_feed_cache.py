@@ -0,0 +1,163 @@
+"""
+Check: FeedCache against a local stub feed server, without MongoDB.
+
+Covers a first fetch (200), revalidation answered with 304 via ETag, a read
+timeout with a stale copy (served) and without one (500 tuple),
+single-flight (concurrent misses for one URL cause one upstream request) and
+cache=False reads, which are neither stored nor marked hot.
+Exits non-zero if any check fails.
+
+Usage:
+    python src/backend/scripts/check_feed_cache.py
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Short read timeout so the slow-server checks finish quickly; read when feed_cache is imported
+os.environ.setdefault("FEED_FETCH_READ_TIMEOUT", "0.5")
+os.environ.setdefault("FEED_FETCH_CONNECT_TIMEOUT", "0.5")
+
+# Adjust path to import from sibling directories
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
+sys.path.append(os.path.join(project_root, "src"))
+
+from backend.utils.feed_cache import FEED_FETCH_READ_TIMEOUT, FeedCache  # noqa: E402
+from backend.utils.rss_parser import parse_feed  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+logging.getLogger("backend.utils.feed_cache").setLevel(logging.CRITICAL)
+logging.getLogger("backend.utils.rss_parser").setLevel(logging.WARNING)
+
+FEED_BODY = (
+    b'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+    b"<title>Stub Show</title><link>https://example.com</link><description>Stub</description>"
+    b'<item><title>Episode 1</title><guid>ep-1</guid>'
+    b'<enclosure url="https://cdn.example.com/ep1.mp3" type="audio/mpeg" length="1000"/></item>'
+    b"</channel></rss>"
+)
+FEED_ETAG = '"stub-v1"'
+
+
+class StubFeed(BaseHTTPRequestHandler):
+    """Serves FEED_BODY with an ETag, after the configured delay; counts requests per path."""
+
+    delay = 0.0
+    requests = {}
+    not_modified = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.requests[self.path] = self.requests.get(self.path, 0) + 1
+        time.sleep(self.delay)
+        try:
+            if self.headers.get("If-None-Match") == FEED_ETAG:
+                with self.lock:
+                    self.not_modified[self.path] = self.not_modified.get(self.path, 0) + 1
+                self.send_response(304)
+                self.send_header("ETag", FEED_ETAG)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(FEED_BODY)))
+            self.send_header("ETag", FEED_ETAG)
+            self.end_headers()
+            self.wfile.write(FEED_BODY)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up after its read timeout
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse(body: bytes, url: str):
+    return parse_feed(body, url), 200
+
+
+def new_cache() -> FeedCache:
+    cache = FeedCache(parse, ttl_seconds=60, enabled=True)
+    cache._collection_failed = True  # memory tier only
+    return cache
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFeed)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    failures = []
+
+    def check(name, ok, detail=""):
+        logger.info(f"{'PASS' if ok else 'FAIL'}  {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    slow_delay = FEED_FETCH_READ_TIMEOUT * 3
+    cache = new_cache()
+    url = f"{base}/feed"
+
+    data, status = cache.get(url)
+    check("200: first fetch is parsed", status == 200 and data.get("title") == "Stub Show"
+          and len(data.get("episodes", [])) == 1, f"status {status}")
+    data, status = cache.get(url)
+    check("200: fresh copy served from memory", status == 200 and StubFeed.requests["/feed"] == 1
+          and cache.stats["memory_hits"] == 1)
+
+    data, status = cache.get(url, max_age=0)
+    check("304: stale copy revalidated by ETag", status == 200 and StubFeed.not_modified.get("/feed") == 1
+          and cache.stats["not_modified"] == 1 and data.get("title") == "Stub Show")
+
+    StubFeed.delay = slow_delay
+    data, status = cache.get(url, max_age=0)
+    check("timeout with stale copy: copy served", status == 200 and data.get("title") == "Stub Show"
+          and cache.stats["stale_served"] == 1, f"status {status}")
+
+    data, status = cache.get(f"{base}/uncached")
+    check("timeout without copy: 500 tuple", status == 500 and "Timeout" in data.get("error", ""),
+          data.get("error", ""))
+
+    StubFeed.delay = FEED_FETCH_READ_TIMEOUT / 2
+    cache = new_cache()
+    shared_url = f"{base}/shared"
+    callers = 8
+    results = []
+    start = threading.Barrier(callers)
+
+    def reader():
+        start.wait()
+        results.append(cache.get(shared_url))
+
+    threads = [threading.Thread(target=reader) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    check("single-flight: one upstream request", StubFeed.requests.get("/shared") == 1
+          and all(status == 200 for _, status in results) and len(results) == callers,
+          f"{StubFeed.requests.get('/shared')} requests, {cache.stats['shared']} callers shared")
+
+    StubFeed.delay = 0.0
+    cache = new_cache()
+    data, status = cache.get(f"{base}/bulk", cache=False)
+    check("cache=False: fetched but not stored or tracked", status == 200 and data.get("title") == "Stub Show"
+          and len(cache.memory) == 0 and cache.metrics()["hot_feeds"] == 0)
+    cache.get(url)
+    data, status = cache.get(url, cache=False)
+    check("cache=False: fresh cached copy reused", status == 200 and cache.stats["memory_hits"] == 1)
+
+    server.shutdown()
+    if failures:
+        logger.error(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    logger.info("All feed cache checks passed")
+
+
+if __name__ == "__main__":
+    main()
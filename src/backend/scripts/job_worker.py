@@ -0,0 +1,50 @@
+"""
+Job worker: claims queued jobs (transcription, AI cut, voice isolation, SFX,
+video enhancement) from MongoDB and runs them on a bounded process pool.
+
+Run at least one next to the web server; more can be started on other hosts
+against the same database. A single-process web server can start one itself
+with JOB_EMBEDDED_WORKER=true (leave it off when the web tier runs several
+processes, or each would start its own pool).
+
+Usage:
+    python src/backend/scripts/job_worker.py [--processes N] [--types transcribe,ai_cut]
+"""
+import os
+import sys
+import signal
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Adjust path to import from sibling directories
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
+sys.path.append(os.path.join(project_root, "src"))
+
+load_dotenv(os.path.join(project_root, ".env"))
+
+from backend.services.jobService import JobWorker  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs from the Jobs collection.")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default JOB_WORKER_PROCESSES)")
+    parser.add_argument("--types", default=None, help="Comma-separated job types to take (default: all)")
+    args = parser.parse_args()
+
+    worker = JobWorker(
+        processes=args.processes,
+        job_types=args.types.split(",") if args.types else None,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run_forever()
+    logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()
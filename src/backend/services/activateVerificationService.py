@@ -1,4 +1,4 @@
-from azure.storage.blob import BlobServiceClient
+from backend.utils.blob_storage import blob_gateway
 import os
 import logging
 from flask import current_app
@@ -18,17 +18,13 @@ def verify_activation_file_exists():
             
         logger.info(f"Checking for activation file at {container_name}/{blob_path}")
         
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-        
         # Check if blob exists
-        if not blob_client.exists():
+        if not blob_gateway.exists(container_name, blob_path):
             logger.error(f"Activation file not found: {container_name}/{blob_path}")
             return False
             
         # Attempt to get blob properties to verify we can access it
-        properties = blob_client.get_blob_properties()
-        file_size = properties.size
+        file_size = blob_gateway.size(container_name, blob_path)
         
         # Check minimal size - an empty file wouldn't be useful
         if file_size < 100:  # Arbitrary small size check
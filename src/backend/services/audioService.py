@@ -1,82 +1,90 @@
-import os, logging, tempfile, requests, subprocess, base64, json
+import os, logging, requests, base64, json
 from typing import Optional
+from contextlib import nullcontext
 from pydub import AudioSegment, silence
 from io import BytesIO 
 from backend.database.mongo_connection import get_fs
 from backend.utils.ai_utils import (
     remove_filler_words, calculate_clarity_score, analyze_sentiment, analyze_emotions
-    , enhance_audio_with_ffmpeg, detect_background_noise, get_sentence_timestamps_fuzzy, 
-    convert_to_pcm_wav, transcribe_with_whisper, detect_filler_words,
-    analyze_certainty_levels, detect_long_pauses,
+    , enhance_audio_bytes, enhance_audio_with_ffmpeg,
+    transcribe_with_whisper, detect_filler_words,
+    analyze_certainty_levels,
     generate_ai_show_notes, translate_text, mix_background,
-    pick_dominant_emotion, fetch_sfx_for_emotion, convert_audio_to_wav
+    pick_dominant_emotion, fetch_sfx_for_emotion
 )
+from backend.utils.audio_io import decode_audio, decode_audio_file, scratch_file
+from backend.utils.audio_cuts import cut_audio_bytes
+from backend.utils.audio_mix import Stem, mix_to_wav_bytes
+from backend.utils.sfx_generation import generate_sfx_many, get_sfx_provider, current_user_id
+from backend.utils.speech_to_text import transcribe_audio_bytes, transcribe_pcm
+from backend.utils.audio_analysis import analyze_audio_signal
+from backend.utils.word_alignment import align_sentences
 from backend.repository.ai_models import save_file, get_file_data, get_file_by_id
-from elevenlabs.client import ElevenLabs
 from backend.utils.blob_storage import upload_file_to_blob
 from backend.repository.episode_repository import EpisodeRepository
 from backend.repository.edit_repository import create_edit_entry
 from flask import g
 from openai import OpenAI
-import tempfile
 logger = logging.getLogger(__name__)
 
 fs = get_fs()
 episode_repo = EpisodeRepository()
 
+
 class AudioService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.logger.info("AudioService initialized with full ai_utils support.")
 
-    def enhance_audio(self, audio_bytes: bytes, filename: str, episode_id: str) -> str:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_bytes)
-            temp_in_path = tmp.name
-
-        temp_out_path = temp_in_path.replace(".wav", "_enhanced.wav")
-        success = enhance_audio_with_ffmpeg(temp_in_path, temp_out_path)
-
-        if not success:
-            raise RuntimeError("FFmpeg enhancement failed")
-
-        with open(temp_out_path, "rb") as f:
-            enhanced_data = f.read()
-
+    def enhance_audio(self, audio_bytes: bytes, filename: str, episode_id: str,
+                      audio_path: str = None, source_url: str = None) -> str:
+        """
+        Enhance and upload to Blob. With audio_path, ffmpeg reads that file and writes a
+        scratch WAV that is uploaded from disk, so neither version is held in memory.
+        """
         podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
         blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/enhanced_{filename}"
-        enhanced_stream = BytesIO(enhanced_data)
-        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, enhanced_stream)
-
+        if audio_path:
+            with scratch_file(suffix=".wav") as enhanced_path:
+                if not enhance_audio_with_ffmpeg(audio_path, enhanced_path):
+                    raise RuntimeError("FFmpeg enhancement failed")
+                blob_url = upload_file_to_blob("podmanagerfiles", blob_path, enhanced_path)
+        else:
+            enhanced_stream = BytesIO(enhance_audio_bytes(audio_bytes))
+            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, enhanced_stream)
+
+        metadata = {
+            "source": filename,
+            "enhanced": True,
+            "edit_type": "enhanced"
+        }
+        if source_url:
+            metadata["source_url"] = source_url
         create_edit_entry(
             episode_id=episode_id,
             user_id=g.user_id,
             edit_type="enhanced",
             clip_url=blob_url,
             clipName=f"enhanced_{filename}",
-            metadata={
-                "source": filename,
-                "enhanced": True,
-                "edit_type": "enhanced"
-            }
+            metadata=metadata
         )
-        os.remove(temp_in_path)
-        os.remove(temp_out_path)
 
         return blob_url
 
     def analyze_audio(self, audio_bytes: bytes) -> dict:
-        # Write the incoming bytes to a temp WAV file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_bytes)
-            temp_path = tmp.name
-
         try:
             # 1) Basic transcript analysis
-            transcript     = transcribe_with_whisper(temp_path)
+            transcript     = transcribe_with_whisper(audio_bytes)
             cleaned        = remove_filler_words(transcript)
             clarity_score  = calculate_clarity_score(cleaned)
-            noise_result   = detect_background_noise(temp_path)
+            # Noise, loudness and pauses in one pass over the decoded audio
+            try:
+                audio_metrics = analyze_audio_signal(audio_bytes)
+                noise_result  = audio_metrics["background_noise"]
+            except Exception as e:
+                logger.error(f"Error in background noise detection: {str(e)}")
+                audio_metrics = None
+                noise_result  = f"Error: {str(e)}"
             sentiment      = analyze_sentiment(transcript)
 
             # 2) Emotion detection
@@ -95,10 +103,12 @@ class AudioService:
                 "background_noise":   noise_result,
                 "sentiment":          sentiment,
                 "emotions":           emotion_data,
-                "dominant_emotion":   dominant_emotion
+                "dominant_emotion":   dominant_emotion,
+                "audio_metrics":      audio_metrics
             }
-        finally:
-            os.remove(temp_path)
+        except Exception as e:
+            logger.error(f"Audio analysis failed: {e}", exc_info=True)
+            raise
     
     def generate_background_and_mix(self, audio_bytes: bytes, emotion: str) -> dict:
         """
@@ -108,11 +118,8 @@ class AudioService:
         4) Return both the loop and the mixed audio as data-URIs.
         """
         # --- STEP 1: Turn incoming bytes into a valid WAV ---
-        # pydub will inspect the bytes and decode MP3, WAV, etc.
-        audio_seg = AudioSegment.from_file(BytesIO(audio_bytes))
-        wav_io    = BytesIO()
-        audio_seg.export(wav_io, format="wav")
-        wav_bytes = wav_io.getvalue()
+        # ffmpeg (via a pipe) decodes MP3, WAV, etc.; WAV input is used as-is
+        wav_bytes = decode_audio(audio_bytes).to_wav_bytes()
 
         # --- STEP 2: Fetch the 30s background clip ---
         bg_b64 = fetch_sfx_for_emotion(emotion, "general")[0]
@@ -135,238 +142,182 @@ class AudioService:
             raise ValueError("Invalid timestamps.")
 
         audio_data = get_file_data(file_id)
+        clipped_data = decode_audio(audio_data).slice(start_time, end_time).to_wav_bytes()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_in:
-            tmp_in.write(audio_data)
-            input_path = tmp_in.name
+        episode, status = episode_repo.get_episode(episode_id, user_id=None)
+        if not episode or status != 200:
+            raise ValueError(f"Episode {episode_id} not found")
+        podcast_id = episode.get("podcast_id")
+        user_id = episode.get("userid")
+        filename = f"clipped_{file_id}.wav"
 
-        output_path = input_path.replace(".wav", "_clipped.wav")
+        blob_path = f"users/{user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{filename}"
+        clipped_stream = BytesIO(clipped_data)
+        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, clipped_stream)
 
-        try:
-            subprocess.run([
-                "ffmpeg", "-y", "-i", input_path,
-                "-ss", str(start_time), "-to", str(end_time),
-                "-c", "copy", output_path
-            ], check=True)
-
-            with open(output_path, "rb") as f:
-                clipped_data = f.read()
-
-            episode, status = episode_repo.get_episode(episode_id, user_id=None)
-            if not episode or status != 200:
-                raise ValueError(f"Episode {episode_id} not found")
-            podcast_id = episode.get("podcast_id")
-            user_id = episode.get("userid")
-            filename = f"clipped_{file_id}.wav"
-
-            blob_path = f"users/{user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{filename}"
-            clipped_stream = BytesIO(clipped_data)
-            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, clipped_stream)
-
-
-            create_edit_entry(
-                episode_id=episode_id,
-                user_id=g.user_id,
-                edit_type="manual_clip",
-                clip_url=blob_url,
-                clipName=filename,
-                metadata={
-                    "start": start_time,
-                    "end": end_time,
-                    "edit_type": "manual_clip"
-                }
-            )
 
-            return blob_url
-        finally:
-            for path in [input_path, output_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        create_edit_entry(
+            episode_id=episode_id,
+            user_id=g.user_id,
+            edit_type="manual_clip",
+            clip_url=blob_url,
+            clipName=filename,
+            metadata={
+                "start": start_time,
+                "end": end_time,
+                "edit_type": "manual_clip"
+            }
+        )
+
+        return blob_url
 
-    def ai_cut_audio(self, file_bytes: bytes, filename: str, episode_id: Optional[str] = None) -> dict:
+    def ai_cut_audio(self, file_bytes: bytes, filename: str, episode_id: Optional[str] = None,
+                     audio_path: Optional[str] = None) -> dict:
+        """With audio_path (e.g. an ingested upload) the file is decoded from disk instead of file_bytes."""
         logger.info(f"Starting AI cut for file: {filename}")
         
         try:
-            converted_bytes = convert_to_pcm_wav(file_bytes)
+            if audio_path:
+                pcm = decode_audio_file(audio_path, sample_rate=16000, channels=1)
+            else:
+                pcm = decode_audio(file_bytes, sample_rate=16000)
         except Exception as e:
             logger.error(f"Audio conversion failed: {str(e)}")
             raise RuntimeError("Audio format is unsupported or corrupted")
 
-        # Write to temporary WAV file for downstream processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(converted_bytes)
-            tmp.flush()
-            temp_path = tmp.name
-
-        logger.info(f"AI Cut working with converted WAV file at: {temp_path}")
-
-        try:
-            client = ElevenLabs()
-            with open(temp_path, "rb") as f:
-                audio_bytes = f.read()
-
-            result = client.speech_to_text.convert(
-                file=audio_bytes,
-                model_id="scribe_v1",
-                num_speakers=2,
-                diarize=True,
-                timestamps_granularity="word"
-            )
-
-            transcript = result.text.strip()
-            word_timings = [
-                {"word": w.text, "start": w.start, "end": w.end}
-                for w in result.words
-                if hasattr(w, "start") and hasattr(w, "end")
-            ]
-
-            cleaned_transcript = remove_filler_words(transcript) 
-            noise_result = detect_background_noise(temp_path)
-            filler_sentences = detect_filler_words(transcript)  
-            sentence_certainty = analyze_certainty_levels(transcript) 
+        logger.info(f"AI Cut working with {pcm.duration:.1f}s of in-memory PCM audio")
 
-            logger.info(f"Certainty results computed")
+        # Reuses the transcript from /transcribe when this audio was transcribed before;
+        # long episodes are transcribed in concurrent chunks split on silences
+        if audio_path:
+            result = transcribe_pcm(pcm, diarize=True, num_speakers=2)
+        else:
+            result = transcribe_audio_bytes(file_bytes, diarize=True, num_speakers=2,
+                                            suffix=os.path.splitext(filename)[1] or ".bin")
 
-            sentence_timestamps = []
-            audio = AudioSegment.from_wav(temp_path)
-            cut_file_ids = []
-
-            for idx, entry in enumerate(sentence_certainty):
-                if entry["certainty"] <= 0:
-                    continue
+        transcript = result.text.strip()
+        word_timings = [
+            {"word": w.text, "start": w.start, "end": w.end}
+            for w in result.words
+            if hasattr(w, "start") and hasattr(w, "end")
+        ]
 
-                timestamps = get_sentence_timestamps_fuzzy(entry["sentence"], word_timings)
-                start_ms = int(timestamps["start"] * 1000)
-                end_ms = int(timestamps["end"] * 1000)
-
-                entry.update({
-                    "start": timestamps["start"],
-                    "end": timestamps["end"],
-                    "id": idx
-                })
-
-                sentence_timestamps.append({
-                    "id": idx,
-                    "sentence": entry["sentence"],
-                    "start": timestamps["start"],
-                    "end": timestamps["end"]
-                })
+        cleaned_transcript = remove_filler_words(transcript) 
+        # Noise, loudness and pauses in one pass over the PCM already in memory
+        audio_metrics = analyze_audio_signal(pcm)
+        noise_result = audio_metrics["background_noise"]
+        filler_sentences = detect_filler_words(transcript)  
+        sentence_certainty = analyze_certainty_levels(transcript) 
 
-                cut = audio[start_ms:end_ms]
+        logger.info(f"Certainty results computed")
 
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_cut:
-                    cut.export(tmp_cut.name, format="wav")
-                    tmp_cut.flush()
-                    tmp_cut_path = tmp_cut.name  # Spara tempfilens path
+        sentence_timestamps = []
+        cut_file_ids = []
 
-                with open(tmp_cut_path, "rb") as f:
-                    file_id = save_file(
-                        f.read(),
-                        filename=f"cut_{idx}.wav",
-                        metadata={"type": "ai_cut", "source": filename}
-                    )
-                    cut_file_ids.append(file_id)
-
-                os.remove(tmp_cut_path)  # Radera efter att filen är stängd
+        # Align every sentence in one forward pass over the word timings
+        aligned = align_sentences([e["sentence"] for e in sentence_certainty], word_timings)
 
+        for idx, (entry, timestamps) in enumerate(zip(sentence_certainty, aligned)):
+            if entry["certainty"] <= 0:
+                continue
 
-            sentiment = analyze_sentiment(transcript)
-            show_notes = generate_ai_show_notes(transcript)
+            entry.update({
+                "start": timestamps["start"],
+                "end": timestamps["end"],
+                "id": idx
+            })
+
+            sentence_timestamps.append({
+                "id": idx,
+                "sentence": entry["sentence"],
+                "start": timestamps["start"],
+                "end": timestamps["end"]
+            })
+
+            cut = pcm.slice(timestamps["start"], timestamps["end"])
+            file_id = save_file(
+                cut.to_wav_bytes(),
+                filename=f"cut_{idx}.wav",
+                metadata={"type": "ai_cut", "source": filename}
+            )
+            cut_file_ids.append(file_id)
 
-            return {
-                "message": "AI Audio processing completed with clips",
-                "cleaned_transcript": cleaned_transcript,
-                "background_noise": noise_result,
-                "filler_sentences": filler_sentences,
-                "sentence_certainty_scores": sentence_certainty,
-                "sentence_timestamps": sentence_timestamps,
-                "suggested_cuts": [
-                    {
-                        "sentence": e["sentence"],
-                        "certainty_level": e["certainty_level"],
-                        "certainty_score": e["certainty"],
-                        "start": e["start"],
-                        "end": e["end"]
-                    } for e in sentence_certainty if e["certainty"] >= 0.1
-                ],
-                "sentiment": sentiment,
-                "long_pauses": detect_long_pauses(temp_path),
-                "ai_show_notes": show_notes,
-                "cut_file_ids": cut_file_ids
-            }
+        sentiment = analyze_sentiment(transcript)
+        show_notes = generate_ai_show_notes(transcript)
 
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            logger.info(f"Temp file cleaned up: {temp_path}")
+        return {
+            "message": "AI Audio processing completed with clips",
+            "cleaned_transcript": cleaned_transcript,
+            "background_noise": noise_result,
+            "filler_sentences": filler_sentences,
+            "sentence_certainty_scores": sentence_certainty,
+            "sentence_timestamps": sentence_timestamps,
+            "suggested_cuts": [
+                {
+                    "sentence": e["sentence"],
+                    "certainty_level": e["certainty_level"],
+                    "certainty_score": e["certainty"],
+                    "start": e["start"],
+                    "end": e["end"]
+                } for e in sentence_certainty if e["certainty"] >= 0.1
+            ],
+            "sentiment": sentiment,
+            "long_pauses": audio_metrics["pauses"],
+            "audio_metrics": audio_metrics,
+            "ai_show_notes": show_notes,
+            "cut_file_ids": cut_file_ids
+        }
 
     def ai_cut_audio_from_id(self, file_id: str, episode_id: Optional[str] = None) -> dict:
         audio_bytes, filename = get_file_by_id(file_id)
         return self.ai_cut_audio(audio_bytes, filename, episode_id=episode_id)
     
-    def isolate_voice(self, audio_bytes: bytes, filename: str, episode_id: str) -> str:
+    def isolate_voice(self, audio_bytes: bytes, filename: str, episode_id: str, audio_path: str = None) -> str:
+        """With audio_path the upload is sent from that file instead of audio_bytes."""
         logger.info(f"Starting voice isolation for file: {filename}")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_bytes)
-            temp_input_path = tmp.name
+        elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+        if not elevenlabs_api_key:
+            raise RuntimeError("Missing ELEVENLABS_API_KEY environment variable")
 
-        temp_output_path = None 
+        logger.info("Sending audio to ElevenLabs voice isolation endpoint...")
 
-        try:
-            elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
-            if not elevenlabs_api_key:
-                raise RuntimeError("Missing ELEVENLABS_API_KEY environment variable")
-
-            logger.info("Sending audio to ElevenLabs voice isolation endpoint...")
-
-            with open(temp_input_path, "rb") as f:
-                response = requests.post(
-                    "https://api.elevenlabs.io/v1/audio-isolation",
-                    headers={"xi-api-key": elevenlabs_api_key},
-                    files={"audio": f}
-                )
-
-            logger.info(f"ElevenLabs response status: {response.status_code}")
-
-            if response.status_code != 200:
-                logger.error(f"Voice isolation failed: {response.status_code} {response.text}")
-                raise RuntimeError(f"Voice isolation failed: {response.status_code} {response.text}")
-
-            # Save the isolated audio to a temporary file
-            temp_output_path = temp_input_path.replace(".wav", "_isolated.wav")
-            with open(temp_output_path, "wb") as out_file:
-                out_file.write(response.content)
-
-            with open(temp_output_path, "rb") as f:
-                isolated_data = f.read()
-
-            isolated_filename = f"isolated_{filename}"
-            podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
-
-            blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{isolated_filename}"
-            isolated_stream = BytesIO(isolated_data)
-            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, isolated_stream)
-
-            create_edit_entry(
-                episode_id=episode_id,
-                user_id=g.user_id,
-                edit_type="voice_isolated",
-                clip_url=blob_url,
-                clipName=isolated_filename,
-                metadata={
-                    "source": filename,
-                    "edit_type": "voice_isolated"
-                }
+        with open(audio_path, "rb") if audio_path else nullcontext(audio_bytes) as audio:
+            response = requests.post(
+                "https://api.elevenlabs.io/v1/audio-isolation",
+                headers={"xi-api-key": elevenlabs_api_key},
+                files={"audio": (filename, audio)}
             )
 
-            logger.info(f"Isolated voice uploaded to Azure: {blob_url}")
-            return blob_url
+        logger.info(f"ElevenLabs response status: {response.status_code}")
+
+        if response.status_code != 200:
+            logger.error(f"Voice isolation failed: {response.status_code} {response.text}")
+            raise RuntimeError(f"Voice isolation failed: {response.status_code} {response.text}")
+
+        isolated_data = response.content
+
+        isolated_filename = f"isolated_{filename}"
+        podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
+
+        blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{isolated_filename}"
+        isolated_stream = BytesIO(isolated_data)
+        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, isolated_stream)
+
+        create_edit_entry(
+            episode_id=episode_id,
+            user_id=g.user_id,
+            edit_type="voice_isolated",
+            clip_url=blob_url,
+            clipName=isolated_filename,
+            metadata={
+                "source": filename,
+                "edit_type": "voice_isolated"
+            }
+        )
 
-        finally:
-            os.remove(temp_input_path)
-            if temp_output_path and os.path.exists(temp_output_path):
-                os.remove(temp_output_path)
+        logger.info(f"Isolated voice uploaded to Azure: {blob_url}")
+        return blob_url
 
     def split_audio_on_silence(wav_path, min_len=500, silence_thresh_db=-35):
         audio = AudioSegment.from_wav(wav_path)
@@ -381,101 +332,35 @@ class AudioService:
     def apply_cuts_and_return_new_file(self, file_id: str, cuts: list[dict], episode_id: str) -> str:
         logger.info(f"Applying cuts to file ID: {file_id}")
         audio_data = get_file_data(file_id)
+        cleaned_bytes, segments_kept = cut_audio_bytes(audio_data, cuts)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_data)
-            tmp_path = tmp.name
+        episode = episode_repo.get_episode(episode_id, user_id=None)[0]
+        podcast_id = episode.get("podcast_id")
+        user_id = episode.get("userid")
+        filename = f"cleaned_{file_id}.wav"
 
-        try:
-            audio = AudioSegment.from_wav(tmp_path)
-            duration_ms = len(audio)
-            cuts_ms = sorted([
-                (int(c["start"] * 1000), int(c["end"] * 1000))
-                for c in cuts
-                if 0 <= c["start"] < c["end"] <= duration_ms / 1000
-            ])
-
-            merged = []
-            for start, end in cuts_ms:
-                if merged and start <= merged[-1][1]:
-                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-                else:
-                    merged.append((start, end))
-
-            segments = [audio[start:end] for start, end in merged]
-            final_audio = sum(segments)
-
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as out_tmp:
-                cleaned_path = out_tmp.name
-                final_audio.export(cleaned_path, format="wav")
-
-            with open(cleaned_path, "rb") as f:
-                cleaned_bytes = f.read()
-
-            episode = episode_repo.get_episode(episode_id, user_id=None)[0]
-            podcast_id = episode.get("podcast_id")
-            user_id = episode.get("userid")
-            filename = f"cleaned_{file_id}.wav"
-
-            blob_path = f"users/{user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{filename}"
-            base64_audio = base64.b64encode(cleaned_bytes).decode("utf-8")
-            cleaned_stream = BytesIO(cleaned_bytes)
-            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, cleaned_stream)
-
-            create_edit_entry(
-                episode_id=episode_id,
-                user_id=g.user_id,
-                edit_type="ai_cut_cleaned",
-                clip_url=blob_url,
-                clipName=filename,
-                metadata={
-                    "segments_kept": len(merged),
-                    "edit_type": "ai_cut_cleaned"
-                }
-            )
-            return blob_url
-        finally:
-            for path in [tmp_path, cleaned_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        blob_path = f"users/{user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/{filename}"
+        cleaned_stream = BytesIO(cleaned_bytes)
+        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, cleaned_stream)
+
+        create_edit_entry(
+            episode_id=episode_id,
+            user_id=g.user_id,
+            edit_type="ai_cut_cleaned",
+            clip_url=blob_url,
+            clipName=filename,
+            metadata={
+                "segments_kept": segments_kept,
+                "edit_type": "ai_cut_cleaned"
+            }
+        )
+        return blob_url
 
     def apply_cuts_and_return_bytes(self, file_id: str, cuts: list[dict]) -> tuple[bytes, str]:
         audio_data = get_file_data(file_id)
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_data)
-            tmp_path = tmp.name
-
-        try:
-            audio = AudioSegment.from_wav(tmp_path)
-            cuts_ms = sorted([
-                (int(c["start"] * 1000), int(c["end"] * 1000))
-                for c in cuts if 0 <= c["start"] < c["end"]
-            ])
-
-            merged = []
-            for start, end in cuts_ms:
-                if merged and start <= merged[-1][1]:
-                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-                else:
-                    merged.append((start, end))
-
-            segments = [audio[start:end] for start, end in merged]
-            final_audio = sum(segments)
-
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as out_tmp:
-                cleaned_path = out_tmp.name
-                final_audio.export(cleaned_path, format="wav")
-
-            with open(cleaned_path, "rb") as f:
-                cleaned_bytes = f.read()
-
-            filename = f"cleaned_{file_id}.wav"
-            return cleaned_bytes, filename
-        finally:
-            for path in [tmp_path, cleaned_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        cleaned_bytes, _ = cut_audio_bytes(audio_data, cuts)
+        filename = f"cleaned_{file_id}.wav"
+        return cleaned_bytes, filename
 
     def cut_audio_to_bytes(self, file_id: str, start_time: float, end_time: float) -> tuple[bytes, str]:
         logger.info(f"Cutting audio ID: {file_id} from {start_time}s to {end_time}s")
@@ -484,112 +369,52 @@ class AudioService:
             raise ValueError("Invalid timestamps.")
 
         audio_data = get_file_data(file_id)
+        clipped_data = decode_audio(audio_data).slice(start_time, end_time).to_wav_bytes()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_in:
-            tmp_in.write(audio_data)
-            input_path = tmp_in.name
-
-        output_path = input_path.replace(".wav", "_clipped.wav")
-
-        try:
-            subprocess.run([
-                "ffmpeg", "-y", "-i", input_path,
-                "-ss", str(start_time), "-to", str(end_time),
-                "-c", "copy", output_path
-            ], check=True)
-
-            with open(output_path, "rb") as f:
-                clipped_data = f.read()
-
-            filename = os.path.basename(output_path)
-            return clipped_data, filename
-        finally:
-            for path in [input_path, output_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        filename = f"clipped_{file_id}.wav"
+        return clipped_data, filename
 
     def cut_audio_from_blob(self, audio_bytes: bytes, filename: str, episode_id: str, start_time: float, end_time: float) -> str:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_in:
-            tmp_in.write(audio_bytes)
-            input_path = tmp_in.name
+        clipped_data = decode_audio(audio_bytes).slice(start_time, end_time).to_wav_bytes()
 
-        output_path = input_path.replace(".wav", "_clipped.wav")
+        podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
+        blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/clipped_{filename}"
+        clipped_stream = BytesIO(clipped_data)
+        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, clipped_stream)
 
-        try:
-            subprocess.run([
-                "ffmpeg", "-y", "-i", input_path,
-                "-ss", str(start_time), "-to", str(end_time),
-                "-c", "copy", output_path
-            ], check=True)
-
-            with open(output_path, "rb") as f:
-                clipped_data = f.read()
-
-            podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
-            blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/clipped_{filename}"
-            clipped_stream = BytesIO(clipped_data)
-            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, clipped_stream)
-
-            create_edit_entry(
-                episode_id=episode_id,
-                user_id=g.user_id,
-                edit_type="manual_clip",
-                clip_url=blob_url,
-                clipName=f"clipped_{filename}",
-                metadata={
-                    "start": start_time,
-                    "end": end_time,
-                    "edit_type": "manual_clip"
-                }
-            )
-            return blob_url
-        finally:
-            for path in [input_path, output_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        create_edit_entry(
+            episode_id=episode_id,
+            user_id=g.user_id,
+            edit_type="manual_clip",
+            clip_url=blob_url,
+            clipName=f"clipped_{filename}",
+            metadata={
+                "start": start_time,
+                "end": end_time,
+                "edit_type": "manual_clip"
+            }
+        )
+        return blob_url
 
     def apply_cuts_on_blob(self, audio_bytes: bytes, filename: str, cuts: list[dict], episode_id: str) -> str:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+        cleaned_bytes, _ = cut_audio_bytes(audio_bytes, cuts, suffix=os.path.splitext(filename)[1] or ".bin")
 
-        try:
-            audio = AudioSegment.from_wav(tmp_path)
-            cuts_ms = sorted([
-                (int(c["start"] * 1000), int(c["end"] * 1000))
-                for c in cuts if 0 <= c["start"] < c["end"]
-            ])
-
-            segments = [audio[start:end] for start, end in cuts_ms]
-            final_audio = sum(segments)
-
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as out_tmp:
-                cleaned_path = out_tmp.name
-                final_audio.export(cleaned_path, format="wav")
-
-            with open(cleaned_path, "rb") as f:
-                cleaned_bytes = f.read()
-
-            podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
-            blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/cleaned_{filename}"
-            cleaned_stream = BytesIO(cleaned_bytes)
-            blob_url = upload_file_to_blob("podmanagerfiles", blob_path, cleaned_stream)
-
-            create_edit_entry(
-                episode_id=episode_id,
-                user_id=g.user_id,
-                edit_type="ai_cut_cleaned",
-                clip_url=blob_url,
-                clipName=f"cleaned_{filename}",
-                metadata={
-                    "edit_type": "ai_cut_cleaned"
-                }
-            )
-            return blob_url
-        finally:
-            for path in [tmp_path, cleaned_path]:
-                if os.path.exists(path):
-                    os.remove(path)
+        podcast_id = episode_repo.get_podcast_id_by_episode(episode_id)
+        blob_path = f"users/{g.user_id}/podcasts/{podcast_id}/episodes/{episode_id}/audio/cleaned_{filename}"
+        cleaned_stream = BytesIO(cleaned_bytes)
+        blob_url = upload_file_to_blob("podmanagerfiles", blob_path, cleaned_stream)
+
+        create_edit_entry(
+            episode_id=episode_id,
+            user_id=g.user_id,
+            edit_type="ai_cut_cleaned",
+            clip_url=blob_url,
+            clipName=f"cleaned_{filename}",
+            metadata={
+                "edit_type": "ai_cut_cleaned"
+            }
+        )
+        return blob_url
         
     def plan_and_mix_sfx(self, audio_bytes: bytes, word_timestamps: Optional[list] = None) -> dict:
         """
@@ -597,6 +422,13 @@ class AudioService:
         - Accepts optional word_timestamps to avoid redundant transcription.
         - If not provided, falls back to ElevenLabs.
         """
+        result = self.plan_and_mix_sfx_raw(audio_bytes, word_timestamps)
+        mixed_audio_bytes = result.pop("merged_audio_bytes")
+        result["merged_audio"] = "data:audio/wav;base64," + base64.b64encode(mixed_audio_bytes).decode()
+        return result
+
+    def plan_and_mix_sfx_raw(self, audio_bytes: bytes, word_timestamps: Optional[list] = None) -> dict:
+        """Same as plan_and_mix_sfx, but returns the mixed WAV as bytes under "merged_audio_bytes"."""
         logger.info("🎧 Starting plan_and_mix_sfx process")
 
         transcript_segments = []
@@ -632,50 +464,15 @@ class AudioService:
 
             else:
                 logger.info("🔁 No word_timestamps provided, using ElevenLabs for transcription")
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                    tmp.write(audio_bytes)
-                    temp_path = tmp.name
-                    logger.info(f"📝 Temp audio file saved: {temp_path}")
-
-                try:
-                    client = ElevenLabs()
-                    with open(temp_path, "rb") as f:
-                        audio_bytes_for_api = f.read()
-
-                    result = client.speech_to_text.convert(
-                        file=audio_bytes_for_api,
-                        model_id="scribe_v1",
-                        timestamps_granularity="word"
-                    )
-
-                    logger.info(f"📋 Received {len(result.words)} words with timestamps")
-                    for word in result.words:
-                        if hasattr(word, "start") and hasattr(word, "end"):
-                            if sentence_start is None:
-                                sentence_start = word.start
-                            sentence_end = word.end
-                            current_sentence.append(word.text)
-
-                            if word.text.strip().endswith((".", "!", "?")):
-                                transcript_segments.append({
-                                    "start": sentence_start,
-                                    "end": sentence_end,
-                                    "text": " ".join(current_sentence)
-                                })
-                                current_sentence = []
-                                sentence_start = sentence_end = None
-
-                    if current_sentence:
-                        transcript_segments.append({
-                            "start": sentence_start,
-                            "end": sentence_end,
-                            "text": " ".join(current_sentence)
-                        })
-
-                finally:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                        logger.info(f"🧹 Deleted temp file: {temp_path}")
+                result = transcribe_audio_bytes(audio_bytes)
+
+                logger.info(f"📋 Received {len(result.words)} words with timestamps")
+                # Sentence spans come with a stored transcript, so nothing is re-segmented here
+                words = result.words
+                transcript_segments = [
+                    {"start": words[a].start, "end": words[b].end, "text": " ".join(w.text for w in words[a:b + 1])}
+                    for a, b in result.sentence_spans()
+                ]
 
             if not transcript_segments:
                 raise ValueError("Transcript segmentation failed")
@@ -692,7 +489,6 @@ class AudioService:
 
             # --- MIX ---
             mixed_audio_bytes = self.mix_sfx_audio_bytes(audio_bytes, sfx_clips)
-            mixed_audio_b64 = "data:audio/wav;base64," + base64.b64encode(mixed_audio_bytes).decode()
 
             sfx_clips_response = [
                 {
@@ -708,7 +504,7 @@ class AudioService:
             return {
                 "sfx_plan": sfx_plan,
                 "sfx_clips": sfx_clips_response,
-                "merged_audio": mixed_audio_b64
+                "merged_audio_bytes": mixed_audio_bytes
             }
 
         except Exception as e:
@@ -812,64 +608,40 @@ class AudioService:
         Returns a list of: {description, start, end, sfxUrl, audio_bytes}
         """
         logger.info(f"Generating SFX clips from plan with {len(sfx_plan)} entries")
-        result = []
-        
-        for i, entry in enumerate(sfx_plan):
-            description = entry["description"]
-            logger.info(f"Generating SFX clip {i+1}/{len(sfx_plan)}: '{description}'")
-            
-            # Generate SFX using ElevenLabs sound generation
-            url = "https://api.elevenlabs.io/v1/sound-generation"
-            headers = {
-                "xi-api-key": os.getenv("ELEVENLABS_API_KEY"),
-                "Content-Type": "application/json"
-            }
-            
-            # Calculate duration
+
+        prompts = []
+        for entry in sfx_plan:
             duration = entry["end"] - entry["start"]
             duration = max(2, min(duration, 10))  # Limit between 2-10 seconds
-            logger.info(f"Calculated duration: {duration}s")
-            
-            payload = {
-                "text": f"Generate a rich, cinematic sound effect that captures: {description}. The sound should match podcast storytelling tone and not overpower speech. Use real-world textures if possible.",
+            prompts.append((
+                f"Generate a rich, cinematic sound effect that captures: {entry['description']}. The sound should match podcast storytelling tone and not overpower speech. Use real-world textures if possible.",
+                duration
+            ))
 
-                "duration_seconds": duration,
-                "prompt_influence": 1
-            }
-            
+        # Fetched concurrently (rate limited per user); effects made before come from the asset store
+        content_type = get_sfx_provider().content_type
+        generated = generate_sfx_many(prompts, user_id=current_user_id())
+
+        result = []
+        for i, (entry, sfx_bytes) in enumerate(zip(sfx_plan, generated)):
+            if not sfx_bytes:
+                logger.warning(f"Failed to generate SFX for: {entry['description']}")
+                continue
             try:
-                logger.info(f"Sending request to ElevenLabs sound generation API")
-                res = requests.post(url, headers=headers, json=payload)
-                logger.info(f"Response status: {res.status_code}")
-                logger.info(f"Response content type: {res.headers.get('Content-Type', 'unknown')}")
-            
-                if "audio/mpeg" not in res.headers.get("Content-Type", ""):
-                    logger.warning(f"Failed to generate SFX for: {description}")
-                    logger.warning(f"Response: {res.text[:200]}...")  # Log first 200 chars
-                    continue
-            
-                logger.info(f"Successfully generated SFX audio, size: {len(res.content)} bytes")
-            
-                # Convert MP3 to WAV for consistent processing
-                audio_seg = AudioSegment.from_file(BytesIO(res.content), format="mp3")
-                wav_io = BytesIO()
-                audio_seg.export(wav_io, format="wav")
-                audio_bytes = wav_io.getvalue()
-                logger.info(f"Converted to WAV, size: {len(audio_bytes)} bytes")
-        
+                # Convert to WAV for consistent processing
+                audio_bytes = decode_audio(sfx_bytes).to_wav_bytes()
+
                 # Create base64 URL for frontend
-                b64 = base64.b64encode(res.content).decode("utf-8")
-                sfx_url = f"data:audio/mpeg;base64,{b64}"
-        
+                b64 = base64.b64encode(sfx_bytes).decode("utf-8")
                 result.append({
                     **entry,
-                    "sfxUrl": sfx_url,
+                    "sfxUrl": f"data:{content_type};base64,{b64}",
                     "audio_bytes": audio_bytes
                 })
-                logger.info(f"Added SFX clip to result list")
-        
+                logger.info(f"Added SFX clip {i+1}/{len(sfx_plan)} to result list")
+
             except Exception as e:
-                logger.error(f"Error generating SFX clip for '{description}': {e}", exc_info=True)
+                logger.error(f"Error generating SFX clip for '{entry['description']}': {e}", exc_info=True)
 
         logger.info(f"Generated {len(result)} SFX clips successfully")
         return result
@@ -882,47 +654,23 @@ class AudioService:
         logger.info(f"Mixing {len(sfx_clips)} SFX clips with original audio ({len(original_audio_bytes)} bytes)")
 
         try:
-            # ✅ Convert to safe WAV path using your helper
-            wav_path = convert_audio_to_wav(original_audio_bytes, original_ext=".mp3")  # fallback ext in case unknown
-            with open(wav_path, "rb") as f:
-                safe_wav_bytes = f.read()
-            os.remove(wav_path)
-
-            # Load the properly converted WAV
-            original = AudioSegment.from_file(BytesIO(safe_wav_bytes), format="wav")
-            logger.info(f"Loaded original audio: {len(original)}ms, {original.channels}ch")
-
-            # Prepare output mix
-            mixed = original.overlay(AudioSegment.silent(duration=0))
+            # Decode any input format in memory (WAV is used as-is)
+            original = decode_audio(original_audio_bytes)
+            logger.info(f"Loaded original audio: {original.duration:.2f}s, {original.channels}ch")
 
+            stems = []
             for i, clip in enumerate(sfx_clips):
-                try:
-                    start_ms = int(clip["start"] * 1000)
-                    if start_ms >= len(original):
-                        logger.warning(f"Skipping SFX {i+1}: start time {start_ms}ms exceeds audio length {len(original)}ms")
-                        continue
-
-                    if not clip.get("audio_bytes"):
-                        logger.warning(f"Skipping SFX {i+1}: missing audio_bytes")
-                        continue
-
-                    sfx = AudioSegment.from_file(BytesIO(clip["audio_bytes"]), format="wav")
-                    sfx = sfx.fade_in(300).fade_out(300)
-                    sfx = sfx - 10  # Slightly lower volume
-                    mixed = mixed.overlay(sfx, position=start_ms)
-
-                    logger.info(f"✔️ Mixed SFX {i+1}/{len(sfx_clips)} at {start_ms}ms")
-
-                except Exception as e:
-                    logger.error(f"Error mixing SFX {i+1}: {e}", exc_info=True)
+                if not clip.get("audio_bytes"):
+                    logger.warning(f"Skipping SFX {i+1}: missing audio_bytes")
+                    continue
+                # Slightly lower volume, with short fades so effects don't click in
+                stems.append(Stem(clip["audio_bytes"], start=clip["start"], gain_db=-10,
+                                  fade_in_ms=300, fade_out_ms=300, name=f"SFX {i+1}"))
 
-            # Export result
-            output = BytesIO()
-            mixed.export(output, format="wav")
-            result_bytes = output.getvalue()
+            result_bytes, mixed_count = mix_to_wav_bytes(original, stems)
+            logger.info(f"✔️ Mixed {mixed_count}/{len(sfx_clips)} SFX clips in one pass")
 
-            # Optional: compare with original
-            if result_bytes == original_audio_bytes:
+            if mixed_count == 0:
                 logger.warning("⚠️ Final mix is identical to original. No SFX may have been applied.")
 
             return result_bytes
@@ -0,0 +1,89 @@
+# jobHandlers.py
+import logging
+
+from backend.services.audioService import AudioService
+from backend.services.transcriptionService import TranscriptionService
+from backend.services.videoService import VideoService
+from backend.repository.ai_models import get_file_by_id
+from backend.repository.edit_repository import save_transcription_edit
+
+logger = logging.getLogger(__name__)
+
+audio_service = AudioService()
+transcription_service = TranscriptionService()
+video_service = VideoService()
+
+
+def transcribe_and_save(user_id: str, episode_id: str, audio_bytes: bytes, filename: str,
+                        audio_path: str = None, file_id: str = None) -> dict:
+    """
+    Transcribe, attach sentiment and store the transcription edit (shared by /transcribe and its job).
+    audio_path / file_id: see TranscriptionService.transcribe_audio.
+    """
+    logger.info(f"Starting transcription for file: {filename}")
+    result = transcription_service.transcribe_audio(audio_bytes, filename, audio_path=audio_path, file_id=file_id)
+    logger.info("Transcription completed successfully.")
+
+    transcription_text = result["full_transcript"]
+    sentiment_result = transcription_service.get_sentiment_and_sfx(transcription_text)
+
+    save_transcription_edit(
+        user_id=user_id,
+        episode_id=episode_id,
+        transcript_text=transcription_text,
+        raw_transcript=result["raw_transcription"],
+        sentiment=sentiment_result["emotions"],
+        emotion=sentiment_result["emotions"],
+        filename=filename
+    )
+    return result
+
+
+def _load_input(payload: dict, progress):
+    progress(5, "Loading input")
+    data, stored_name = get_file_by_id(payload["input_file_id"])
+    return data, payload.get("filename") or stored_name
+
+
+# --- Handlers: (payload, progress) -> JSON-serialisable result ---
+
+def handle_transcribe(payload, progress):
+    audio_bytes, filename = _load_input(payload, progress)
+    progress(15, "Transcribing")
+    return transcribe_and_save(payload["user_id"], payload.get("episode_id"), audio_bytes, filename)
+
+
+def handle_ai_cut(payload, progress):
+    if payload.get("input_file_id"):
+        audio_bytes, filename = _load_input(payload, progress)
+    else:
+        progress(5, "Loading input")
+        audio_bytes, filename = get_file_by_id(payload["file_id"])
+    progress(15, "Analysing audio")
+    return audio_service.ai_cut_audio(audio_bytes, filename, episode_id=payload.get("episode_id"))
+
+
+def handle_voice_isolation(payload, progress):
+    audio_bytes, filename = _load_input(payload, progress)
+    progress(15, "Isolating voice")
+    return {"isolated_blob_url": audio_service.isolate_voice(audio_bytes, filename, payload["episode_id"])}
+
+
+def handle_plan_and_mix_sfx(payload, progress):
+    audio_bytes, _ = _load_input(payload, progress)
+    progress(15, "Planning and mixing sound effects")
+    return audio_service.plan_and_mix_sfx(audio_bytes)
+
+
+def handle_video_enhance(payload, progress):
+    progress(10, "Enhancing video")
+    return {"processed_video_id": video_service.enhance_video(payload["video_id"])}
+
+
+JOB_HANDLERS = {
+    "transcribe": handle_transcribe,
+    "ai_cut": handle_ai_cut,
+    "voice_isolation": handle_voice_isolation,
+    "plan_and_mix_sfx": handle_plan_and_mix_sfx,
+    "video_enhance": handle_video_enhance,
+}
@@ -0,0 +1,256 @@
+# jobService.py
+import os
+import sys
+import json
+import uuid
+import atexit
+import socket
+import logging
+import threading
+import subprocess
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bson
+from flask import Flask, g, jsonify, request
+
+from backend.repository.ai_models import save_file, get_file_data, delete_file
+from backend.utils.upload_ingest import ingest_upload
+from backend.repository.job_repository import (
+    create_job, get_job, update_job, claim_next_job, heartbeat_jobs,
+    release_running_job, requeue_stale_jobs, ensure_job_indexes
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "2"))
+# Start a worker process next to the web server. Only for single-process web deployments: every web
+# process would otherwise start its own pool. Elsewhere run backend/scripts/job_worker.py separately.
+JOB_EMBEDDED_WORKER = os.getenv("JOB_EMBEDDED_WORKER", "false").lower() in ("true", "1", "yes")
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+# The coordinator heartbeats running jobs, so a job hung inside a child would never go stale;
+# past this runtime it is failed and the pool recycled. 0 disables the limit.
+JOB_MAX_RUNTIME_SECONDS = int(os.getenv("JOB_MAX_RUNTIME_SECONDS", "7200"))
+# Results bigger than this go to GridFS instead of the job document (16MB BSON limit).
+JOB_INLINE_RESULT_BYTES = int(os.getenv("JOB_INLINE_RESULT_BYTES", str(8 * 1024 * 1024)))
+
+WORKER_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "scripts", "job_worker.py"))
+
+
+def async_requested() -> bool:
+    """True when the caller asked for a job id instead of waiting (?async=1, form or JSON field)."""
+    value = request.args.get("async") or request.form.get("async")
+    if value is None and request.is_json:
+        value = (request.get_json(silent=True) or {}).get("async")
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def submit_job(user_id: str, job_type: str, payload: dict) -> dict:
+    from backend.services.jobHandlers import JOB_HANDLERS
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    job = create_job(user_id, job_type, payload)
+    logger.info(f"Queued {job_type} job {job['_id']} for user {user_id}")
+    return job
+
+
+def submit_upload_job(user_id: str, job_type: str, upload, filename: str, **payload) -> dict:
+    """
+    Park an uploaded file (request upload or bytes) in GridFS, streamed in chunks, and queue a job
+    that reads it; the file is removed when the job ends.
+    """
+    ingested = ingest_upload(upload, filename, target="gridfs", probe=False,
+                             metadata={"type": "job_input", "job_type": job_type})
+    try:
+        return submit_job(user_id, job_type, dict(payload, input_file_id=ingested.file_id, filename=filename))
+    except Exception:
+        delete_file(ingested.file_id)
+        raise
+
+
+def job_accepted_response(job: dict):
+    return jsonify({
+        "job_id": job["_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['_id']}",
+    }), 202
+
+
+def serialize_job(job: dict, include_result: bool = True) -> dict:
+    data = {
+        "job_id": job["_id"],
+        "type": job["type"],
+        "status": job["status"],
+        "progress": job.get("progress", 0),
+        "message": job.get("message"),
+        "error": job.get("error"),
+        "created_at": job["createdAt"].isoformat() if job.get("createdAt") else None,
+        "finished_at": job["finishedAt"].isoformat() if job.get("finishedAt") else None,
+    }
+    if include_result and job["status"] == "completed":
+        if job.get("resultFileId"):
+            data["result"] = json.loads(get_file_data(job["resultFileId"]))
+        else:
+            data["result"] = job.get("result")
+    return data
+
+
+# --- Worker side ---
+
+_worker_app = None
+
+
+def _get_worker_app():
+    """Bare Flask app so services that read flask.g work outside a request."""
+    global _worker_app
+    if _worker_app is None:
+        _worker_app = Flask("job_worker")
+    return _worker_app
+
+
+def _store_result(job_id: str, result) -> dict:
+    if len(bson.encode({"result": result})) <= JOB_INLINE_RESULT_BYTES:
+        return {"result": result, "resultFileId": None}
+    file_id = save_file(json.dumps(result).encode("utf-8"), filename=f"job_{job_id}.json", metadata={"type": "job_result"})
+    return {"result": None, "resultFileId": file_id}
+
+
+def run_job(job_id: str) -> str:
+    """Execute one claimed job. Runs inside a worker process; returns the final status."""
+    from backend.services.jobHandlers import JOB_HANDLERS
+
+    job = get_job(job_id)
+    if not job:
+        return "missing"
+    payload = dict(job.get("payload") or {}, user_id=job["userId"])
+
+    def progress(percent, message=None):
+        update_job(job_id, {"progress": int(percent), "message": message, "heartbeatAt": datetime.utcnow()})
+
+    try:
+        with _get_worker_app().app_context():
+            g.user_id = job["userId"]
+            result = JOB_HANDLERS[job["type"]](payload, progress)
+        update_job(job_id, dict(
+            _store_result(job_id, result),
+            status="completed", progress=100, message="Done", finishedAt=datetime.utcnow()
+        ))
+        logger.info(f"Job {job_id} ({job['type']}) completed")
+        return "completed"
+    except Exception as e:
+        logger.error(f"Job {job_id} ({job['type']}) failed: {e}", exc_info=True)
+        update_job(job_id, {"status": "failed", "error": str(e), "message": "Failed", "finishedAt": datetime.utcnow()})
+        return "failed"
+    finally:
+        if payload.get("input_file_id"):
+            delete_file(payload["input_file_id"])
+
+
+class JobWorker:
+    """
+    Claims queued jobs from MongoDB and runs them on a bounded process pool.
+    Any number of these can run, on any host, against the same database.
+    """
+
+    def __init__(self, processes: int = None, job_types: list = None, poll_seconds: float = None):
+        self.processes = processes or JOB_WORKER_PROCESSES
+        self.job_types = job_types
+        self.poll_seconds = poll_seconds or JOB_POLL_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _reap(self, running: dict, started: dict):
+        for future in [f for f in running if f.done()]:
+            job_id = running.pop(future)
+            started.pop(job_id, None)
+            try:
+                future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} crashed its worker: {e}", exc_info=True)
+                update_job(job_id, {"status": "failed", "error": str(e), "finishedAt": datetime.utcnow()})
+
+    @staticmethod
+    def _overdue(started: dict) -> set:
+        if JOB_MAX_RUNTIME_SECONDS <= 0:
+            return set()
+        now = time.monotonic()
+        return {job_id for job_id, t in started.items() if now - t > JOB_MAX_RUNTIME_SECONDS}
+
+    def _recycle(self, pool: ProcessPoolExecutor, running: dict, overdue: set):
+        """
+        Fail the overdue jobs and kill the pool's processes: a job stuck in a child
+        cannot be cancelled on its own. The other jobs it was running are requeued.
+        """
+        for job_id in running.values():
+            if job_id in overdue:
+                failed = release_running_job(job_id, {
+                    "status": "failed", "message": "Failed", "finishedAt": datetime.utcnow(),
+                    "error": f"Job exceeded the maximum runtime of {JOB_MAX_RUNTIME_SECONDS}s",
+                })
+                input_file_id = ((get_job(job_id) or {}).get("payload") or {}).get("input_file_id")
+                if failed and input_file_id:
+                    delete_file(input_file_id)
+            else:
+                release_running_job(job_id, {"status": "queued", "workerId": None, "message": "Requeued"})
+        logger.error(f"Job worker: {len(overdue)} job(s) over {JOB_MAX_RUNTIME_SECONDS}s; recycling the pool")
+        # No public way to kill a busy worker; without this, leaving the pool would wait for the hung job
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+        running.clear()
+
+    def run_forever(self):
+        ensure_job_indexes()
+        logger.info(f"Job worker {self.worker_id} started with {self.processes} processes")
+        # spawn: a fresh interpreter per process, no inherited Mongo sockets or eventlet state.
+        context = multiprocessing.get_context("spawn")
+        while not self._stop.is_set():
+            running = {}
+            started = {}
+            try:
+                with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as pool:
+                    while not self._stop.is_set():
+                        self._reap(running, started)
+                        overdue = self._overdue(started)
+                        if overdue:
+                            self._recycle(pool, running, overdue)
+                            break
+                        heartbeat_jobs(running.values())
+                        requeue_stale_jobs(datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS), JOB_MAX_ATTEMPTS)
+
+                        while len(running) < self.processes:
+                            job = claim_next_job(self.worker_id, self.job_types)
+                            if not job:
+                                break
+                            running[pool.submit(run_job, job["_id"])] = job["_id"]
+                            started[job["_id"]] = time.monotonic()
+
+                        self._stop.wait(self.poll_seconds)
+            except BrokenProcessPool:
+                # A process died hard (e.g. OOM). Its jobs are requeued once their heartbeat goes stale.
+                logger.error(f"Job worker pool broke with {len(running)} running jobs; restarting pool")
+
+
+_embedded_worker = None
+
+
+def start_embedded_worker():
+    """Launch the job worker as a child process of the web server (JOB_EMBEDDED_WORKER)."""
+    global _embedded_worker
+    if not JOB_EMBEDDED_WORKER or _embedded_worker is not None:
+        return None
+
+    _embedded_worker = subprocess.Popen([sys.executable, WORKER_SCRIPT, "--processes", str(JOB_WORKER_PROCESSES)])
+    atexit.register(_embedded_worker.terminate)
+    logger.info(f"Started embedded job worker (pid {_embedded_worker.pid})")
+    return _embedded_worker
@@ -0,0 +1,369 @@
+# pipelineService.py
+import os
+import base64
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from backend.services.audioService import AudioService
+from backend.services.transcriptionService import TranscriptionService
+from backend.services.creditService import consume_credits
+from backend.utils.audio_io import PcmAudio, decode_audio, decode_audio_file
+from backend.utils.audio_cuts import merge_keep_ranges, cut_to_pcm
+from backend.utils.ai_utils import (
+    enhance_audio_bytes, get_osint_info, create_podcast_scripts_paid, text_to_speech_with_elevenlabs
+)
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+
+audio_service = AudioService()
+transcription_service = TranscriptionService()
+
+
+class PipelineStepError(RuntimeError):
+    def __init__(self, step: str, error: Exception):
+        super().__init__(str(error))
+        self.step = step
+        self.error = error
+
+
+class AudioBuffer:
+    """
+    One version of the episode audio: decoded PCM plus its WAV encoding, which is
+    produced at most once and shared by every stage that needs bytes.
+    """
+
+    def __init__(self, pcm: PcmAudio, wav: bytes = None, retimed: bool = False):
+        self.pcm = pcm
+        self._wav = wav
+        self._lock = threading.Lock()
+        # True once a cut has moved audio relative to earlier word timestamps.
+        self.retimed = retimed
+
+    @classmethod
+    def from_bytes(cls, data: bytes, retimed: bool = False) -> "AudioBuffer":
+        return cls(decode_audio(data), retimed=retimed)
+
+    @classmethod
+    def from_path(cls, path: str) -> "AudioBuffer":
+        return cls(decode_audio_file(path))
+
+    def wav_bytes(self) -> bytes:
+        with self._lock:
+            if self._wav is None:
+                self._wav = self.pcm.to_wav_bytes()
+            return self._wav
+
+
+class Stage:
+    def __init__(self, name: str, run: Callable, reads=(), produces=(), credit_type: Optional[str] = None):
+        self.name = name
+        self.run = run
+        self.reads = tuple(reads)
+        self.produces = tuple(produces)
+        self.credit_type = credit_type
+
+
+def _require_transcript(step: str, inputs: dict) -> str:
+    transcript = inputs.get("transcript")
+    if not transcript:
+        raise ValueError(f"Step '{step}' requires transcript. Ensure 'transcribe', 'analyze_audio' or 'ai_cut' is included.")
+    return transcript
+
+
+# --- Stage bodies: (inputs, options) -> outputs ---
+
+def _transcribe(inputs, options):
+    audio = inputs["audio"]
+    result = transcription_service.transcribe_audio(audio.wav_bytes(), options["filename"])
+    return {
+        "transcript": result.get("full_transcript", ""),
+        "raw_transcription": result.get("raw_transcription", ""),
+        "word_timestamps": result.get("word_timestamps", []),
+        # Timestamps are only valid for this version of the audio and anything that keeps its timing.
+        "word_timestamps_retimed": audio.retimed,
+    }
+
+
+def _voice_isolation(inputs, options):
+    elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not elevenlabs_api_key:
+        raise RuntimeError("Missing ELEVENLABS_API_KEY environment variable")
+
+    audio = inputs["audio"]
+    response = requests.post(
+        "https://api.elevenlabs.io/v1/audio-isolation",
+        headers={"xi-api-key": elevenlabs_api_key},
+        files={"audio": (options["filename"], audio.wav_bytes())}
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Voice isolation failed: {response.status_code} {response.text}")
+    return {"audio": AudioBuffer.from_bytes(response.content, retimed=audio.retimed)}
+
+
+def _enhance(inputs, options):
+    audio = inputs["audio"]
+    return {"audio": AudioBuffer.from_bytes(enhance_audio_bytes(audio.wav_bytes()), retimed=audio.retimed)}
+
+
+def _analyze_audio(inputs, options):
+    result = audio_service.analyze_audio(inputs["audio"].wav_bytes())
+    return {"transcript": result.get("transcript", ""), "analysis": result}
+
+
+def _ai_cut(inputs, options):
+    audio = inputs["audio"]
+    result = audio_service.ai_cut_audio(audio.wav_bytes(), options["filename"])
+    outputs = {
+        "transcript": result.get("cleaned_transcript", ""),
+        "cuts": result.get("suggested_cuts", []),
+    }
+
+    merged = merge_keep_ranges(outputs["cuts"])
+    if not merged:
+        logger.warning("No suggested cuts found in AI cut result")
+        return outputs
+
+    outputs["audio"] = AudioBuffer(cut_to_pcm(audio.pcm, merged), retimed=True)
+    return outputs
+
+
+def _cut_audio(inputs, options):
+    merged = merge_keep_ranges(options["cuts"])
+    if not merged:
+        raise ValueError("No valid cuts provided")
+    return {"audio": AudioBuffer(cut_to_pcm(inputs["audio"].pcm, merged), retimed=True)}
+
+
+def _plan_and_mix_sfx(inputs, options):
+    audio = inputs["audio"]
+    word_timestamps = None
+    # Reuse the transcription when the audio still has the timing it was transcribed with.
+    if inputs.get("word_timestamps") and audio.retimed == inputs.get("word_timestamps_retimed"):
+        word_timestamps = [
+            {"text": w["word"], "start": w["start"], "end": w["end"]}
+            for w in inputs["word_timestamps"]
+            if w.get("word", "").strip() and "start" in w and "end" in w
+        ]
+
+    result = audio_service.plan_and_mix_sfx_raw(audio.wav_bytes(), word_timestamps)
+    outputs = {"sfx_plan": result.get("sfx_plan", []), "sfx_clips": result.get("sfx_clips", [])}
+    if result.get("merged_audio_bytes"):
+        outputs["audio"] = AudioBuffer.from_bytes(result["merged_audio_bytes"], retimed=audio.retimed)
+    else:
+        logger.warning("No valid mixed audio returned from plan_and_mix_sfx")
+    return outputs
+
+
+def _clean_transcript(inputs, options):
+    return {"clean_transcript": transcription_service.get_clean_transcript(_require_transcript("clean_transcript", inputs))}
+
+
+def _show_notes(inputs, options):
+    return {"show_notes": transcription_service.get_show_notes(_require_transcript("generate_show_notes", inputs))}
+
+
+def _ai_suggestions(inputs, options):
+    return {"ai_suggestions": transcription_service.get_ai_suggestions(_require_transcript("ai_suggestions", inputs))}
+
+
+def _quotes(inputs, options):
+    return {"quotes": transcription_service.get_quotes(_require_transcript("generate_quotes", inputs))}
+
+
+def _quote_images(inputs, options):
+    quotes = inputs.get("quotes") or ""
+    if not quotes:
+        raise ValueError("No quotes found to generate images from")
+    quotes_list = [q.strip() for q in quotes.split("\n\n") if q.strip()]
+    return {"quote_images": transcription_service.get_quote_images(quotes_list, method="local")}
+
+
+def _osint_lookup(inputs, options):
+    guest_name = options.get("osint_query", "")
+    if not guest_name:
+        raise ValueError("Missing guest name for OSINT")
+    return {"osint": get_osint_info(guest_name)}
+
+
+def _intro_outro(inputs, options):
+    guest_name = options.get("osint_query", "")
+    raw_transcript = inputs.get("raw_transcription") or ""
+    if not guest_name or not raw_transcript:
+        raise ValueError("Missing guest name or raw transcript")
+    osint_data = get_osint_info(guest_name)
+    return {"intro_outro_script": create_podcast_scripts_paid(osint_data, guest_name, raw_transcript)}
+
+
+def _intro_outro_to_speech(inputs, options):
+    script = inputs.get("intro_outro_script") or ""
+    if not script:
+        raise ValueError("Intro/outro script is missing")
+    return {"intro_outro_audio": text_to_speech_with_elevenlabs(script)}
+
+
+def _audio_clip(inputs, options):
+    transcript = inputs.get("transcript") or ""
+    if not transcript:
+        raise ValueError("Transcript missing for translation")
+    return {"translated_clip_audio": transcription_service.generate_audio_from_translated(transcript, "English")}
+
+
+# Listed in the order the steps would run one after another; a step sees the
+# artifacts of the last earlier step that produced them.
+STAGES = [
+    Stage("transcribe", _transcribe, ["audio"], ["transcript", "raw_transcription", "word_timestamps", "word_timestamps_retimed"], "transcription"),
+    Stage("voice_isolation", _voice_isolation, ["audio"], ["audio"], "voice_isolation"),
+    Stage("enhance", _enhance, ["audio"], ["audio"], "audio_enhancement"),
+    Stage("analyze_audio", _analyze_audio, ["audio"], ["transcript", "analysis"], "ai_audio_analysis"),
+    Stage("ai_cut", _ai_cut, ["audio"], ["audio", "transcript", "cuts"], "ai_audio_cutting"),
+    Stage("clean_transcript", _clean_transcript, ["transcript"], ["clean_transcript"], "clean_transcript"),
+    Stage("generate_show_notes", _show_notes, ["transcript"], ["show_notes"], "show_notes"),
+    Stage("ai_suggestions", _ai_suggestions, ["transcript"], ["ai_suggestions"], "ai_suggestions"),
+    Stage("generate_quotes", _quotes, ["transcript"], ["quotes"], "ai_quotes"),
+    Stage("generate_quote_images", _quote_images, ["quotes"], ["quote_images"], "ai_quote_images"),
+    Stage("osint_lookup", _osint_lookup, [], ["osint"], "ai_osint"),
+    Stage("generate_intro_outro", _intro_outro, ["raw_transcription"], ["intro_outro_script"], "ai_intro"),
+    Stage("intro_outro_to_speech", _intro_outro_to_speech, ["intro_outro_script"], ["intro_outro_audio"], "ai_intro"),
+    Stage("generate_audio_clip", _audio_clip, ["transcript"], ["translated_clip_audio"], "audio_clip"),
+    Stage("cut_audio", _cut_audio, ["audio"], ["audio"], "audio_cutting"),
+    Stage("plan_and_mix_sfx", _plan_and_mix_sfx, ["audio", "word_timestamps", "word_timestamps_retimed"], ["audio", "sfx_plan", "sfx_clips"], "audio_clip"),
+]
+
+STAGE_BY_NAME = {stage.name: stage for stage in STAGES}
+VALID_STEPS = list(STAGE_BY_NAME)
+
+
+def plan_stages(steps: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    For every selected stage, map each artifact it reads to the stage whose
+    output it consumes (None = the uploaded audio / not produced). Stages only
+    depend on the producers they actually read from, so e.g. show notes, quotes
+    and OSINT run side by side once the transcript exists.
+    """
+    selected = [stage for stage in STAGES if stage.name in set(steps)]
+    last_producer: Dict[str, str] = {}
+    plan = {}
+    for stage in selected:
+        plan[stage.name] = {artifact: last_producer.get(artifact) for artifact in stage.reads}
+        for artifact in stage.produces:
+            last_producer[artifact] = stage.name
+    return plan
+
+
+class AudioPipeline:
+    """
+    Runs the selected pipeline steps as a dependency graph over one in-memory
+    audio buffer. Audio is decoded once, stages pass PCM between them, and the
+    final audio is encoded once by the caller.
+    """
+
+    def __init__(self, user_id: str, audio, filename: str = "pipeline_audio.wav",
+                 cuts: Optional[list] = None, osint_query: str = "", max_workers: int = None):
+        self.user_id = user_id
+        self.options = {"filename": filename, "cuts": cuts or [], "osint_query": osint_query}
+        # audio is the upload as bytes, or the path of a local copy
+        self.source = AudioBuffer.from_path(audio) if isinstance(audio, str) else AudioBuffer.from_bytes(audio)
+        self.max_workers = max_workers or PIPELINE_MAX_WORKERS
+        self.outputs: Dict[str, dict] = {}
+        self.steps_applied: List[str] = []
+
+    def _inputs_for(self, sources: Dict[str, Optional[str]]) -> dict:
+        inputs = {}
+        for artifact, producer in sources.items():
+            if producer is None:
+                inputs[artifact] = self.source if artifact == "audio" else None
+            else:
+                inputs[artifact] = self.outputs[producer].get(artifact)
+                # A producer may skip an output (e.g. ai_cut with no cuts); fall back further up the chain.
+                if inputs[artifact] is None and artifact == "audio":
+                    inputs[artifact] = self._resolve_audio(producer)
+        return inputs
+
+    def _resolve_audio(self, producer: str) -> AudioBuffer:
+        names = [stage.name for stage in STAGES]
+        for name in reversed(names[:names.index(producer)]):
+            if name in self.outputs and self.outputs[name].get("audio") is not None:
+                return self.outputs[name]["audio"]
+        return self.source
+
+    def _run_stage(self, stage: Stage, inputs: dict) -> dict:
+        logger.info(f"Processing step: {stage.name}")
+        return stage.run(inputs, self.options)
+
+    def run(self, steps: List[str]) -> dict:
+        plan = plan_stages(steps)
+        pending = dict(plan)
+        running = {}
+        failure = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if failure is None:
+                    for name, sources in list(pending.items()):
+                        producers = {p for p in sources.values() if p is not None}
+                        if producers <= set(self.outputs):
+                            del pending[name]
+                            future = pool.submit(self._run_stage, STAGE_BY_NAME[name], self._inputs_for(sources))
+                            running[future] = name
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                        # Charged here on the coordinating thread, one stage at a time, and only
+                        # after the stage succeeded: consume_credits is a read-modify-write.
+                        credit_type = STAGE_BY_NAME[name].credit_type
+                        if credit_type:
+                            consume_credits(self.user_id, credit_type)
+                        self.outputs[name] = result
+                    except Exception as e:
+                        logger.error(f"Error in step '{name}': {str(e)}", exc_info=True)
+                        if failure is None:
+                            failure = PipelineStepError(name, e)
+
+        self.steps_applied = [stage.name for stage in STAGES if stage.name in self.outputs]
+        if failure is not None:
+            raise failure
+        return self.metadata()
+
+    @property
+    def final_audio(self) -> AudioBuffer:
+        audio = self.source
+        for stage in STAGES:
+            if self.outputs.get(stage.name, {}).get("audio") is not None:
+                audio = self.outputs[stage.name]["audio"]
+        return audio
+
+    def metadata(self) -> dict:
+        """Artifacts in the shape the /audio/process_pipeline response uses."""
+        merged = {}
+        for stage in STAGES:
+            for key, value in self.outputs.get(stage.name, {}).items():
+                if value is not None:
+                    merged[key] = value
+
+        metadata = {
+            "steps_applied": list(self.steps_applied),
+            "transcript": merged.get("transcript", ""),
+            "cuts": merged.get("cuts", []),
+        }
+        for key in ("raw_transcription", "analysis", "clean_transcript", "show_notes", "ai_suggestions",
+                    "quotes", "quote_images", "osint", "intro_outro_script", "sfx_plan", "sfx_clips"):
+            if key in merged:
+                metadata[key] = merged[key]
+
+        # Generated speech is only base64-encoded here, once, for the response.
+        if merged.get("intro_outro_audio"):
+            metadata["intro_outro_audio_url"] = "data:audio/mp3;base64," + base64.b64encode(merged["intro_outro_audio"]).decode("utf-8")
+        if merged.get("translated_clip_audio"):
+            metadata["translated_clip_url"] = "data:audio/mp3;base64," + base64.b64encode(merged["translated_clip_audio"]).decode("utf-8")
+        return metadata
@@ -1,11 +1,14 @@
 import os
+import base64
+import hashlib
 import datetime
 import requests
 import time  # This is already imported globally
 from flask import current_app
 from backend.repository.episode_repository import EpisodeRepository
 from backend.repository.podcast_repository import PodcastRepository
-from azure.storage.blob import BlobServiceClient
+from backend.utils.blob_storage import blob_gateway, get_blob_service_client
+from backend.utils.rss_feed_builder import build_feed, episode_sort_key
 
 class PublishService:
     def __init__(self):
@@ -111,19 +114,9 @@ class PublishService:
             # 4. Upload RSS feed to Blob Storage
             current_app.logger.info(f"Uploading RSS feed to blob storage for podcast {podcast_id}")
             rss_blob_url = self._upload_rss_to_blob(podcast_id, rss_xml, user_id)
-            log_messages.append(f"RSS feed uploaded to {rss_blob_url}")
+            # The upload carries a Content-MD5 the storage service checks, so no re-download is needed
+            log_messages.append(f"RSS feed uploaded to {rss_blob_url} (Content-MD5 verified)")
             
-            # Final verification - fetch and parse the uploaded RSS to confirm episode is there
-            try:
-                import requests
-                rss_response = requests.get(rss_blob_url, timeout=10)
-                if rss_response.status_code == 200 and episode.get('title') and episode['title'] in rss_response.text:
-                    log_messages.append(f"FINAL VERIFICATION: Episode '{episode['title']}' confirmed in uploaded RSS feed at {rss_blob_url}")
-                else:
-                    log_messages.append(f"FINAL VERIFICATION FAILED: Episode not found in uploaded RSS feed")
-            except Exception as verify_error:
-                log_messages.append(f"Could not verify uploaded RSS feed: {verify_error}")
-
             return {
                 "success": True,
                 "message": f"Episode '{episode.get('title', episode_id)}' processed for publishing.",
@@ -172,153 +165,28 @@ class PublishService:
 
         # Log all episodes before filtering
         for ep in final_episodes_list:
-            current_app.logger.info(f"RSS: Episode in list - ID: {ep.get('_id')}, Title: '{ep.get('title')}', Status: '{ep.get('status')}'")
-
-        # Fix the sort function to handle None values safely
-        def safe_sort_key(ep):
-            publish_date = ep.get('publishDate')
-            if not publish_date:
-                return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
-                
-            if isinstance(publish_date, str):
-                try:
-                    dt = datetime.datetime.fromisoformat(publish_date.replace('Z', '+00:00'))
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=datetime.timezone.utc)
-                    return dt
-                except ValueError:
-                    return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
-            
-            if isinstance(publish_date, datetime.datetime):
-                if publish_date.tzinfo is None:
-                    publish_date = publish_date.replace(tzinfo=datetime.timezone.utc)
-                return publish_date
-                
-            return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
-            
-        # Replace the lambda sort with our safe sort function
-        final_episodes_list.sort(key=safe_sort_key, reverse=True)
-        current_app.logger.info(f"RSS: Total episodes prepared for feed generation: {len(final_episodes_list)}")
-
-        from email.utils import format_datetime
-
-        def format_duration(seconds):
-            if not seconds or not isinstance(seconds, (int, float)) or seconds < 0:
-                return "00:00:00"
-            try:
-                seconds = int(seconds)
-                hours = seconds // 3600
-                minutes = (seconds % 3600) // 60
-                secs = seconds % 60
-                return f"{hours:02}:{minutes:02}:{secs:02}"
-            except:
-                return "00:00:00"
-
-        items_xml = ""
-        published_episodes_count = 0
-        for ep_idx, ep in enumerate(final_episodes_list):
-            current_ep_status_for_rss = ep.get("status", "").lower()
-            current_app.logger.debug(f"RSS item check [{ep_idx}]: ID {ep.get('_id')}, Title '{ep.get('title', 'N/A')}', Status for RSS '{current_ep_status_for_rss}'")
-            if current_ep_status_for_rss == "published":
-                published_episodes_count += 1
-                current_app.logger.info(f"RSS: Including episode {ep.get('_id')} - '{ep.get('title')}' in RSS feed (status: {current_ep_status_for_rss})")
-                pub_date_str = ""
-                try:
-                    pub_date_obj = ep.get('publishDate')
-                    if isinstance(pub_date_obj, str):
-                        pub_date_obj = datetime.datetime.fromisoformat(pub_date_obj.replace('Z', '+00:00'))
-                    if isinstance(pub_date_obj, datetime.datetime):
-                        if pub_date_obj.tzinfo is None:
-                            pub_date_obj = pub_date_obj.replace(tzinfo=datetime.timezone.utc)
-                        pub_date_str = format_datetime(pub_date_obj)
-                except Exception as e:
-                    current_app.logger.error(f"Error formatting pubDate for episode {ep.get('_id')}: {e}")
-
-                episode_image = ep.get('imageUrl', podcast.get('logoUrl', ''))
-                episode_keywords = ", ".join(ep.get('keywords', [])) if ep.get('keywords') else ""
-
-                items_xml += f"""
-                <item>
-                    <title><![CDATA[{ep.get('title', 'No Title')}]]></title>
-                    <description><![CDATA[{ep.get('description', '')}]]></description>
-                    <itunes:summary><![CDATA[{ep.get('summary', ep.get('description', ''))}]]></itunes:summary>
-                    <itunes:subtitle><![CDATA[{ep.get('subtitle', '')}]]></itunes:subtitle>
-                    <enclosure url="{ep.get('audioUrl', '')}" length="{ep.get('fileSize', 0) or 0}" type="{ep.get('fileType', 'audio/mpeg')}" />
-                    <guid isPermaLink="false">{ep.get('_id', '')}</guid>
-                    <pubDate>{pub_date_str}</pubDate>
-                    <itunes:duration>{format_duration(ep.get('duration'))}</itunes:duration>
-                    <itunes:explicit>{"yes" if ep.get('explicit') else "no"}</itunes:explicit>
-                    <itunes:episode>{ep.get('episode', '')}</itunes:episode>
-                    <itunes:season>{ep.get('season', '')}</itunes:season>
-                    <itunes:episodeType>{ep.get('episodeType', 'full')}</itunes:episodeType>
-                    {f'<itunes:image href="{episode_image}" />' if episode_image else ''}
-                    {f'<link>{ep.get("link", "")}</link>' if ep.get("link") else ''}
-                    {f'<itunes:keywords>{episode_keywords}</itunes:keywords>' if episode_keywords else ''}
-                    <itunes:author><![CDATA[{ep.get('author', podcast.get('author', podcast.get('ownerName', '')))}]]></itunes:author>
-                </item>
-                """
-            else:
-                current_app.logger.debug(f"RSS: Excluding episode {ep.get('_id')} - '{ep.get('title')}' from RSS feed (status: {current_ep_status_for_rss})")
+            current_app.logger.debug(f"RSS: Episode in list - ID: {ep.get('_id')}, Title: '{ep.get('title')}', Status: '{ep.get('status')}'")
 
-        current_app.logger.info(f"RSS: Total published episodes included in RSS feed: {published_episodes_count}")
-
-        # Podcast categories
-        categories_xml = ""
-        podcast_categories = podcast.get('category')
-        if isinstance(podcast_categories, str) and podcast_categories:
-            categories_xml += f'<itunes:category text="{podcast_categories.strip()}" />\n'
-        elif isinstance(podcast_categories, list):
-            for cat_obj in podcast_categories:
-                if isinstance(cat_obj, dict) and cat_obj.get('text'):
-                    main_cat_text = cat_obj['text'].strip()
-                    sub_cat_xml = ""
-                    if cat_obj.get('subcategory') and isinstance(cat_obj['subcategory'], dict) and cat_obj['subcategory'].get('text'):
-                        sub_cat_text = cat_obj['subcategory']['text'].strip()
-                        sub_cat_xml = f'<itunes:category text="{sub_cat_text}" />'
-                    categories_xml += f'<itunes:category text="{main_cat_text}">{sub_cat_xml}</itunes:category>\n'
+        final_episodes_list.sort(key=episode_sort_key, reverse=True)
+        published_episodes = [ep for ep in final_episodes_list if (ep.get("status") or "").lower() == "published"]
+        current_app.logger.info(f"RSS: Total published episodes included in RSS feed: {len(published_episodes)} of {len(final_episodes_list)}")
 
         # Construct the full RSS feed URL for atom:link
         full_feed_url = ""
         if self.rss_feed_base_url:
             full_feed_url = self.rss_feed_base_url.replace("<g.user_id>", str(user_id)).replace("<podcast_id>", str(podcast_id)) + "feed.xml"
 
-        rss_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <rss version="2.0"
-             xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"
-             xmlns:content="http://purl.org/rss/1.0/modules/content/"
-             xmlns:atom="http://www.w3.org/2005/Atom">
-        <channel>
-            <title><![CDATA[{podcast.get('podName', 'No Podcast Title')}]]></title>
-            <link>{podcast.get('podUrl', '')}</link>
-            <description><![CDATA[{podcast.get('description', '')}]]></description>
-            <language>{podcast.get('language', 'en-us')}</language>
-            <copyright><![CDATA[{podcast.get('copyright_info', f'© {datetime.datetime.now().year} {podcast.get("ownerName", "")}')}]]></copyright>
-            <lastBuildDate>{format_datetime(datetime.datetime.now(datetime.timezone.utc))}</lastBuildDate>
-            {f'<atom:link href="{full_feed_url}" rel="self" type="application/rss+xml" />' if full_feed_url else ''}
-            <itunes:author><![CDATA[{podcast.get('author', podcast.get('ownerName', ''))}]]></itunes:author>
-            <itunes:summary><![CDATA[{podcast.get('description', '')}]]></itunes:summary>
-            <itunes:type>{podcast.get('itunes_type', 'episodic')}</itunes:type>
-            <itunes:owner>
-                <itunes:name><![CDATA[{podcast.get('ownerName', '')}]]></itunes:name>
-                <itunes:email>{podcast.get('email', '')}</itunes:email>
-            </itunes:owner>
-            {f'<itunes:image href="{podcast.get("logoUrl", "")}" />' if podcast.get("logoUrl") else ''}
-            <itunes:explicit>{"yes" if podcast.get('explicit') else "no"}</itunes:explicit>
-            {categories_xml}
-            {items_xml}
-        </channel>
-        </rss>
-        """
-        return rss_xml.strip()
+        # Items are rendered once per episode version and reused across publishes (see rss_feed_builder)
+        return build_feed(podcast, published_episodes, full_feed_url)
 
     def _upload_rss_to_blob(self, podcast_id, rss_xml, user_id=None):
         """
-        Uploads the RSS XML to Azure Blob Storage at the path matching RSS_FEED_BASE_URL.
+        Uploads the RSS XML to Blob Storage at the path matching RSS_FEED_BASE_URL.
+        The Content-MD5 sent with it is checked by the service, so a corrupted upload fails here.
         """
-        blob_service_client = BlobServiceClient.from_connection_string(self.azure_conn_str)
         if not user_id:
             raise Exception("user_id is required to build the RSS blob path.")
-        
+
         # The blob_path should be relative to the container.
         blob_path = f"users/{user_id}/podcasts/{podcast_id}/rss/feed.xml"
         container_name = self.rss_blob_container
@@ -327,46 +195,21 @@ class PublishService:
         if not container_name:
             raise Exception("AZURE_STORAGE_CONTAINER_NAME is not set in environment variables.")
 
-        current_app.logger.info(f"Attempting to upload RSS to container: '{container_name}', blob path: '{blob_path}'")
-
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-        blob_client.upload_blob(rss_xml, overwrite=True, content_type="application/rss+xml")
-        
-        # Dynamically construct the public URL by replacing placeholders in RSS_FEED_BASE_URL
-        # Ensure RSS_FEED_BASE_URL is correctly defined, e.g.,
-        # https://<ACCOUNT_NAME>.blob.core.windows.net/<CONTAINER_NAME>/users/<g.user_id>/podcasts/<podcast_id>/
-        # The feed_url should then append "feed.xml" to this base.
-        
-        # The existing logic for feed_url construction seems to assume RSS_FEED_BASE_URL
-        # already includes the account and container, and ends just before the user/podcast part.
-        # Example: RSS_FEED_BASE_URL="https://podmanagerstorage.blob.core.windows.net/podmanagerfiles/"
-        # Then the path part would be "users/<g.user_id>/podcasts/<podcast_id>/feed.xml"
-        # Let's adjust the feed_url construction to be more robust if RSS_FEED_BASE_URL might vary.
-
-        # Assuming RSS_FEED_BASE_URL is like: "https://<ACCOUNT_NAME>.blob.core.windows.net/<CONTAINER_NAME>/"
-        # And the blob_path is "users/.../feed.xml"
-        # A more direct construction of the public URL:
-        account_name = blob_service_client.account_name
-        public_url_base = f"https://{account_name}.blob.core.windows.net/{container_name}/"
-        
-        feed_url = public_url_base + blob_path # blob_path already includes "users/.../feed.xml"
-
-        # If your RSS_FEED_BASE_URL is already structured to include the dynamic parts,
-        # the original replacement logic is fine, but ensure it's correct.
-        # For now, using the direct construction above for clarity.
-        # If you revert, ensure RSS_FEED_BASE_URL is like:
-        # "https://podmanagerstorage.blob.core.windows.net/podmanagerfiles/users/<g.user_id>/podcasts/<podcast_id>/"
-        # and then:
-        # feed_url = self.rss_feed_base_url.replace("<g.user_id>", str(user_id)).replace("<podcast_id>", str(podcast_id)) + "feed.xml"
-        # This original logic is likely correct if RSS_FEED_BASE_URL is set up as expected.
-        # Let's stick to the original logic for feed_url if RSS_FEED_BASE_URL is correctly defined.
-        
-        # Reverting to original feed_url logic, assuming RSS_FEED_BASE_URL is correctly set up.
         # Ensure RSS_FEED_BASE_URL = "https://podmanagerstorage.blob.core.windows.net/podmanagerfiles/users/<g.user_id>/podcasts/<podcast_id>/"
         if not self.rss_feed_base_url:
             current_app.logger.error("RSS_FEED_BASE_URL is not set in environment variables.")
             raise Exception("RSS_FEED_BASE_URL is not configured.")
-            
+
+        if isinstance(rss_xml, str):
+            rss_xml = rss_xml.encode("utf-8")
+        content_md5 = hashlib.md5(rss_xml).digest()
+        current_app.logger.info(
+            f"Uploading RSS to container: '{container_name}', blob path: '{blob_path}' "
+            f"({len(rss_xml)} bytes, MD5 {base64.b64encode(content_md5).decode()})"
+        )
+        blob_gateway.upload(container_name, blob_path, rss_xml, content_type="application/rss+xml",
+                            content_md5=content_md5)
+
         feed_url = self.rss_feed_base_url.replace("<g.user_id>", str(user_id)).replace("<podcast_id>", str(podcast_id)) + "feed.xml"
         current_app.logger.info(f"RSS feed URL generated: {feed_url}")
         return feed_url
@@ -433,7 +276,9 @@ class PublishService:
     # Upload index_html to your public /rss/ folder if you want a directory listing.
 
     def create_sas_upload_url(self, filename, content_type):
-        blob_service_client = BlobServiceClient.from_connection_string(self.azure_conn_str)
+        blob_service_client = get_blob_service_client()
+        if blob_service_client is None:
+            raise RuntimeError("SAS upload URLs need the Azure blob backend (AZURE_STORAGE_CONNECTION_STRING).")
         blob_name = f"uploads/{datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{filename}"
         sas_token = blob_service_client.generate_blob_sas(
             account_name=blob_service_client.account_name,
@@ -2,12 +2,14 @@
 import os
 import logging
 import re
-from pydub import AudioSegment, effects
 from datetime import datetime, timezone
 from typing import List
-from io import BytesIO
 from elevenlabs.client import ElevenLabs
 from backend.database.mongo_connection import fs
+from backend.utils.word_alignment import align_sentence_spans
+from backend.utils.audio_io import encode_audio
+from backend.utils.tts_synthesis import render_dub
+from backend.utils.speech_to_text import transcribe_audio_bytes, transcribe_audio_file
 from backend.utils.ai_utils import (
     generate_ai_suggestions,
     generate_show_notes,
@@ -23,6 +25,9 @@ from backend.utils.ai_utils import (
 logger = logging.getLogger(__name__)
 client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
 
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+
 VOICE_MAPS = {
     "English": {
         "Speaker 1": os.getenv("VOICE_ID_EN_1"),
@@ -40,32 +45,37 @@ VOICE_MAPS = {
 
 
 class TranscriptionService:
-    def transcribe_audio(self, file_data: bytes, filename: str) -> dict:
+    def transcribe_audio(self, file_data: bytes, filename: str, audio_path: str = None, file_id: str = None) -> dict:
         """
         Transcribes audio and groups words into sentences with accurate timestamps.
+        With audio_path the audio is decoded from that file instead of file_data;
+        file_id is an upload already stored in GridFS, which is then not stored again.
         """
 
         logger.info("Starting transcription (group by sentence)")
 
         # === steg 1: ElevenLabs-transkription (word granularity) ===
-        audio_data = BytesIO(file_data)
-        transcription_result = client.speech_to_text.convert(
-            file=audio_data,
-            model_id="scribe_v1",
-            num_speakers=2,
-            diarize=True,
-            timestamps_granularity="word"
-        )
+        # Long uploads are split on silences and transcribed in concurrent chunks
+        if audio_path:
+            transcription_result = transcribe_audio_file(audio_path, diarize=True, num_speakers=2)
+        else:
+            transcription_result = transcribe_audio_bytes(
+                file_data,
+                diarize=True,
+                num_speakers=2,
+                suffix=os.path.splitext(filename)[1] or ".bin"
+            )
         if not transcription_result.text:
             raise Exception("Transcription returned no text.")
         full_text = transcription_result.text.strip()
 
         # === steg 2: spara fil i GridFS ===
-        file_id = fs.put(
-            file_data,
-            filename=filename,
-            metadata={"upload_timestamp": datetime.now(timezone.utc), "type": "transcription"}
-        )
+        if file_id is None:
+            file_id = fs.put(
+                file_data,
+                filename=filename,
+                metadata={"upload_timestamp": datetime.now(timezone.utc), "type": "transcription"}
+            )
 
         # === steg 3: bygg per-ord-lista och speaker_map ===
         word_timings = []
@@ -90,34 +100,17 @@ class TranscriptionService:
         # === steg 4: dela full_text i meningar ===
         sentences = re.split(r'(?<=[\.\?\!])\s+', full_text)
 
-        # === steg 5: gruppera ord till meningar ===
+        # === steg 5: gruppera ord till meningar (en passage, framåtgående markör) ===
+        sentences = [sent.strip() for sent in sentences if sent.strip()]
+        spans = align_sentence_spans(sentences, word_timings)
         raw_entries = []  # (start_time, end_time, speaker, sentence_text)
-        idx = 0
-        for sent in sentences:
-            sent = sent.strip()
-            if not sent:
+        for sent, span in zip(sentences, spans):
+            if span is None:
+                logger.warning(f"Could not place sentence in word timings: {sent[:60]}")
                 continue
-            words = sent.split()
-            # hitta start/end för mening baserat på ord_timings sekventiellt
-            # start = first matching word start, end = last matching word end
-            start_time, end_time = None, None
-            speaker = None
-            for w in word_timings[idx:]:
-                if w["word"] == words[0] and start_time is None:
-                    start_time = w["start"]
-                if start_time is not None:
-                    # mappa speaker från första ord
-                    if speaker is None:
-                        speaker = speaker_map[w["speaker_id"]]
-                    if w["word"] == words[-1]:
-                        end_time = w["end"]
-                        # flytta idx framåt för nästa sentence
-                        idx = word_timings.index(w) + 1
-                        break
-            # fallback om ej hittat
-            if start_time is None or end_time is None:
-                continue
-            raw_entries.append((start_time, end_time, speaker or "Speaker 1", sent))
+            first, last = span
+            speaker = speaker_map.get(word_timings[first]["speaker_id"], "Speaker 1")
+            raw_entries.append((word_timings[first]["start"], word_timings[last]["end"], speaker, sent))
 
         # === steg 6: format och sortera ===
         raw_entries.sort(key=lambda x: x[0])
@@ -207,52 +200,38 @@ class TranscriptionService:
         if not segments:
             raise ValueError("No valid segments in raw_transcription.")
 
-        total_ms = int(max(s["end"] for s in segments) * 1000)
-
-        final = AudioSegment.silent(duration=total_ms)
-
         voice_map = VOICE_MAPS.get(language)
         if not voice_map:
             raise ValueError(f"No voice for'{language}'")
     
         default_voice = next(iter(voice_map.values()), None)
 
+        jobs = []
         for seg in segments:
-            start_ms = int(seg["start"] * 1000)
-            end_ms   = int(seg["end"]   * 1000)
-            text     = seg["text"]
             speaker  = seg["speaker"]
-
             voice_id = voice_map.get(speaker) or default_voice
             if not voice_id:
                 raise ValueError(f"No voice_id for {speaker} in {language}")
 
-            target_dur = end_ms - start_ms
-            if target_dur <= 0:
-                logger.warning(f"Segment vid {seg['start']}s har längd {target_dur} ms – skippar")
+            if seg["end"] <= seg["start"]:
+                logger.warning(f"Segment vid {seg['start']}s har längd {int((seg['end'] - seg['start']) * 1000)} ms – skippar")
                 continue
+            jobs.append({**seg, "voice_id": voice_id})
+
+        if not jobs:
+            raise ValueError("No valid segments in raw_transcription.")
 
-            tts_stream = client.text_to_speech.convert(
+        def synthesize(text: str, voice_id: str) -> bytes:
+            return b"".join(client.text_to_speech.convert(
                 text=text,
                 voice_id=voice_id,
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_44100_128"
-            )
-            tts_bytes = b"".join(tts_stream)
-            tts_audio = AudioSegment.from_file(BytesIO(tts_bytes), format="mp3")
-
-            actual = len(tts_audio)
-            if actual > target_dur:
-                speed = actual / target_dur
-                tts_audio = effects.speedup(tts_audio, playback_speed=speed)
-            else:
-                tts_audio += AudioSegment.silent(duration=(target_dur - actual))
-
-            final = final.overlay(tts_audio, position=start_ms)
+                model_id=TTS_MODEL_ID,
+                output_format=TTS_OUTPUT_FORMAT
+            ))
 
-        buf = BytesIO()
-        final.export(buf, format="mp3")
-        return buf.getvalue()
+        # Segments are voiced concurrently and laid into one buffer; repeated lines come from the TTS cache
+        dubbed = render_dub(jobs, synthesize, TTS_MODEL_ID, TTS_OUTPUT_FORMAT)
+        return encode_audio(dubbed, "mp3")
     
     def build_segments_from_raw(self, raw_transcription: str) -> List[dict]:
         segments = []
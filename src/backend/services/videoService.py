@@ -1,25 +1,24 @@
 import os
 import logging
 import tempfile
-from datetime import datetime
 import subprocess
 
-from backend.utils.ai_utils import analyze_sentiment, extract_audio, detect_background_noise
+from backend.utils.ai_utils import analyze_sentiment, extract_audio
+from backend.utils.audio_analysis import analyze_audio_signal
 from backend.repository.ai_models import save_file, get_file_data
+from backend.utils.speech_to_text import transcribe_audio_bytes
+from backend.utils.upload_ingest import ingest_upload
 from backend.database.mongo_connection import get_fs
-from elevenlabs.client import ElevenLabs
 
 logger = logging.getLogger(__name__)
 fs = get_fs()
 
 class VideoService:
-    def upload_video(self, video_bytes: bytes, filename: str) -> str:
+    def upload_video(self, video, filename: str) -> str:
+        """Store a video (bytes or an upload stream) in GridFS, streamed chunk by chunk."""
         logger.info(f"Uploading video: {filename}")
-        return save_file(
-            video_bytes,
-            filename=filename,
-            metadata={"type": "video", "upload_timestamp": datetime.utcnow()}
-        )
+        upload = ingest_upload(video, filename, target="gridfs", probe=False, metadata={"type": "video"})
+        return upload.file_id
 
     def enhance_video(self, file_id: str) -> str:
         logger.info(f"Enhancing video with ID: {file_id}")
@@ -68,20 +67,14 @@ class VideoService:
         audio_path = video_path.replace(".mp4", ".wav")
         extract_audio(video_path, audio_path)
 
-        # Transcribe audio (using Whisper in this case)
+        # Transcribe audio (long recordings in concurrent chunks split on silences)
         with open(audio_path, "rb") as audio_file:
-            client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
-            result = client.speech_to_text.convert(
-                file=audio_file,
-                model_id="scribe_v1",
-                num_speakers=2,
-                diarize=True,
-                timestamps_granularity="word",
-            )
+            result = transcribe_audio_bytes(audio_file.read(), diarize=True, num_speakers=2, suffix=".wav")
         transcript = result.text.strip()
         
-        # Perform background noise detection and sentiment analysis
-        noise_result = detect_background_noise(audio_path)
+        # Noise, loudness and pauses in one pass over the (memory-mapped) WAV, plus sentiment
+        audio_metrics = analyze_audio_signal(audio_path)
+        noise_result = audio_metrics["background_noise"]
         sentiment = analyze_sentiment(transcript)
 
         # --- New Part: Visual Quality Analysis ---
@@ -93,10 +86,7 @@ class VideoService:
         }
 
         # --- New Part: Speech Rate Calculation ---
-        # Calculate audio duration using the wave module and count words.
-        import wave
-        with wave.open(audio_path, "rb") as wf:
-            duration = wf.getnframes() / wf.getframerate()  # Duration in seconds
+        duration = audio_metrics["duration"]
         word_count = len(transcript.split())
         # Calculate words per minute (WPM)
         speech_rate = word_count / (duration / 60) if duration > 0 else 0
@@ -110,7 +100,8 @@ class VideoService:
             "transcript": transcript,
             "sentiment": sentiment,
             "visual_quality": visual_quality,
-            "speech_rate": f"{speech_rate:.2f} WPM"
+            "speech_rate": f"{speech_rate:.2f} WPM",
+            "audio_metrics": audio_metrics
         }
     
     def cut_video(self, file_id: str, start_time: float, end_time: float) -> str:
@@ -0,0 +1,64 @@
+# waveformService.py
+import os
+import logging
+from datetime import datetime
+
+from bson import ObjectId
+
+from backend.database.mongo_connection import get_fs
+from backend.utils.batch_inference import BoundedCache
+from backend.utils.waveform_peaks import WaveformPeaks, compute_peaks
+
+logger = logging.getLogger(__name__)
+
+WAVEFORM_CACHE_SIZE = int(os.getenv("WAVEFORM_CACHE_SIZE", "32"))
+
+fs = get_fs()
+_peaks_cache = BoundedCache(WAVEFORM_CACHE_SIZE)
+
+
+class WaveformService:
+    def create_waveform(self, audio_bytes: bytes, filename: str, audio_file_id: str = None,
+                        audio_path: str = None) -> dict:
+        """
+        Compute multi-resolution peaks for an audio file (bytes, or a file on
+        disk via audio_path) and store them in GridFS next to it. Returns the
+        stored file id, duration and zoom levels.
+        """
+        peaks = compute_peaks(audio_bytes, suffix=os.path.splitext(filename)[1] or ".bin", input_path=audio_path)
+        if peaks is None:
+            raise ValueError("Loaded audio is empty")
+
+        waveform_file_id = fs.put(
+            peaks.serialize(),
+            filename=f"waveform_{filename}.peaks",
+            metadata={
+                "upload_timestamp": datetime.utcnow(),
+                "type": "waveform",
+                "audio_file_id": audio_file_id,
+                "sample_rate": peaks.sample_rate,
+                "duration": peaks.duration,
+            },
+        )
+        _peaks_cache.put(str(waveform_file_id), peaks)
+        logger.info(f"Waveform peaks saved to GridFS with ID: {waveform_file_id} ({len(peaks.levels)} levels)")
+        return {
+            "waveform_file_id": str(waveform_file_id),
+            "duration": peaks.duration,
+            "sample_rate": peaks.sample_rate,
+            "levels": [level.samples_per_pixel for level in peaks.levels],
+        }
+
+    def get_peaks(self, waveform_file_id: str) -> WaveformPeaks:
+        peaks = _peaks_cache.get(waveform_file_id)
+        if peaks is None:
+            peaks = WaveformPeaks.deserialize(fs.get(ObjectId(waveform_file_id)).read())
+            _peaks_cache.put(waveform_file_id, peaks)
+        return peaks
+
+    def get_level(self, waveform_file_id: str, samples_per_pixel: int = None, pixels: int = None,
+                  fmt: str = "json"):
+        """One zoom level as audiowaveform JSON (dict) or binary .dat (bytes)."""
+        peaks = self.get_peaks(waveform_file_id)
+        level = peaks.level_for(samples_per_pixel, pixels)
+        return peaks.to_dat(level) if fmt == "dat" else peaks.to_json(level)
@@ -0,0 +1,55 @@
+import os
+import logging
+from datetime import datetime
+from flask import session
+from flask_socketio import join_room, emit, SocketIO
+
+from backend.repository.job_repository import get_job, find_jobs_updated_since
+from backend.services.jobService import serialize_job
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENT_POLL_SECONDS = float(os.getenv("JOB_EVENT_POLL_SECONDS", "1.0"))
+
+
+def job_room(job_id):
+    return f"job:{job_id}"
+
+
+def relay_job_updates(socketio: SocketIO):
+    """
+    Push job progress to subscribed clients. Workers may run in other processes
+    or on other hosts, so changes are picked up from the Jobs collection.
+    """
+    now = datetime.utcnow()
+    # MongoDB stores milliseconds, so start from a millisecond boundary
+    since = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    # Ids already relayed at exactly `since`; the query is inclusive, so these are skipped next poll
+    seen_at_since = set()
+    while True:
+        socketio.sleep(JOB_EVENT_POLL_SECONDS)
+        try:
+            for job in find_jobs_updated_since(since, seen_at_since):
+                if job["updatedAt"] > since:
+                    since = job["updatedAt"]
+                    seen_at_since = set()
+                seen_at_since.add(job["_id"])
+                socketio.emit('job_update', serialize_job(job, include_result=not job.get("resultFileId")), room=job_room(job["_id"]))
+        except Exception as e:
+            logger.warning(f"Job update relay failed: {e}")
+
+
+def register_job_events(socketio: SocketIO):
+    @socketio.on('join_job')
+    def handle_join_job(data):
+        job_id = (data or {}).get('job_id')
+        job = get_job(job_id) if job_id else None
+        if not job or job.get('userId') != session.get('user_id'):
+            emit('job_error', {'job_id': job_id, 'error': 'Job not found'})
+            return
+
+        join_room(job_room(job_id))
+        # Send the current state right away so late subscribers don't miss completion.
+        emit('job_update', serialize_job(job, include_result=not job.get("resultFileId")))
+
+    socketio.start_background_task(relay_job_updates, socketio)
@@ -118,7 +118,7 @@ def get_podcast_logo_from_rss(rss_url):
             
         from backend.services.rss_Service import RSSService
         rss_service = RSSService()
-        rss_data, status = rss_service.fetch_rss_feed(rss_url)
+        rss_data, status = rss_service.fetch_rss_feed(rss_url, cache=False)
         
         if status == 200 and rss_data and rss_data.get("imageUrl"):
             logo_url = rss_data.get("imageUrl")
@@ -0,0 +1,214 @@
+# ai_cache.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable
+
+from backend.utils.batch_inference import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+AI_CACHE_MEMORY_SIZE = int(os.getenv("AI_CACHE_MEMORY_SIZE", "512"))
+# Characters of results held in the in-process tier.
+AI_CACHE_MEMORY_CHARS = int(os.getenv("AI_CACHE_MEMORY_CHARS", str(16 * 1024 * 1024)))
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "20000"))
+# Total stored result size (UTF-8 bytes) of the MongoDB tier.
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+AI_CACHE_COLLECTION = os.getenv("AI_CACHE_COLLECTION", "AiResultCache")
+# How many stores between checks of the MongoDB tier size.
+_EVICTION_CHECK_EVERY = 100
+
+
+def prompt_key(feature: str, model: str, messages) -> str:
+    """Content address of one AI call: the feature, the model and the exact prompt sent."""
+    prompt = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return f"{feature}:{model}:{digest}"
+
+
+class AiResultCache:
+    """
+    Two-tier cache for AI text results: an in-process LRU in front of a MongoDB
+    collection shared by all workers. Entries expire through a TTL index and the
+    collection is trimmed to AI_CACHE_MAX_BYTES of results (and at most
+    AI_CACHE_MAX_ENTRIES), least recently used first, so a few long show notes
+    or translations weigh as much as many short results.
+    """
+
+    def __init__(self, memory_size: int = AI_CACHE_MEMORY_SIZE, ttl_seconds: int = AI_CACHE_TTL_SECONDS,
+                 max_entries: int = AI_CACHE_MAX_ENTRIES, max_bytes: int = AI_CACHE_MAX_BYTES,
+                 memory_chars: int = AI_CACHE_MEMORY_CHARS, enabled: bool = AI_CACHE_ENABLED):
+        self.memory = BoundedCache(memory_size, max_weight=memory_chars, weigh=len)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._collection = None
+        self._collection_failed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stores = 0
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _mongo(self):
+        """The MongoDB tier, created on first use; None if the database is unavailable."""
+        if self._collection is not None or self._collection_failed:
+            return self._collection
+        with self._lock:
+            if self._collection is None and not self._collection_failed:
+                try:
+                    from backend.database.mongo_connection import get_db
+                    collection = get_db()[AI_CACHE_COLLECTION]
+                    collection.create_index("expiresAt", expireAfterSeconds=0)
+                    collection.create_index("lastHitAt")
+                    self._collection = collection
+                except Exception as e:
+                    logger.warning(f"AI result cache: MongoDB tier disabled ({e})")
+                    self._collection_failed = True
+        return self._collection
+
+    @contextmanager
+    def bypass(self):
+        """Skip the cache (both reads and writes) for calls made in this block on this thread."""
+        previous = getattr(self._local, "bypass", False)
+        self._local.bypass = True
+        try:
+            yield
+        finally:
+            self._local.bypass = previous
+
+    def active(self) -> bool:
+        return self.enabled and not getattr(self._local, "bypass", False)
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        collection = self._mongo()
+        if collection is not None:
+            try:
+                doc = collection.find_one_and_update(
+                    {"_id": key, "expiresAt": {"$gt": datetime.utcnow()}},
+                    {"$set": {"lastHitAt": datetime.utcnow()}},
+                    projection={"value": 1},
+                )
+                if doc is not None:
+                    self.memory.put(key, doc["value"])
+                    self._count("mongo_hits")
+                    return doc["value"]
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"AI result cache read failed: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, value: str, feature: str = None, model: str = None):
+        self.memory.put(key, value)
+        self._count("stores")
+
+        collection = self._mongo()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            collection.replace_one(
+                {"_id": key},
+                {
+                    "feature": feature,
+                    "model": model,
+                    "value": value,
+                    "size": len(value.encode("utf-8")),
+                    "createdAt": now,
+                    "lastHitAt": now,
+                    "expiresAt": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True,
+            )
+            with self._lock:
+                self._stores += 1
+                check = self._stores % _EVICTION_CHECK_EVERY == 0
+            if check:
+                self.evict(collection)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"AI result cache write failed: {e}")
+
+    def evict(self, collection=None):
+        """Trim the MongoDB tier to max_bytes and max_entries, dropping the least recently used entries."""
+        collection = collection if collection is not None else self._mongo()
+        if collection is None:
+            return 0
+        totals = next(collection.aggregate([
+            {"$group": {"_id": None, "bytes": {"$sum": "$size"}, "count": {"$sum": 1}}}
+        ]), None)
+        if not totals:
+            return 0
+        excess_bytes = totals["bytes"] - self.max_bytes
+        excess_count = totals["count"] - self.max_entries
+        if excess_bytes <= 0 and excess_count <= 0:
+            return 0
+
+        stale_ids = []
+        freed = 0
+        for doc in collection.find({}, {"_id": 1, "size": 1}).sort("lastHitAt", 1):
+            if freed >= excess_bytes and len(stale_ids) >= excess_count:
+                break
+            stale_ids.append(doc["_id"])
+            freed += doc.get("size") or 0
+        collection.delete_many({"_id": {"$in": stale_ids}})
+        logger.info(f"AI result cache evicted {len(stale_ids)} entries ({freed} bytes)")
+        return len(stale_ids)
+
+    def get_or_compute(self, feature: str, model: str, messages, compute: Callable[[], str]) -> str:
+        """Return the cached result for this exact prompt, or run compute() and cache what it returns."""
+        if not self.active():
+            self._count("bypassed")
+            return compute()
+
+        key = prompt_key(feature, model, messages)
+        cached = self.get(key)
+        if cached is not None:
+            logger.info(f"AI result cache hit for {feature} ({model})")
+            return cached
+
+        value = compute()
+        if isinstance(value, str) and value:
+            self.put(key, value, feature=feature, model=model)
+        return value
+
+    def clear_memory(self):
+        self.memory.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["mongo_hits"] + stats["misses"]
+        stats.update(
+            enabled=self.enabled,
+            memory_entries=len(self.memory),
+            memory_capacity=self.memory.max_items,
+            memory_chars=self.memory.weight,
+            mongo_tier=self._collection is not None,
+            hit_rate=round((stats["memory_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else 0.0,
+        )
+        return stats
+
+
+ai_cache = AiResultCache()
+
+
+def get_ai_cache_metrics() -> dict:
+    return ai_cache.metrics()
@@ -12,19 +12,16 @@ import random
 import logging
 import tempfile
 import subprocess
-import wave
 from pathlib import Path
 from io import BytesIO
 from collections import Counter
 
 # Third-party imports
-import numpy as np
 import requests
 import soundfile as sf
 from flask import jsonify, g
 from textblob import TextBlob
 from textstat import textstat
-from transformers import pipeline
 from pydub import AudioSegment
 from PIL import Image, ImageDraw, ImageFont
 import streamlit as st
@@ -34,6 +31,18 @@ import tiktoken
 # Local imports (if any)
 import difflib
 from typing import List
+from backend.utils.batch_inference import classify_zero_shot, classify_emotions
+from backend.utils.audio_io import decode_audio, transcode_to_wav, AudioDecodeError
+from backend.utils.audio_mix import Stem, mix_to_wav_bytes
+from backend.utils.asset_store import asset_key
+from backend.utils.sfx_generation import (
+    SfxGenerationError, generate_sfx, get_sfx_provider, sfx_store, current_user_id
+)
+from backend.utils.ai_cache import ai_cache
+from backend.utils.transcript_chunking import map_reduce
+from backend.utils.audio_analysis import analyze_audio_signal
+from backend.utils.speech_to_text import transcribe_audio_bytes
+from backend.utils.upload_ingest import ingest_upload
 
 client = OpenAI()
 
@@ -43,10 +52,19 @@ logger = logging.getLogger(__name__)
 
 client = OpenAI()
 
-emotion_classifier = pipeline("text-classification", model="bhadresh-savani/distilbert-base-uncased-emotion")
-
 logger = logging.getLogger(__name__)
 
+def cached_chat_completion(feature: str, model: str, messages: list, openai_client=None) -> str:
+    """
+    chat.completions.create returning the message text. Identical prompts are served
+    from the AI result cache (see backend/utils/ai_cache.py) instead of calling OpenAI.
+    """
+    openai_client = openai_client or client
+    return ai_cache.get_or_compute(
+        feature, model, messages,
+        lambda: openai_client.chat.completions.create(model=model, messages=messages).choices[0].message.content
+    )
+
 def remove_filler_words(text: str) -> str:
     """
     Removes timestamps and speaker tags, then uses GPT-4 to remove filler words.
@@ -60,17 +78,16 @@ def remove_filler_words(text: str) -> str:
     # Strip extra whitespace
     text = re.sub(r'\s+', ' ', text).strip()
 
-    # Ask GPT to remove filler words
-    prompt = f"Remove unnecessary filler words (um, uh, ah, like, you know, etc.) from this text:\n{text}"
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        logger.error(f"Error removing filler words: {str(e)}")
-        return text  # fallback
+    # Ask GPT to remove filler words, chunk by chunk for long transcripts
+    def clean_chunk(chunk: str) -> str:
+        prompt = f"Remove unnecessary filler words (um, uh, ah, like, you know, etc.) from this text:\n{chunk}"
+        try:
+            return cached_chat_completion("remove_filler_words", "gpt-4", [{"role": "user", "content": prompt}]).strip()
+        except Exception as e:
+            logger.error(f"Error removing filler words: {str(e)}")
+            return chunk  # fallback
+
+    return map_reduce(text, clean_chunk)
 
 def analyze_sentiment(text: str) -> str:
     blob = TextBlob(text)
@@ -100,35 +117,30 @@ def calculate_clarity_score(cleaned_transcript: str) -> str:
     )
 
 def analyze_emotions(text: str) -> List[dict]:
-    sentences = text.split(". ")
-    results = []
-    for sentence in sentences:
-        if sentence.strip():
-            result = emotion_classifier(sentence)
-            results.append({
-                "text": sentence,
-                "emotions": result  # List of dicts with label + score
-            })
-    return results
+    sentences = [s for s in text.split(". ") if s.strip()]
+    return [
+        {
+            "text": sentence,
+            "emotions": result  # List of dicts with label + score
+        }
+        for sentence, result in zip(sentences, classify_emotions(sentences))
+    ]
+
+ENHANCE_FFMPEG_ARGS = [
+    "-ac", "1",
+    "-ar", "16000",
+    "-sample_fmt", "s16",
+    "-af",
+    "afftdn=nf=-25,"
+    "highpass=f=50,highpass=f=60,highpass=f=70,"
+    "equalizer=f=50:t=q:w=1:g=-40,"
+    "equalizer=f=60:t=q:w=1:g=-40,"
+    "highpass=f=100,loudnorm",
+]
 
 def enhance_audio_with_ffmpeg(input_path: str, output_path: str) -> bool:
     try:
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", input_path,
-            "-ac", "1",                
-            "-ar", "16000",            
-            "-sample_fmt", "s16",      
-            "-c:a", "pcm_s16le",       
-            "-af",
-            "afftdn=nf=-25,"
-            "highpass=f=50,highpass=f=60,highpass=f=70,"
-            "equalizer=f=50:t=q:w=1:g=-40,"
-            "equalizer=f=60:t=q:w=1:g=-40,"
-            "highpass=f=100,loudnorm",
-            output_path
-        ]
+        ffmpeg_cmd = ["ffmpeg", "-y", "-i", input_path] + ENHANCE_FFMPEG_ARGS + ["-c:a", "pcm_s16le", output_path]
         subprocess.run(ffmpeg_cmd, check=True)
 
         # Optional: Debug check
@@ -141,29 +153,23 @@ def enhance_audio_with_ffmpeg(input_path: str, output_path: str) -> bool:
         logger.error(f"FFmpeg enhancement error: {str(e)}")
         return False
 
+def enhance_audio_bytes(audio_bytes: bytes) -> bytes:
+    """Same enhancement chain as enhance_audio_with_ffmpeg, piped through ffmpeg in memory."""
+    try:
+        return transcode_to_wav(audio_bytes, ENHANCE_FFMPEG_ARGS)
+    except AudioDecodeError as e:
+        logger.error(f"FFmpeg enhancement error: {str(e)}")
+        raise RuntimeError("FFmpeg enhancement failed")
 
 
-
-def detect_background_noise(audio_path: str, threshold=1000, max_freq=500) -> str:
+def detect_background_noise(audio_path) -> str:
     """
-    Analyze frequency content for background noise.  
+    Background noise verdict from the noise floor of the quietest frames.
+    audio_path may also be raw bytes, a file-like object or a PcmAudio.
+    Use analyze_audio_signal directly to get pauses and loudness from the same pass.
     """
     try:
-        with wave.open(audio_path, "rb") as wf:
-            sample_rate = wf.getframerate()
-            n_frames = wf.getnframes()
-            audio_data = wf.readframes(n_frames)
-            audio_array = np.frombuffer(audio_data, dtype=np.int16)
-
-        fft_result = np.fft.fft(audio_array)
-        magnitude = np.abs(fft_result)
-        low_freqs = magnitude[:max_freq]
-        avg_magnitude = np.mean(low_freqs)
-
-        if avg_magnitude > threshold:
-            return "Background noise detected"
-        else:
-            return "No significant background noise detected"
+        return analyze_audio_signal(audio_path)["background_noise"]
     except Exception as e:
         logger.error(f"Error in background noise detection: {str(e)}")
         return f"Error: {str(e)}"
@@ -228,30 +234,10 @@ def get_sentence_timestamps_fuzzy(sentence: str, word_timings: list, threshold:
     return {"start": 0.0, "end": 0.5}
 
 def convert_to_pcm_wav(input_bytes: bytes) -> bytes:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".input") as input_tmp:
-            input_tmp.write(input_bytes)
-            input_tmp.flush()
-
-        output_path = input_tmp.name.replace(".input", ".wav")
-
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_tmp.name,
-            "-acodec", "pcm_s16le",
-            "-ar", "16000",  
-            output_path
-        ]
-        proc = subprocess.run(cmd, capture_output=True)
-
-        if proc.returncode != 0:
-            raise RuntimeError(f"FFmpeg conversion failed:\n{proc.stderr.decode()}")
-
-        with open(output_path, "rb") as f:
-            converted_bytes = f.read()
-
-        os.remove(input_tmp.name)
-        os.remove(output_path)
-        return converted_bytes
+    try:
+        return decode_audio(input_bytes, sample_rate=16000).to_wav_bytes()
+    except AudioDecodeError as e:
+        raise RuntimeError(f"FFmpeg conversion failed:\n{e}")
 
 def format_transcription(transcription):
     if isinstance(transcription, list):
@@ -268,24 +254,26 @@ def download_button_text(label, text, filename, key_prefix=""):
     key = f"{key_prefix}_{filename}" if key_prefix else filename
     return st.download_button(label, text, filename, key=key)
 
-def translate_text(text: str, target_language: str) -> str:
+def _translate_chunk(text: str, target_language: str, retries: int = 3) -> str:
     prompt = f"Translate the following transcript to {target_language}:\n\n{text}"
-    retries = 3
     for attempt in range(retries):
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a professional translator."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content.strip()
+            return cached_chat_completion("translate_text", "gpt-4", [
+                {"role": "system", "content": "You are a professional translator."},
+                {"role": "user", "content": prompt}
+            ]).strip()
         except Exception as e:
             logger.warning(f"Retry {attempt+1}/{retries} failed: {e}")
             time.sleep(1)
-    logger.error("Translation permanently failed after retries.")
-    return "Failed to translate. Try again later."
+    raise RuntimeError("Translation failed after retries")
+
+def translate_text(text: str, target_language: str) -> str:
+    # Long transcripts are translated chunk by chunk in parallel and stitched back in order
+    try:
+        return map_reduce(text, lambda chunk: _translate_chunk(chunk, target_language))
+    except RuntimeError:
+        logger.error("Translation permanently failed after retries.")
+        return "Failed to translate. Try again later."
 
 import tiktoken
 import time
@@ -296,68 +284,90 @@ def truncate_to_token_limit(text, model="gpt-4", max_tokens=7000):
     tokens = enc.encode(text)
     return enc.decode(tokens[:max_tokens]) if len(tokens) > max_tokens else text
 
-def gpt_with_fallback(prompt: str, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k") -> str:
+def gpt_with_fallback(prompt: str, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k", feature: str = "gpt_with_fallback") -> str:
     try:
-        return _safe_gpt_call(prompt, primary_model)
+        return _safe_gpt_call(prompt, primary_model, feature=feature)
     except BadRequestError as e:
         if "context_length_exceeded" in str(e):
             print("⚠️ Too long for GPT-4, falling back to gpt-3.5-turbo-16k")
-            return _safe_gpt_call(prompt, fallback_model)
+            return _safe_gpt_call(prompt, fallback_model, feature=feature)
         raise e
 
-def _safe_gpt_call(prompt: str, model: str, max_tokens: int = 7000, retries: int = 2) -> str:
+def _safe_gpt_call(prompt: str, model: str, max_tokens: int = 7000, retries: int = 2, feature: str = "gpt_with_fallback") -> str:
     prompt = truncate_to_token_limit(prompt, model=model, max_tokens=max_tokens)
     for attempt in range(retries):
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.choices[0].message.content
+            return cached_chat_completion(feature, model, [{"role": "user", "content": prompt}])
         except OpenAIError as e:
             if "rate limit" in str(e).lower():
                 if model == "gpt-4":
                     logger.warning("⚠️ GPT-4 TPM limit hit — falling back to gpt-3.5-turbo-16k.")
-                    return _safe_gpt_call(prompt, "gpt-3.5-turbo-16k")
+                    return _safe_gpt_call(prompt, "gpt-3.5-turbo-16k", feature=feature)
                 time.sleep((attempt + 1) * 5)
             else:
                 raise e
     raise RuntimeError("GPT call failed after retries.")
 
-def generate_ai_suggestions(text):
+def _summarize_transcript_part(text: str, focus: str, feature: str) -> str:
+    """Map step for long transcripts: condensed notes on one consecutive part of the episode."""
     prompt = f"""
+    Summarize this part of a podcast transcript as concise notes.
+    Focus on: {focus}
+
+    {text}
+    """
+    return gpt_with_fallback(prompt, feature=f"{feature}_part")
+
+def generate_ai_suggestions(text):
+    def suggest(chunk):
+        prompt = f"""
     Review the following transcription and provide suggestions for improvement.
     Focus on removing filler words, grammar/spelling corrections, and awkward phrasing.
 
-    {text}
+    {chunk}
     """
-    return gpt_with_fallback(prompt)
+        return gpt_with_fallback(prompt, feature="ai_suggestions")
+
+    # Suggestions are local to each part, so long transcripts just list them part by part
+    return map_reduce(text, suggest, reduce_fn=lambda parts: "\n\n".join(parts))
 
 def generate_show_notes(text):
-    prompt = f"""
+    def show_notes(transcript):
+        prompt = f"""
     Generate clear, concise podcast show notes based on this transcript:
 
-    {text}
+    {transcript}
     """
-    return gpt_with_fallback(prompt)
+        return gpt_with_fallback(prompt, feature="show_notes")
+
+    def combine(parts):
+        prompt = f"""
+    Generate clear, concise podcast show notes for one episode from these notes on its consecutive parts:
+
+    {chr(10).join(parts)}
+    """
+        return gpt_with_fallback(prompt, feature="show_notes")
+
+    return map_reduce(
+        text,
+        lambda chunk: _summarize_transcript_part(chunk, "main topics, key points and notable moments", "show_notes"),
+        reduce_fn=combine,
+        single_fn=show_notes,
+    )
 
-def transcribe_with_whisper(audio_path: str) -> str:
+def transcribe_with_whisper(audio) -> str:
+    """audio is a file path or the raw audio bytes."""
     try:
-        with open(audio_path, "rb") as f:
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f
-            )
-        return response.text
+        if not isinstance(audio, (bytes, bytearray)):
+            with open(audio, "rb") as f:
+                audio = f.read()
+        # Long recordings are chunked on silences (also keeps each upload under Whisper's size limit)
+        # Any stored transcript of the same audio will do: only the text is needed here
+        return transcribe_audio_bytes(bytes(audio), provider="whisper", any_provider=True).text
     except Exception as e:
         logger.error(f"Error in Whisper transcription: {str(e)}")
         return ""
 
-classifier = pipeline(
-    "zero-shot-classification",
-    model="facebook/bart-large-mnli"
-)
-
 def detect_filler_words(transcription):
     filler_words = [
         "um", "uh", "ah", "like", "you know", "so", "well", "I mean",
@@ -373,8 +383,7 @@ def classify_sentence_relevance(transcription):
     sentences = transcription.split(". ")
     results = []
     labels = ["important", "filler", "off-topic", "redundant"]
-    for s in sentences:
-        result = classifier(s, candidate_labels=labels)
+    for s, result in zip(sentences, classify_zero_shot(sentences, labels)):
         results.append({
             "sentence": s,
             "category": result["labels"][0],
@@ -383,14 +392,11 @@ def classify_sentence_relevance(transcription):
     return results
 
 def analyze_certainty_levels(transcription):
-    sentences = transcription.split(". ")
+    sentences = [s for s in transcription.split(". ") if s.strip()]
     labels = ["filler", "important", "redundant", "off-topic"]
     result_list = []
 
-    for s in sentences:
-        if not s.strip():
-            continue
-        result = classifier(s, candidate_labels=labels)
+    for s, result in zip(sentences, classify_zero_shot(sentences, labels)):
         certainty = result["scores"][result["labels"].index("important")]
         level = (
             "Green" if certainty <= 0.2 else
@@ -431,56 +437,58 @@ def get_sentence_timestamps(sentence, word_timings, prev_end_time=0.0):
 
     return {"start": start, "end": end}
 
-def detect_long_pauses(audio_path, threshold=2.0):
-    cmd = [
-        "ffmpeg", "-i", audio_path,
-        "-af", f"silencedetect=noise=-40dB:d={threshold}",
-        "-f", "null", "-"
-    ]
-    process = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
-    output = process.stderr
-
-    starts = [float(m.group(1)) for m in re.finditer(r"silence_start: ([0-9.]+)", output)]
-    ends = [float(m.group(1)) for m in re.finditer(r"silence_end: ([0-9.]+)", output)]
-
-    return [{"start": s, "end": e} for s, e in zip(starts, ends)]
+def detect_long_pauses(audio, threshold=2.0):
+    """Silences below -40 dBFS lasting at least threshold seconds; audio is a path, bytes or PcmAudio."""
+    return analyze_audio_signal(audio, min_pause=threshold)["pauses"]
 
 def generate_ai_show_notes(transcript):
-    prompt = f"""
+    def show_notes(source, label="Transcript"):
+        prompt = f"""
     Generate professional show notes for this podcast episode.
     - A brief summary of the discussion.
     - Key topics covered (bullet points).
     - Any important timestamps (if available).
     - Guest highlights (if mentioned).
 
-    Transcript:
-    {transcript}
+    {label}:
+    {source}
     """
+        return cached_chat_completion("ai_show_notes", "gpt-4", [
+            {"role": "system", "content": "You are a professional podcast assistant."},
+            {"role": "user", "content": prompt}
+        ]).strip()
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a professional podcast assistant."},
-                {"role": "user", "content": prompt}
-            ]
+        return map_reduce(
+            transcript,
+            lambda chunk: _summarize_transcript_part(chunk, "topics, timestamps and guest highlights", "ai_show_notes"),
+            reduce_fn=lambda parts: show_notes("\n\n".join(parts), label="Notes on consecutive parts of the episode"),
+            single_fn=show_notes,
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         logger.error(f"Error generating show notes: {e}")
         return f"Error generating show notes: {str(e)}"
 
 def generate_ai_quotes(transcript: str) -> str:
-    prompt = f"""
-    From the following podcast transcript, extract 3 impactful, quotable moments or sentences.
+    def extract_quotes(source, label="Transcript"):
+        prompt = f"""
+    From the following podcast {label.lower()}, extract 3 impactful, quotable moments or sentences.
     - Keep each quote short and standalone (1–2 sentences).
     - The quotes should be insightful, funny, emotional, or thought-provoking.
     - Do NOT include speaker labels, just the raw quote text.
 
-    Transcript:
-    {transcript}
+    {label}:
+    {source}
     """
+        return gpt_with_fallback(prompt, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k", feature="ai_quotes")
+
     try:
-        output = gpt_with_fallback(prompt, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k")
+        # Long episodes: candidates from every part, then the best 3 of those
+        output = map_reduce(
+            transcript,
+            extract_quotes,
+            reduce_fn=lambda parts: extract_quotes("\n".join(parts), label="Candidate quotes"),
+        )
         # Clean up formatting
         lines = [line.strip("•–—-• \n\"") for line in output.split("\n") if line.strip()]
         return "\n\n".join(lines[:3])
@@ -588,32 +596,14 @@ def render_quote_images_local(quotes: List[str]) -> List[str]:
 
     return image_paths
 
-def fetch_sfx_for_emotion(
-    emotion: str,
-    category: str,
-    *,
-    loop_src_seconds: int = 8,
-    target_duration:  int = 30,
-    crossfade_ms:     int = 250
-) -> List[str]:
-    url = "https://api.elevenlabs.io/v1/sound-generation"
-    headers = {"xi-api-key": ELEVENLABS_API_KEY,
-               "Content-Type": "application/json"}
-    payload = {
-        "text":
-            f"Create a perfectly seamless {loop_src_seconds}-second loop of "
-            f"ambient background music for a {category} podcast with a "
-            f"{emotion} mood. The first and last 250 ms must share the same pad tone.",
-        "duration_seconds": loop_src_seconds,
-        "prompt_influence": 1
-    }
-
-    res = requests.post(url, headers=headers, json=payload)
-    if "audio/mpeg" not in res.headers.get("Content-Type", ""):
-        logger.warning("ElevenLabs returnerade inte audio/mpeg – ingen SFX.")
-        return []
-
-    seg = AudioSegment.from_file(BytesIO(res.content), format="mp3")
+def _render_emotion_bed(emotion, category, loop_src_seconds, target_duration, crossfade_ms) -> bytes:
+    text = (
+        f"Create a perfectly seamless {loop_src_seconds}-second loop of "
+        f"ambient background music for a {category} podcast with a "
+        f"{emotion} mood. The first and last 250 ms must share the same pad tone."
+    )
+    loop_bytes = generate_sfx(text, loop_src_seconds, current_user_id())
+    seg = AudioSegment.from_file(BytesIO(loop_bytes))
 
     if crossfade_ms:
         head = seg[:crossfade_ms].fade_out(crossfade_ms)
@@ -626,7 +616,30 @@ def fetch_sfx_for_emotion(
 
     buf = BytesIO()
     long_seg.export(buf, format="mp3", bitrate="192k")
-    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    return buf.getvalue()
+
+def fetch_sfx_for_emotion(
+    emotion: str,
+    category: str,
+    *,
+    loop_src_seconds: int = 8,
+    target_duration:  int = 30,
+    crossfade_ms:     int = 250
+) -> List[str]:
+    # Finished beds are reused across episodes; only a new (emotion, category) pair is generated
+    key = asset_key("sfx_bed", get_sfx_provider().name, emotion, category,
+                    loop_src_seconds, target_duration, crossfade_ms)
+    try:
+        bed = sfx_store.get_or_create(
+            key,
+            lambda: _render_emotion_bed(emotion, category, loop_src_seconds, target_duration, crossfade_ms),
+            "audio/mpeg"
+        )
+    except SfxGenerationError as e:
+        logger.warning(f"ElevenLabs returnerade inte audio/mpeg – ingen SFX. ({e})")
+        return []
+
+    b64 = base64.b64encode(bed).decode("utf-8")
     return [f"data:audio/mpeg;base64,{b64}"]
 
 def suggest_sound_effects(
@@ -655,19 +668,14 @@ def mix_background(
     *,
     bg_gain_db: float = -45.0
 ) -> bytes:
-    original = AudioSegment.from_file(BytesIO(original_wav_bytes), format="wav")
+    original = decode_audio(original_wav_bytes)
 
+    # The loop is decoded once and tiled by index while mixing, never materialised at episode length
     bg_mp3   = base64.b64decode(bg_b64_url.split(",", 1)[1])
-    bg_seg   = AudioSegment.from_file(BytesIO(bg_mp3), format="mp3") + bg_gain_db
-
-    repeats  = math.ceil(len(original) / len(bg_seg))
-    bg_long  = (bg_seg * repeats)[:len(original)]
+    bg_stem  = Stem(bg_mp3, gain_db=bg_gain_db, loop=True, name="background")
 
-    mixed    = original.overlay(bg_long)
-
-    out_buf  = BytesIO()
-    mixed.export(out_buf, format="wav")
-    return out_buf.getvalue()
+    mixed, _ = mix_to_wav_bytes(original, [bg_stem])
+    return mixed
 
 def pick_dominant_emotion(emotion_data: list) -> str:
     labels = [e["emotions"][0]["label"] for e in emotion_data]
@@ -681,17 +689,25 @@ def get_osint_info(guest_name: str) -> str:
 
     prompt = f"Find detailed and recent public information about {guest_name}. Focus on professional achievements, background, and any recent mentions in news or social media."
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are OSINT-GPT, an expert in gathering open-source intelligence."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-
-    return response.choices[0].message.content.strip()
+    return cached_chat_completion("osint_info", "gpt-4", [
+        {"role": "system", "content": "You are OSINT-GPT, an expert in gathering open-source intelligence."},
+        {"role": "user", "content": prompt}
+    ], openai_client=client).strip()
 
 def create_podcast_scripts_paid(osint_info: str, guest_name: str, transcript: str = "") -> str:
+    # Long transcripts are condensed part by part so the whole episode informs the script
+    try:
+        if transcript:
+            transcript = map_reduce(
+                transcript,
+                lambda chunk: _summarize_transcript_part(chunk, "topics and tone", "intro_outro"),
+                reduce_fn=lambda parts: "\n\n".join(parts),
+                single_fn=lambda text: text,
+            )
+    except Exception as e:
+        logger.error(f"Error condensing transcript for intro/outro: {e}")
+        return f"Error: {str(e)}"
+
     prompt = f"""
 You are a professional podcast scriptwriter.
 
@@ -710,7 +726,7 @@ The outro should reflect on the discussion and invite the listener to tune in ag
 """
 
     try:
-        return gpt_with_fallback(prompt, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k").strip()
+        return gpt_with_fallback(prompt, primary_model="gpt-4", fallback_model="gpt-3.5-turbo-16k", feature="intro_outro_script").strip()
     except Exception as e:
         logger.error(f"Error generating intro/outro: {e}")
         return f"Error: {str(e)}"
@@ -800,25 +816,5 @@ def insufficient_credits_response(feature: str, exc: Exception):
     }), 403
 
 def check_audio_duration(audio_bytes: bytes, max_duration_seconds: int = 36) -> float:
-    # Check audio duration in seconds.
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-        temp_audio.write(audio_bytes)
-        temp_audio_path = temp_audio.name
-
-    try:
-        data, samplerate = sf.read(temp_audio_path)
-        duration = len(data) / samplerate
-        logger.info(f"Audio duration: {round(duration, 2)} seconds")
-    except Exception as e:
-        logger.error(f"Failed to read audio file: {e}")
-        raise ValueError("Invalid audio file format.")
-    finally:
-        os.remove(temp_audio_path)
-
-    if duration > max_duration_seconds:
-        raise ValueError(
-            f"Audio too long ({round(duration / 60, 2)} minutes). Max allowed is {max_duration_seconds / 60} minutes."
-        )
-
-    return duration
\ No newline at end of file
+    # Check audio duration in seconds, from the header or container index (no full decode).
+    return ingest_upload(audio_bytes, "audio.bin").check_duration(max_duration_seconds)
\ No newline at end of file
@@ -0,0 +1,246 @@
+# asset_store.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+ASSET_CACHE_MEMORY_MB = int(os.getenv("ASSET_CACHE_MEMORY_MB", "64"))
+ASSET_CACHE_MAX_MB = int(os.getenv("ASSET_CACHE_MAX_MB", "2048"))
+ASSET_CACHE_TTL_SECONDS = int(os.getenv("ASSET_CACHE_TTL_SECONDS", str(90 * 24 * 3600)))
+ASSET_CACHE_COLLECTION = os.getenv("ASSET_CACHE_COLLECTION", "AssetCache")
+# How many stores between eviction sweeps of the GridFS tier.
+_EVICTION_CHECK_EVERY = 50
+
+
+def asset_key(namespace: str, *parts) -> str:
+    """Content address of a generated asset: the namespace plus everything that determines its bytes."""
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class _ByteLru:
+    """Thread-safe LRU bounded by the total size of the stored bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            return None
+
+    def put(self, key, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.size -= len(dropped)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class AssetStore:
+    """
+    Content-addressed store for generated media (sound effects, background beds,
+    speech). Bytes live in GridFS with one index document per key in
+    ASSET_CACHE_COLLECTION; a byte-bounded LRU sits in front. Expired entries
+    and the least recently used ones beyond max_bytes are evicted together with
+    their GridFS files. Concurrent requests for the same key share one
+    generation.
+    """
+
+    def __init__(self, namespace: str, memory_bytes: int = ASSET_CACHE_MEMORY_MB * 1024 * 1024,
+                 max_bytes: int = ASSET_CACHE_MAX_MB * 1024 * 1024, ttl_seconds: int = ASSET_CACHE_TTL_SECONDS,
+                 enabled: bool = ASSET_CACHE_ENABLED):
+        self.namespace = namespace
+        self.memory = _ByteLru(memory_bytes)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._collection = None
+        self._collection_failed = False
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stores = 0
+        self.stats = {"memory_hits": 0, "store_hits": 0, "misses": 0, "stores": 0, "shared": 0, "evicted": 0, "errors": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _mongo(self):
+        """The GridFS index collection, created on first use; None if the database is unavailable."""
+        if self._collection is not None or self._collection_failed:
+            return self._collection
+        with self._lock:
+            if self._collection is None and not self._collection_failed:
+                try:
+                    from backend.database.mongo_connection import get_db
+                    collection = get_db()[ASSET_CACHE_COLLECTION]
+                    collection.create_index([("namespace", 1), ("lastHitAt", 1)])
+                    collection.create_index("expiresAt")
+                    self._collection = collection
+                except Exception as e:
+                    logger.warning(f"Asset store '{self.namespace}': GridFS tier disabled ({e})")
+                    self._collection_failed = True
+        return self._collection
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.memory.get(key)
+        if data is not None:
+            self._count("memory_hits")
+            return data
+
+        collection = self._mongo()
+        if collection is not None:
+            try:
+                from backend.repository.ai_models import get_file_data
+                doc = collection.find_one_and_update(
+                    {"_id": key, "expiresAt": {"$gt": datetime.utcnow()}},
+                    {"$set": {"lastHitAt": datetime.utcnow()}},
+                    projection={"fileId": 1},
+                )
+                if doc is not None:
+                    data = get_file_data(doc["fileId"])
+                    self.memory.put(key, data)
+                    self._count("store_hits")
+                    return data
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Asset store '{self.namespace}' read failed: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, data: bytes, content_type: str = None):
+        self.memory.put(key, data)
+        self._count("stores")
+
+        collection = self._mongo()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            from backend.repository.ai_models import save_file, delete_file
+            file_id = save_file(data, filename=key, metadata={"assetKey": key, "contentType": content_type})
+            previous = collection.find_one_and_replace(
+                {"_id": key},
+                {
+                    "namespace": self.namespace,
+                    "fileId": file_id,
+                    "size": len(data),
+                    "contentType": content_type,
+                    "createdAt": now,
+                    "lastHitAt": now,
+                    "expiresAt": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True,
+            )
+            if previous is not None and previous.get("fileId") != file_id:
+                delete_file(previous["fileId"])
+
+            with self._lock:
+                self._stores += 1
+                check = self._stores % _EVICTION_CHECK_EVERY == 0
+            if check:
+                self.evict(collection)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Asset store '{self.namespace}' write failed: {e}")
+
+    def evict(self, collection=None) -> int:
+        """Drop expired entries, then the least recently used ones until the namespace fits max_bytes."""
+        collection = collection if collection is not None else self._mongo()
+        if collection is None:
+            return 0
+        from backend.repository.ai_models import delete_file
+
+        doomed = list(collection.find(
+            {"namespace": self.namespace, "expiresAt": {"$lte": datetime.utcnow()}}, {"fileId": 1}
+        ))
+        totals = list(collection.aggregate([
+            {"$match": {"namespace": self.namespace, "expiresAt": {"$gt": datetime.utcnow()}}},
+            {"$group": {"_id": None, "size": {"$sum": "$size"}}},
+        ]))
+        excess = (totals[0]["size"] if totals else 0) - self.max_bytes
+        if excess > 0:
+            cursor = collection.find(
+                {"namespace": self.namespace, "expiresAt": {"$gt": datetime.utcnow()}}, {"fileId": 1, "size": 1}
+            ).sort("lastHitAt", 1)
+            for doc in cursor:
+                if excess <= 0:
+                    break
+                doomed.append(doc)
+                excess -= doc.get("size", 0)
+
+        for doc in doomed:
+            delete_file(doc["fileId"])
+        if doomed:
+            collection.delete_many({"_id": {"$in": [d["_id"] for d in doomed]}})
+            self._count("evicted", len(doomed))
+            logger.info(f"Asset store '{self.namespace}' evicted {len(doomed)} entries")
+        return len(doomed)
+
+    def get_or_create(self, key: str, create: Callable[[], bytes], content_type: str = None) -> bytes:
+        """Return the stored asset for key, or run create() once (even under concurrency) and store it."""
+        if not self.enabled:
+            return create()
+
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = Future()
+        if not owner:
+            self._count("shared")
+            return pending.result()
+
+        try:
+            data = create()
+            if data:
+                self.put(key, data, content_type)
+            pending.set_result(data)
+            return data
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["store_hits"] + stats["misses"]
+        stats.update(
+            namespace=self.namespace,
+            enabled=self.enabled,
+            memory_entries=len(self.memory),
+            memory_bytes=self.memory.size,
+            gridfs_tier=self._collection is not None,
+            hit_rate=round((stats["memory_hits"] + stats["store_hits"]) / lookups, 4) if lookups else 0.0,
+        )
+        return stats
@@ -0,0 +1,154 @@
+# audio_analysis.py
+import os
+import logging
+
+import numpy as np
+
+from backend.utils.audio_io import PcmAudio, decode_audio, open_wav_mmap
+
+logger = logging.getLogger(__name__)
+
+# Analysis frame: RMS envelope and short-time spectrum resolution.
+ANALYSIS_FRAME_MS = int(os.getenv("ANALYSIS_FRAME_MS", "50"))
+# Frames processed per vectorized block; bounds memory regardless of episode length.
+ANALYSIS_BLOCK_FRAMES = int(os.getenv("ANALYSIS_BLOCK_FRAMES", "400"))
+# Same defaults as the ffmpeg silencedetect call this replaces (noise=-40dB:d=2.0).
+SILENCE_THRESHOLD_DB = float(os.getenv("SILENCE_THRESHOLD_DB", "-40"))
+PAUSE_MIN_SECONDS = float(os.getenv("PAUSE_MIN_SECONDS", "2.0"))
+# Noise floor (quietest 10% of frames) above this level counts as background noise.
+NOISE_FLOOR_THRESHOLD_DB = float(os.getenv("NOISE_FLOOR_THRESHOLD_DB", "-50"))
+# Upper edge of the hum/rumble band reported separately.
+LOW_BAND_HZ = 500
+
+NOISE_DETECTED = "Background noise detected"
+NO_NOISE_DETECTED = "No significant background noise detected"
+
+_DB_FLOOR = -120.0
+
+
+def _to_db(values: np.ndarray) -> np.ndarray:
+    return 20.0 * np.log10(np.maximum(values, 10 ** (_DB_FLOOR / 20)))
+
+
+def _silence_spans(silent: np.ndarray, frame_seconds: float, min_seconds: float) -> list:
+    """Runs of silent frames at least min_seconds long, as {"start", "end"} in seconds."""
+    if not silent.any():
+        return []
+    padded = np.concatenate(([False], silent, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    keep = (ends - starts) * frame_seconds >= min_seconds
+    return [
+        {"start": round(float(s * frame_seconds), 3), "end": round(float(e * frame_seconds), 3)}
+        for s, e in zip(starts[keep], ends[keep])
+    ]
+
+
+def frame_levels_db(pcm: PcmAudio, frame_ms: int = ANALYSIS_FRAME_MS) -> np.ndarray:
+    """RMS level in dBFS of every frame_ms frame (mono mix), computed block by block."""
+    frame_len = max(1, int(pcm.sample_rate * frame_ms / 1000))
+    n_frames = pcm.frames // frame_len
+    levels = np.empty(n_frames, dtype=np.float32)
+    block_len = frame_len * ANALYSIS_BLOCK_FRAMES
+    for block_start in range(0, n_frames * frame_len, block_len):
+        block = pcm.samples[block_start:min(block_start + block_len, n_frames * frame_len)].astype(np.float32)
+        mono = (block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]) / 32768.0
+        frames = mono.reshape(-1, frame_len)
+        first = block_start // frame_len
+        levels[first:first + frames.shape[0]] = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_len)
+    return _to_db(levels)
+
+
+def analyze_pcm(pcm: PcmAudio, silence_db: float = SILENCE_THRESHOLD_DB, min_pause: float = PAUSE_MIN_SECONDS) -> dict:
+    """
+    One pass over the audio in fixed-size blocks. Each block is framed into a
+    (frames, samples) matrix and gives, per frame, the RMS level, peak and the
+    mean spectrum magnitude below LOW_BAND_HZ. Only those per-frame numbers are
+    kept (a few hundred KB for an hour), never a full-length spectrum.
+    """
+    sample_rate = pcm.sample_rate
+    frame_len = max(1, int(sample_rate * ANALYSIS_FRAME_MS / 1000))
+    frame_seconds = frame_len / sample_rate
+    n_frames = pcm.frames // frame_len
+
+    if n_frames == 0:
+        return {
+            "duration": round(pcm.duration, 3), "sample_rate": sample_rate,
+            "rms_dbfs": _DB_FLOOR, "peak_dbfs": _DB_FLOOR, "noise_floor_dbfs": _DB_FLOOR,
+            "low_band_noise_dbfs": _DB_FLOOR, "speech_to_noise_db": 0.0, "loudness_range_db": 0.0,
+            "background_noise": NO_NOISE_DETECTED, "pauses": [],
+        }
+
+    window = np.hanning(frame_len).astype(np.float32)
+    window_gain = window.sum() / 2 or 1.0
+    freqs = np.fft.rfftfreq(frame_len, d=1.0 / sample_rate)
+    low_band = (freqs > 0) & (freqs <= LOW_BAND_HZ)
+
+    rms = np.empty(n_frames, dtype=np.float32)
+    peak = np.empty(n_frames, dtype=np.float32)
+    low_band_level = np.empty(n_frames, dtype=np.float32)
+    sum_squares = 0.0
+
+    block_len = frame_len * ANALYSIS_BLOCK_FRAMES
+    for block_start in range(0, n_frames * frame_len, block_len):
+        block = pcm.samples[block_start:min(block_start + block_len, n_frames * frame_len)]
+        mono = block.astype(np.float32)
+        mono = mono.mean(axis=1) if mono.shape[1] > 1 else mono[:, 0]
+        mono /= 32768.0
+        frames = mono.reshape(-1, frame_len)
+        first = block_start // frame_len
+        last = first + frames.shape[0]
+
+        squares = np.einsum("ij,ij->i", frames, frames)
+        sum_squares += float(squares.sum())
+        rms[first:last] = np.sqrt(squares / frame_len)
+        peak[first:last] = np.abs(frames).max(axis=1)
+
+        if low_band.any():
+            spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) / window_gain
+            low_band_level[first:last] = spectrum[:, low_band].mean(axis=1)
+        else:
+            low_band_level[first:last] = 0.0
+
+    frame_db = _to_db(rms)
+    silent = frame_db < silence_db
+    voiced_db = frame_db[~silent]
+
+    noise_floor_db = float(np.percentile(frame_db, 10))
+    quietest = frame_db <= noise_floor_db
+    low_band_noise_db = float(_to_db(np.array([low_band_level[quietest].mean()]))[0])
+    speech_db = float(np.median(voiced_db)) if voiced_db.size else noise_floor_db
+
+    return {
+        "duration": round(pcm.duration, 3),
+        "sample_rate": sample_rate,
+        "rms_dbfs": round(float(_to_db(np.array([np.sqrt(sum_squares / (n_frames * frame_len))]))[0]), 2),
+        "peak_dbfs": round(float(_to_db(np.array([peak.max()]))[0]), 2),
+        "noise_floor_dbfs": round(noise_floor_db, 2),
+        "low_band_noise_dbfs": round(low_band_noise_db, 2),
+        "speech_to_noise_db": round(speech_db - noise_floor_db, 2),
+        "loudness_range_db": round(float(np.percentile(voiced_db, 95) - np.percentile(voiced_db, 10)), 2) if voiced_db.size else 0.0,
+        "background_noise": NOISE_DETECTED if noise_floor_db > NOISE_FLOOR_THRESHOLD_DB else NO_NOISE_DETECTED,
+        "pauses": _silence_spans(silent, frame_seconds, min_pause),
+    }
+
+
+def analyze_audio_signal(audio, silence_db: float = SILENCE_THRESHOLD_DB, min_pause: float = PAUSE_MIN_SECONDS) -> dict:
+    """
+    Noise, loudness and pause metrics for a PcmAudio, raw audio bytes, a
+    file-like object or a path. WAV files on disk are memory-mapped rather
+    than read into memory.
+    """
+    if isinstance(audio, PcmAudio):
+        return analyze_pcm(audio, silence_db, min_pause)
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return analyze_pcm(decode_audio(bytes(audio)), silence_db, min_pause)
+    if hasattr(audio, "read"):
+        return analyze_pcm(decode_audio(audio.read()), silence_db, min_pause)
+
+    try:
+        with open_wav_mmap(audio) as pcm:
+            return analyze_pcm(pcm, silence_db, min_pause)
+    except Exception:
+        with open(audio, "rb") as f:
+            return analyze_pcm(decode_audio(f.read(), suffix=os.path.splitext(audio)[1]), silence_db, min_pause)
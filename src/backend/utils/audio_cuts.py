@@ -0,0 +1,136 @@
+# audio_cuts.py
+import os
+import logging
+import subprocess
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from backend.utils.audio_io import (
+    FFMPEG_BIN, AudioDecodeError, PcmAudio, open_wav_mmap, read_wav_bytes, scratch_file, wav_header
+)
+
+logger = logging.getLogger(__name__)
+
+# Length of the fade at every join; 0 keeps hard, sample-accurate cuts.
+CUT_CROSSFADE_MS = int(os.getenv("CUT_CROSSFADE_MS", "0"))
+
+
+def merge_keep_ranges(cuts: Iterable, duration: float = None) -> List[Tuple[float, float]]:
+    """
+    Normalise keep-ranges ({"start", "end"} dicts or (start, end) pairs, in
+    seconds): drop invalid ones, clamp to duration, sort and merge overlaps.
+    """
+    ranges = []
+    for cut in cuts:
+        start, end = (cut["start"], cut["end"]) if isinstance(cut, dict) else cut
+        if duration is not None:
+            end = min(end, duration)
+        if 0 <= start < end:
+            ranges.append((float(start), float(end)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _frame_ranges(pcm: PcmAudio, ranges) -> List[Tuple[int, int]]:
+    spans = [(pcm.frame_at(start), pcm.frame_at(end)) for start, end in ranges]
+    return [(a, b) for a, b in spans if b > a]
+
+
+def _fade_lengths(spans, fade_frames: int) -> List[int]:
+    """Crossfade length at each join, limited so a fade never eats more than half a segment."""
+    fades = []
+    for (a0, a1), (b0, b1) in zip(spans, spans[1:]):
+        fades.append(min(fade_frames, (a1 - a0) // 2, (b1 - b0) // 2))
+    return fades
+
+
+def render_ranges(pcm: PcmAudio, ranges, crossfade_ms: int = None, out: np.ndarray = None) -> np.ndarray:
+    """
+    Copy the keep-ranges of pcm into one output array in a single pass.
+    The output is allocated once at its final size, so the cost is linear in
+    the output length whatever the number of segments; with crossfade_ms the
+    overlapping edges of neighbouring segments are blended with equal-gain
+    linear fades.
+    """
+    crossfade_ms = CUT_CROSSFADE_MS if crossfade_ms is None else crossfade_ms
+    spans = _frame_ranges(pcm, ranges)
+    fades = _fade_lengths(spans, int(pcm.sample_rate * crossfade_ms / 1000)) if crossfade_ms > 0 else [0] * max(0, len(spans) - 1)
+    total = sum(b - a for a, b in spans) - sum(fades)
+
+    if out is None:
+        out = np.empty((total, pcm.channels), dtype=np.int16)
+    elif out.shape != (total, pcm.channels):
+        raise ValueError(f"Output buffer has shape {out.shape}, expected {(total, pcm.channels)}")
+
+    position = 0
+    for index, (a, b) in enumerate(spans):
+        fade_in = fades[index - 1] if index > 0 else 0
+        if fade_in:
+            ramp = np.linspace(0.0, 1.0, fade_in, endpoint=False, dtype=np.float32)[:, None]
+            tail = out[position - fade_in:position].astype(np.float32)
+            head = pcm.samples[a:a + fade_in].astype(np.float32)
+            out[position - fade_in:position] = np.clip(tail * (1.0 - ramp) + head * ramp, -32768, 32767).astype(np.int16)
+        length = (b - a) - fade_in
+        out[position:position + length] = pcm.samples[a + fade_in:b]
+        position += length
+    return out
+
+
+def cut_to_pcm(pcm: PcmAudio, ranges, crossfade_ms: int = None) -> PcmAudio:
+    return PcmAudio(render_ranges(pcm, ranges, crossfade_ms), pcm.sample_rate)
+
+
+def cut_to_wav_bytes(pcm: PcmAudio, ranges, crossfade_ms: int = None) -> bytes:
+    """Render keep-ranges straight into a WAV buffer (header + samples), without an intermediate array."""
+    crossfade_ms = CUT_CROSSFADE_MS if crossfade_ms is None else crossfade_ms
+    spans = _frame_ranges(pcm, ranges)
+    fades = _fade_lengths(spans, int(pcm.sample_rate * crossfade_ms / 1000)) if crossfade_ms > 0 else []
+    total = sum(b - a for a, b in spans) - sum(fades)
+
+    header = wav_header(total, pcm.sample_rate, pcm.channels)
+    buffer = bytearray(len(header) + total * pcm.channels * 2)
+    buffer[:len(header)] = header
+    out = np.frombuffer(buffer, dtype="<i2", offset=len(header)).reshape(total, pcm.channels)
+    render_ranges(pcm, ranges, crossfade_ms, out=out)
+    return bytes(buffer)
+
+
+@contextmanager
+def _scratch_wav(data: bytes, suffix: str):
+    """Decode compressed audio to a 16-bit WAV scratch file and memory-map it."""
+    with scratch_file(data, suffix=suffix) as source, scratch_file(suffix=".wav") as target:
+        cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y", "-nostdin", "-i", source,
+               "-vn", "-acodec", "pcm_s16le", "-f", "wav", target]
+        proc = subprocess.run(cmd, capture_output=True)
+        if proc.returncode != 0:
+            raise AudioDecodeError(f"FFmpeg failed: {proc.stderr.decode(errors='replace').strip()[-500:]}")
+        with open_wav_mmap(target) as pcm:
+            yield pcm
+
+
+def cut_audio_bytes(data: bytes, cuts, crossfade_ms: int = None, suffix: str = ".bin") -> Tuple[bytes, int]:
+    """
+    Keep only the given ranges of an audio file and return (wav_bytes, segments_kept).
+    - 16-bit WAV input is read in place (no decode, no copy of the source).
+    - Anything else is decoded once by ffmpeg to a scratch WAV that is
+      memory-mapped, so only the kept frames are ever copied.
+    """
+    try:
+        pcm = read_wav_bytes(data)
+        merged = merge_keep_ranges(cuts, pcm.duration)
+        return cut_to_wav_bytes(pcm, merged, crossfade_ms), len(merged)
+    except AudioDecodeError:
+        pass
+
+    with _scratch_wav(data, suffix) as pcm:
+        merged = merge_keep_ranges(cuts, pcm.duration)
+        return cut_to_wav_bytes(pcm, merged, crossfade_ms), len(merged)
+
@@ -0,0 +1,369 @@
+# audio_io.py
+import os
+import mmap
+import struct
+import logging
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# Scratch files (only used when a format can't be read from a pipe) go to tmpfs when available.
+AUDIO_SCRATCH_DIR = os.getenv("AUDIO_SCRATCH_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioDecodeError(RuntimeError):
+    pass
+
+
+class PcmAudio:
+    """
+    Decoded 16-bit PCM audio held as a NumPy array of shape (frames, channels).
+    Slicing returns views, so passing audio between steps never copies the episode.
+    """
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        self.samples = samples
+        self.sample_rate = int(sample_rate)
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def frame_at(self, seconds: float) -> int:
+        return max(0, min(self.frames, int(round(seconds * self.sample_rate))))
+
+    def slice(self, start: float, end: float) -> "PcmAudio":
+        return PcmAudio(self.samples[self.frame_at(start):self.frame_at(end)], self.sample_rate)
+
+    def mono_float(self) -> np.ndarray:
+        """Mono float32 signal in [-1, 1] for analysis."""
+        data = self.samples.astype(np.float32)
+        if self.channels > 1:
+            data = data.mean(axis=1)
+        else:
+            data = data[:, 0]
+        return data / 32768.0
+
+    def to_wav_bytes(self) -> bytes:
+        return wav_header(self.frames, self.sample_rate, self.channels) + np.ascontiguousarray(self.samples, dtype="<i2").tobytes()
+
+    def to_segment(self):
+        """pydub AudioSegment view of the same samples, for code paths that still use pydub."""
+        from pydub import AudioSegment
+        return AudioSegment(
+            data=np.ascontiguousarray(self.samples, dtype="<i2").tobytes(),
+            sample_width=2,
+            frame_rate=self.sample_rate,
+            channels=self.channels,
+        )
+
+
+def wav_header(frames: int, sample_rate: int, channels: int, bits: int = 16) -> bytes:
+    block_align = channels * bits // 8
+    data_size = frames * block_align
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, _WAVE_FORMAT_PCM, channels, sample_rate,
+        sample_rate * block_align, block_align, bits,
+        b"data", data_size,
+    )
+
+
+def parse_wav_layout(buffer) -> dict:
+    """
+    Locate the fmt/data chunks of a RIFF/WAVE buffer (bytes, memoryview or mmap).
+    Streamed WAVs (e.g. ffmpeg writing to a pipe) carry placeholder sizes, so a data
+    chunk that claims more than is available is treated as "until end of buffer".
+    """
+    if len(buffer) < 12 or bytes(buffer[0:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+        raise AudioDecodeError("Not a RIFF/WAVE buffer")
+
+    layout = {}
+    offset = 12
+    while offset + 8 <= len(buffer):
+        chunk_id = bytes(buffer[offset:offset + 4])
+        chunk_size = struct.unpack("<I", bytes(buffer[offset + 4:offset + 8]))[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", bytes(buffer[body:body + 16]))
+            layout.update(audio_format=audio_format, channels=channels, sample_rate=sample_rate, bits=bits)
+        elif chunk_id == b"data":
+            available = len(buffer) - body
+            size = chunk_size if 0 < chunk_size <= available else available
+            layout.update(data_offset=body, data_size=size)
+            break
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if "channels" not in layout or "data_offset" not in layout:
+        raise AudioDecodeError("WAV buffer is missing fmt or data chunk")
+    return layout
+
+
+def _is_pcm16(layout: dict) -> bool:
+    return layout["audio_format"] in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE) and layout["bits"] == 16
+
+
+def _pcm_from_layout(buffer, layout: dict) -> PcmAudio:
+    channels = layout["channels"]
+    frames = layout["data_size"] // (2 * channels)
+    samples = np.frombuffer(buffer, dtype="<i2", count=frames * channels, offset=layout["data_offset"])
+    return PcmAudio(samples.reshape(frames, channels), layout["sample_rate"])
+
+
+def read_wav_bytes(data: bytes) -> PcmAudio:
+    """Zero-copy view of 16-bit PCM WAV bytes. Raises AudioDecodeError for anything else."""
+    layout = parse_wav_layout(data)
+    if not _is_pcm16(layout):
+        raise AudioDecodeError("WAV is not 16-bit PCM")
+    return _pcm_from_layout(data, layout)
+
+
+@contextmanager
+def open_wav_mmap(path: str):
+    """Memory-map a 16-bit PCM WAV file; yields a PcmAudio backed by the page cache."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            layout = parse_wav_layout(mapped)
+            if not _is_pcm16(layout):
+                raise AudioDecodeError("WAV is not 16-bit PCM")
+            yield _pcm_from_layout(mapped, layout)
+        finally:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a view; the map is released once it is garbage collected.
+                pass
+
+
+@contextmanager
+def scratch_file(data: bytes = None, suffix: str = ".bin"):
+    """Single scratch file for tools that need a seekable path; removed on exit."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=AUDIO_SCRATCH_DIR)
+    try:
+        if data is not None:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        else:
+            os.close(fd)
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_ffmpeg(input_bytes: bytes, args: list, input_path: str = None, input_args: list = None) -> bytes:
+    """Run ffmpeg reading from stdin (or input_path) and writing to stdout."""
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y"]
+    if input_path:
+        cmd.append("-nostdin")
+    cmd += list(input_args or []) + ["-i", input_path or "pipe:0"] + list(args) + ["pipe:1"]
+    proc = subprocess.run(cmd, input=None if input_path else input_bytes, capture_output=True)
+    if proc.returncode != 0:
+        raise AudioDecodeError(f"FFmpeg failed: {proc.stderr.decode(errors='replace').strip()[-500:]}")
+    return proc.stdout
+
+
+def decode_audio(data: bytes, sample_rate: int = None, channels: int = None, suffix: str = ".bin") -> PcmAudio:
+    """
+    Decode any audio/video bytes to 16-bit PCM.
+    - 16-bit WAV already at the requested rate/channels is used as-is (no copy, no ffmpeg).
+    - Everything else is piped through ffmpeg stdin -> stdout.
+    - Containers that need seeking (e.g. mp4 with the index at the end) fall back to
+      one scratch file.
+    """
+    try:
+        pcm = read_wav_bytes(data)
+        if (sample_rate is None or pcm.sample_rate == sample_rate) and (channels is None or pcm.channels == channels):
+            return pcm
+    except AudioDecodeError:
+        pass
+
+    args = ["-vn"]
+    if sample_rate:
+        args += ["-ar", str(sample_rate)]
+    if channels:
+        args += ["-ac", str(channels)]
+    args += ["-acodec", "pcm_s16le", "-f", "wav"]
+
+    try:
+        out = run_ffmpeg(data, args)
+    except AudioDecodeError as e:
+        logger.info(f"Pipe decode failed ({e}); retrying from a scratch file")
+        with scratch_file(data, suffix=suffix) as path:
+            out = run_ffmpeg(None, args, input_path=path)
+    return read_wav_bytes(out)
+
+
+def decode_audio_file(path: str, sample_rate: int = None, channels: int = None) -> PcmAudio:
+    """decode_audio for a file on disk: ffmpeg reads the path, so the encoded file is never held in memory."""
+    with open(path, "rb") as f:
+        head = f.read(65536)
+    try:
+        layout = parse_wav_layout(head)
+        if _is_pcm16(layout) and (sample_rate is None or layout["sample_rate"] == sample_rate) \
+                and (channels is None or layout["channels"] == channels):
+            with open(path, "rb") as f:
+                return read_wav_bytes(f.read())
+    except AudioDecodeError:
+        pass
+
+    args = ["-vn"]
+    if sample_rate:
+        args += ["-ar", str(sample_rate)]
+    if channels:
+        args += ["-ac", str(channels)]
+    args += ["-acodec", "pcm_s16le", "-f", "wav"]
+    return read_wav_bytes(run_ffmpeg(None, args, input_path=path))
+
+
+def _read_wav_stream_header(stream) -> dict:
+    """Read a streamed WAV (placeholder sizes) up to the start of its data chunk."""
+    head = b""
+    while len(head) <= 65536:
+        chunk = stream.read(4096)
+        if not chunk:
+            break
+        head += chunk
+        try:
+            layout = parse_wav_layout(head)
+        except AudioDecodeError:
+            continue
+        if not _is_pcm16(layout):
+            raise AudioDecodeError("WAV is not 16-bit PCM")
+        layout["leftover"] = head[layout["data_offset"]:]
+        return layout
+    raise AudioDecodeError("FFmpeg produced no audio")
+
+
+def _stream_ffmpeg_wav(data: bytes, input_path: str, channels: int, block_frames: int):
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error"]
+    if input_path:
+        cmd.append("-nostdin")
+    cmd += ["-i", input_path or "pipe:0", "-vn"]
+    if channels:
+        cmd += ["-ac", str(channels)]
+    cmd += ["-acodec", "pcm_s16le", "-f", "wav", "pipe:1"]
+    proc = subprocess.Popen(cmd, stdin=None if input_path else subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def feed():
+        # Written from a thread so a full stdout pipe can never deadlock the writer.
+        try:
+            proc.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            proc.stdin.close()
+
+    writer = None
+    if not input_path:
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+    try:
+        layout = _read_wav_stream_header(proc.stdout)
+        frame_bytes = 2 * layout["channels"]
+        yield layout["sample_rate"], layout["channels"]
+
+        pending = layout["leftover"]
+        while True:
+            chunk = proc.stdout.read(block_frames * frame_bytes)
+            pending += chunk
+            usable = len(pending) // frame_bytes * frame_bytes
+            if usable:
+                yield np.frombuffer(pending[:usable], dtype="<i2").reshape(-1, layout["channels"])
+                pending = pending[usable:]
+            if not chunk:
+                break
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if writer:
+            writer.join()
+
+
+def iter_audio_blocks(data: bytes = None, block_frames: int = 1 << 16, channels: int = None, suffix: str = ".bin",
+                      input_path: str = None):
+    """
+    Decode audio incrementally: yields (sample_rate, channels) first, then int16
+    sample blocks of shape (frames, channels). Memory stays at one block
+    whatever the length of the recording. 16-bit WAV is sliced in place
+    (memory-mapped when given input_path); other formats stream out of ffmpeg
+    (through a scratch file for containers that can't be read from a pipe).
+    """
+    if input_path:
+        try:
+            with open_wav_mmap(input_path) as pcm:
+                if channels is None or pcm.channels == channels:
+                    yield pcm.sample_rate, pcm.channels
+                    for start in range(0, pcm.frames, block_frames):
+                        yield pcm.samples[start:start + block_frames]
+                    return
+        except AudioDecodeError:
+            pass
+        yield from _stream_ffmpeg_wav(None, input_path, channels, block_frames)
+        return
+
+    try:
+        pcm = read_wav_bytes(data)
+        if channels is None or pcm.channels == channels:
+            yield pcm.sample_rate, pcm.channels
+            for start in range(0, pcm.frames, block_frames):
+                yield pcm.samples[start:start + block_frames]
+            return
+    except AudioDecodeError:
+        pass
+
+    try:
+        blocks = _stream_ffmpeg_wav(data, None, channels, block_frames)
+        header = next(blocks)
+    except AudioDecodeError as e:
+        logger.info(f"Pipe decode failed ({e}); streaming from a scratch file")
+        with scratch_file(data, suffix=suffix) as path:
+            yield from _stream_ffmpeg_wav(None, path, channels, block_frames)
+        return
+    yield header
+    yield from blocks
+
+
+def encode_audio(pcm: PcmAudio, fmt: str = "wav", bitrate: str = None) -> bytes:
+    """Encode PCM to wav (pure Python) or any ffmpeg format via pipes."""
+    if fmt == "wav":
+        return pcm.to_wav_bytes()
+    args = ["-f", "s16le", "-ar", str(pcm.sample_rate), "-ac", str(pcm.channels)]
+    raw = np.ascontiguousarray(pcm.samples, dtype="<i2").tobytes()
+    out_args = ["-b:a", bitrate] if bitrate else []
+    cmd = [FFMPEG_BIN, "-hide_banner", "-loglevel", "error", "-y"] + args + ["-i", "pipe:0"] + out_args + ["-f", fmt, "pipe:1"]
+    proc = subprocess.run(cmd, input=raw, capture_output=True)
+    if proc.returncode != 0:
+        raise AudioDecodeError(f"FFmpeg encode failed: {proc.stderr.decode(errors='replace').strip()[-500:]}")
+    return proc.stdout
+
+
+def transcode_to_wav(data: bytes, ffmpeg_args: list) -> bytes:
+    """Apply ffmpeg options/filters to audio bytes and return a well-formed WAV."""
+    out = run_ffmpeg(data, list(ffmpeg_args) + ["-acodec", "pcm_s16le", "-f", "wav"])
+    # Rewrite the header: a WAV streamed to a pipe has placeholder sizes.
+    return read_wav_bytes(out).to_wav_bytes()
@@ -0,0 +1,148 @@
+# audio_mix.py
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.audio_io import PcmAudio, decode_audio, wav_header
+
+logger = logging.getLogger(__name__)
+
+# Frames mixed per block; bounds the float32 working set whatever the episode length.
+MIX_BLOCK_SECONDS = float(os.getenv("MIX_BLOCK_SECONDS", "10"))
+MIX_DECODE_WORKERS = int(os.getenv("MIX_DECODE_WORKERS", "4"))
+
+
+class Stem:
+    """One track laid over the base audio: encoded bytes plus where and how loud to play it."""
+
+    def __init__(self, data: bytes, start: float = 0.0, gain_db: float = 0.0,
+                 fade_in_ms: int = 0, fade_out_ms: int = 0, loop: bool = False, name: str = None):
+        self.data = data
+        self.start = start
+        self.gain_db = gain_db
+        self.fade_in_ms = fade_in_ms
+        self.fade_out_ms = fade_out_ms
+        # A looped stem repeats from start until the end of the base audio (background beds).
+        self.loop = loop
+        self.name = name or "stem"
+
+
+class _Track:
+    def __init__(self, samples: np.ndarray, offset: int, loop: bool):
+        self.samples = samples
+        self.offset = offset
+        self.loop = loop
+
+
+def _envelope(frames: int, gain_db: float, fade_in: int, fade_out: int) -> np.ndarray:
+    """Per-frame gain: constant level with linear fade in/out ramps."""
+    env = np.full(frames, 10 ** (gain_db / 20), dtype=np.float32)
+    fade_in, fade_out = min(fade_in, frames), min(fade_out, frames)
+    if fade_in:
+        env[:fade_in] *= np.linspace(0.0, 1.0, fade_in, endpoint=False, dtype=np.float32)
+    if fade_out:
+        env[frames - fade_out:] *= np.linspace(1.0, 0.0, fade_out, endpoint=False, dtype=np.float32)
+    return env
+
+
+def _prepare(stem: Stem, base: PcmAudio) -> Optional[_Track]:
+    """Decode a stem at the base rate/channels and bake its envelope into float32 samples."""
+    offset = base.frame_at(stem.start)
+    if offset >= base.frames:
+        logger.warning(f"Skipping {stem.name}: starts at {stem.start:.2f}s, after the end of the audio ({base.duration:.2f}s)")
+        return None
+
+    pcm = decode_audio(stem.data, sample_rate=base.sample_rate, channels=base.channels)
+    if pcm.frames == 0:
+        logger.warning(f"Skipping {stem.name}: no audio")
+        return None
+
+    frames = pcm.frames if stem.loop else min(pcm.frames, base.frames - offset)
+    env = _envelope(
+        frames, stem.gain_db,
+        int(base.sample_rate * stem.fade_in_ms / 1000),
+        int(base.sample_rate * stem.fade_out_ms / 1000),
+    )
+    samples = pcm.samples[:frames].astype(np.float32)
+    samples *= env[:, None]
+    return _Track(samples, offset, stem.loop)
+
+
+def _prepare_all(stems: List[Stem], base: PcmAudio, max_workers: int) -> List[_Track]:
+    def prepare(stem):
+        try:
+            return _prepare(stem, base)
+        except Exception as e:
+            logger.error(f"Skipping {stem.name}: {e}")
+            return None
+
+    if len(stems) <= 1:
+        tracks = [prepare(s) for s in stems]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(stems))) as pool:
+            tracks = list(pool.map(prepare, stems))
+    return [t for t in tracks if t is not None]
+
+
+def _add_track(acc: np.ndarray, block_start: int, track: _Track):
+    """Add the part of a track that falls inside this block to the accumulator."""
+    block_end = block_start + acc.shape[0]
+    start = max(block_start, track.offset)
+    if track.loop:
+        end = block_end
+    else:
+        end = min(block_end, track.offset + track.samples.shape[0])
+    if end <= start:
+        return
+
+    if track.loop:
+        # Walk the loop in contiguous pieces rather than gathering by index.
+        period = track.samples.shape[0]
+        position = start
+        while position < end:
+            phase = (position - track.offset) % period
+            length = min(end - position, period - phase)
+            acc[position - block_start:position - block_start + length] += track.samples[phase:phase + length]
+            position += length
+    else:
+        acc[start - block_start:end - block_start] += track.samples[start - track.offset:end - track.offset]
+
+
+def mix_to_wav_bytes(base: PcmAudio, stems: List[Stem], max_workers: int = None) -> Tuple[bytes, int]:
+    """
+    Lay every stem over base and return (wav_bytes, stems_mixed).
+    Stems are decoded once and carry their gain/fades as a baked-in envelope;
+    the episode is then walked once in blocks, summing the stems that overlap
+    each block in float32 and clipping to 16-bit exactly once. Blocks no stem
+    touches are copied through unchanged. Mixing N stems costs one pass over
+    the episode plus the length of the stems, not N passes.
+    """
+    tracks = _prepare_all(stems, base, max_workers or MIX_DECODE_WORKERS)
+
+    header = wav_header(base.frames, base.sample_rate, base.channels)
+    buffer = bytearray(len(header) + base.frames * base.channels * 2)
+    buffer[:len(header)] = header
+    out = np.frombuffer(buffer, dtype="<i2", offset=len(header)).reshape(base.frames, base.channels)
+
+    block_len = max(1, int(base.sample_rate * MIX_BLOCK_SECONDS))
+    for block_start in range(0, base.frames, block_len):
+        block_end = min(block_start + block_len, base.frames)
+        active = [
+            t for t in tracks
+            if t.offset < block_end and (t.loop or t.offset + t.samples.shape[0] > block_start)
+        ]
+        if not active:
+            out[block_start:block_end] = base.samples[block_start:block_end]
+            continue
+
+        acc = base.samples[block_start:block_end].astype(np.float32)
+        for track in active:
+            _add_track(acc, block_start, track)
+        np.rint(acc, out=acc)
+        np.clip(acc, -32768, 32767, out=acc)
+        out[block_start:block_end] = acc
+
+    return bytes(buffer), len(tracks)
@@ -0,0 +1,162 @@
+# batch_inference.py
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List
+
+from backend.utils.model_registry import get_pipeline
+
+logger = logging.getLogger(__name__)
+
+ZERO_SHOT_BATCH_SIZE = int(os.getenv("ZERO_SHOT_BATCH_SIZE", "16"))
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "32"))
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "10000"))
+
+
+class BoundedCache:
+    """
+    Small thread-safe LRU map used to memoize per-sentence model outputs.
+    With max_weight and weigh, the total weight of the values (e.g. their
+    length) is bounded as well as their number.
+    """
+
+    def __init__(self, max_items: int, max_weight: int = 0, weigh: Callable = None):
+        self.max_items = max_items
+        self.max_weight = max_weight if weigh else 0
+        self.weigh = weigh
+        self.weight = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_items <= 0:
+            return
+        if self.max_weight and self.weigh(value) > self.max_weight:
+            return
+        with self._lock:
+            if self.max_weight:
+                if key in self._items:
+                    self.weight -= self.weigh(self._items[key])
+                self.weight += self.weigh(value)
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items or (self.max_weight and self.weight > self.max_weight):
+                _, evicted = self._items.popitem(last=False)
+                if self.max_weight:
+                    self.weight -= self.weigh(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.weight = 0
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+emotion_cache = BoundedCache(EMOTION_CACHE_SIZE)
+
+
+def _sentence_key(sentence: str) -> str:
+    return hashlib.sha1(sentence.encode("utf-8")).hexdigest()
+
+
+def _length_sorted_order(texts: List[str]) -> List[int]:
+    """Indices of texts sorted by length so each batch pads to a similar size."""
+    return sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+
+def _restore_order(order: List[int], sorted_results: list) -> list:
+    results = [None] * len(order)
+    for position, original_index in enumerate(order):
+        results[original_index] = sorted_results[position]
+    return results
+
+
+def classify_zero_shot(sentences: List[str], labels: List[str], batch_size: int = None, classifier=None) -> List[dict]:
+    """
+    Run zero-shot classification over many sentences in batched forward passes.
+
+    Returns one {"sequence", "labels", "scores"} dict per input sentence, in input
+    order - the same shape the pipeline returns for a single sentence.
+    """
+    if not sentences:
+        return []
+
+    batch_size = batch_size or ZERO_SHOT_BATCH_SIZE
+    classifier = classifier or get_pipeline("zero_shot")
+
+    # The pipeline expands each sentence into one NLI pair per label and batches
+    # those pairs; feeding length-sorted sentences keeps padding per batch small.
+    order = _length_sorted_order(sentences)
+    ordered = [sentences[i] for i in order]
+    outputs = classifier(ordered, candidate_labels=labels, batch_size=batch_size * len(labels))
+    if isinstance(outputs, dict):
+        outputs = [outputs]
+
+    logger.info(f"Zero-shot classified {len(sentences)} sentences (batch size {batch_size})")
+    return _restore_order(order, outputs)
+
+
+def classify_emotions(sentences: List[str], batch_size: int = None, classifier=None, cache: BoundedCache = emotion_cache) -> List[list]:
+    """
+    Emotion-classify many sentences at once.
+    - Identical sentences are classified only once.
+    - Results are cached by sentence hash, so re-analysing an edited transcript
+      only runs the model on sentences that changed.
+
+    Returns, per input sentence, the same list of {"label", "score"} dicts the
+    pipeline returns for a single sentence.
+    """
+    if not sentences:
+        return []
+
+    keys = [_sentence_key(s) for s in sentences]
+    known = {}
+    pending = {}  # key -> sentence, de-duplicated, first occurrence wins
+    for key, sentence in zip(keys, sentences):
+        if key in known or key in pending:
+            continue
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            known[key] = cached
+        else:
+            pending[key] = sentence
+
+    if pending:
+        batch_size = batch_size or EMOTION_BATCH_SIZE
+        classifier = classifier or get_pipeline("emotion")
+        pending_keys = list(pending)
+        pending_texts = [pending[k] for k in pending_keys]
+
+        order = _length_sorted_order(pending_texts)
+        ordered = [pending_texts[i] for i in order]
+        outputs = classifier(ordered, batch_size=batch_size, truncation=True)
+        outputs = _restore_order(order, outputs)
+
+        for key, output in zip(pending_keys, outputs):
+            # A list input yields one dict per sentence; keep the single-sentence shape.
+            result = [output] if isinstance(output, dict) else output
+            known[key] = result
+            if cache is not None:
+                cache.put(key, result)
+
+    logger.info(
+        f"Emotion classified {len(sentences)} sentences "
+        f"({len(pending)} through the model, {len(sentences) - len(pending)} de-duplicated or cached)"
+    )
+    return [[dict(item) for item in known[key]] for key in keys]
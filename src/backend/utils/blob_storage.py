@@ -1,35 +1,377 @@
 from azure.storage.blob import BlobServiceClient, BlobClient, ContentSettings # Import ContentSettings
 from azure.core.exceptions import ResourceNotFoundError, AzureError # Import specific exceptions
+from azure.core.pipeline.transport import RequestsTransport
+import io
 import os
+import time
+import base64
+import hashlib
+import shutil
 import logging
 import tempfile
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
-# Best Practice: Use a function to get the client, allowing for retry/error handling during init
-def get_blob_service_client():
-    """Initializes and returns a BlobServiceClient instance."""
-    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-    if not connection_string:
-        logger.error("AZURE_STORAGE_CONNECTION_STRING environment variable not set.")
-        return None
-    try:
-        # Best Practice: Specify API version if needed, otherwise defaults work
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        # Optional: Test connection (e.g., list containers) - can add overhead
-        # blob_service_client.list_containers(max_results=1)
-        logger.info("BlobServiceClient initialized successfully.")
-        return blob_service_client
-    except ValueError as ve:
-        logger.error(f"Invalid connection string format: {ve}", exc_info=True)
-        return None
-    except AzureError as ae:
-        logger.error(f"Azure connection error during BlobServiceClient initialization: {ae}", exc_info=True)
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error during BlobServiceClient initialization: {e}", exc_info=True)
+# "azure" (Azure or Azurite, via AZURE_STORAGE_CONNECTION_STRING) or "local" (a directory, for offline runs)
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "azure").lower()
+BLOB_LOCAL_ROOT = os.getenv("BLOB_LOCAL_ROOT", os.path.join(tempfile.gettempdir(), "blob_storage"))
+# Parallel transfers: blobs larger than a single put/get are moved as blocks/ranges over several connections.
+BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "4"))
+BLOB_MAX_BLOCK_SIZE = int(os.getenv("BLOB_MAX_BLOCK_SIZE", str(8 * 1024 * 1024)))
+BLOB_MAX_SINGLE_PUT_SIZE = int(os.getenv("BLOB_MAX_SINGLE_PUT_SIZE", str(16 * 1024 * 1024)))
+BLOB_MAX_CHUNK_GET_SIZE = int(os.getenv("BLOB_MAX_CHUNK_GET_SIZE", str(8 * 1024 * 1024)))
+BLOB_MAX_SINGLE_GET_SIZE = int(os.getenv("BLOB_MAX_SINGLE_GET_SIZE", str(16 * 1024 * 1024)))
+# Keep-alive connections shared by every blob operation in the process.
+BLOB_POOL_SIZE = int(os.getenv("BLOB_POOL_SIZE", "32"))
+# After a failed client initialisation (missing setting, transient Azure error), wait this long before trying again.
+BLOB_INIT_RETRY_SECONDS = float(os.getenv("BLOB_INIT_RETRY_SECONDS", "30"))
+
+_PUBLIC_BLOB_HOST = "blob.core.windows.net"
+
+
+class BlobMetrics:
+    """Per-operation call count, errors, bytes moved and latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, op: str, seconds: float, nbytes: int = 0, error: bool = False):
+        with self._lock:
+            stats = self._ops.setdefault(op, {"calls": 0, "errors": 0, "bytes": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["bytes"] += nbytes
+            ms = seconds * 1000
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                op: {**stats, "total_ms": round(stats["total_ms"], 1), "max_ms": round(stats["max_ms"], 1),
+                     "avg_ms": round(stats["total_ms"] / stats["calls"], 1) if stats["calls"] else 0.0}
+                for op, stats in self._ops.items()
+            }
+
+
+class _Timed:
+    def __init__(self, metrics: BlobMetrics, op: str):
+        self.metrics = metrics
+        self.op = op
+        self.nbytes = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.op, time.perf_counter() - self.start, self.nbytes, error=exc_type is not None)
+
+
+class _LocalStagedUpload:
+    """Appends blocks to a .part file that is renamed into place on commit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.part_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(self.part_path, "wb")
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self, content_type=None, metadata=None):
+        self.file.close()
+        os.replace(self.part_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+class _AzureStagedUpload:
+    """One staged block per write, committed as a block list; uncommitted blocks are never visible."""
+
+    def __init__(self, blob_client: BlobClient):
+        self.blob_client = blob_client
+        self.block_ids = []
+
+    def write(self, chunk: bytes):
+        block_id = base64.b64encode(f"{len(self.block_ids):08d}".encode()).decode()
+        self.blob_client.stage_block(block_id, chunk)
+        self.block_ids.append(block_id)
+
+    def commit(self, content_type=None, metadata=None):
+        content_settings = ContentSettings(content_type=content_type) if content_type else None
+        self.blob_client.commit_block_list(self.block_ids, content_settings=content_settings, metadata=metadata)
+
+    def abort(self):
+        # Uncommitted blocks are garbage collected by the service.
+        pass
+
+
+class LocalBlobBackend:
+    """Containers as directories under a root; same operations as AzureBlobBackend, no network."""
+
+    def __init__(self, root: str = BLOB_LOCAL_ROOT):
+        self.root = root
+
+    def _path(self, container_name, blob_path):
+        path = os.path.abspath(os.path.join(self.root, container_name, blob_path))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Blob path escapes storage root: {blob_path}")
+        return path
+
+    def url(self, container_name, blob_path):
+        return "file://" + self._path(container_name, blob_path)
+
+    def upload(self, container_name, blob_path, data, content_type=None, metadata=None, content_md5=None) -> int:
+        path = self._path(container_name, blob_path)
+        if content_md5 is not None and isinstance(data, (bytes, bytearray, memoryview)) \
+                and hashlib.md5(data).digest() != content_md5:
+            raise IOError(f"Content-MD5 mismatch for blob '{blob_path}'")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, BLOB_MAX_BLOCK_SIZE)
+            return f.tell()
+
+    def staged_upload(self, container_name, blob_path) -> _LocalStagedUpload:
+        return _LocalStagedUpload(self._path(container_name, blob_path))
+
+    def download_into(self, container_name, blob_path, stream) -> int:
+        path = self._path(container_name, blob_path)
+        if not os.path.exists(path):
+            raise ResourceNotFoundError(f"Blob '{blob_path}' not found in container '{container_name}'.")
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, stream, BLOB_MAX_CHUNK_GET_SIZE)
+        return os.path.getsize(path)
+
+    def exists(self, container_name, blob_path) -> bool:
+        return os.path.exists(self._path(container_name, blob_path))
+
+    def size(self, container_name, blob_path) -> int:
+        return os.path.getsize(self._path(container_name, blob_path))
+
+
+class AzureBlobBackend:
+    """One BlobServiceClient (and one pooled HTTP session) for the whole process."""
+
+    def __init__(self, connection_string: str):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=BLOB_POOL_SIZE, pool_maxsize=BLOB_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.service = BlobServiceClient.from_connection_string(
+            connection_string,
+            transport=RequestsTransport(session=session, session_owner=False),
+            max_block_size=BLOB_MAX_BLOCK_SIZE,
+            max_single_put_size=BLOB_MAX_SINGLE_PUT_SIZE,
+            max_chunk_get_size=BLOB_MAX_CHUNK_GET_SIZE,
+            max_single_get_size=BLOB_MAX_SINGLE_GET_SIZE,
+        )
+
+    def blob_client(self, container_name, blob_path) -> BlobClient:
+        return self.service.get_blob_client(container=container_name, blob=blob_path)
+
+    def url(self, container_name, blob_path):
+        account_name = self.service.account_name
+        if account_name and (self.service.primary_hostname or "").endswith(_PUBLIC_BLOB_HOST):
+            return f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}"
+        # Azurite / custom endpoints: the client knows the real address
+        return self.blob_client(container_name, blob_path).url
+
+    def upload(self, container_name, blob_path, data, content_type=None, metadata=None, content_md5=None) -> int:
+        content_settings = None
+        if content_type or content_md5:
+            content_settings = ContentSettings(content_type=content_type, content_md5=content_md5)
+        # With an MD5 the service checks each request body (single put or every block), so corruption in
+        # transit fails the upload; the whole-blob MD5 is stored through ContentSettings. The response's
+        # Content-MD5 is not compared: for a block-list commit it hashes the block list, not the blob.
+        self.blob_client(container_name, blob_path).upload_blob(
+            data, overwrite=True, content_settings=content_settings, metadata=metadata,
+            max_concurrency=BLOB_MAX_CONCURRENCY, validate_content=content_md5 is not None,
+        )
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return len(data)
+        return data.tell() if hasattr(data, "tell") else 0
+
+    def staged_upload(self, container_name, blob_path) -> _AzureStagedUpload:
+        return _AzureStagedUpload(self.blob_client(container_name, blob_path))
+
+    def download_into(self, container_name, blob_path, stream) -> int:
+        downloader = self.blob_client(container_name, blob_path).download_blob(max_concurrency=BLOB_MAX_CONCURRENCY)
+        return downloader.readinto(stream)
+
+    def exists(self, container_name, blob_path) -> bool:
+        return self.blob_client(container_name, blob_path).exists()
+
+    def size(self, container_name, blob_path) -> int:
+        return self.blob_client(container_name, blob_path).get_blob_properties().size
+
+
+class BlobGateway:
+    """
+    Process-wide entry point for blob storage. The backend is built once on
+    first use and shared, so every operation reuses the same client and
+    connections; every call is timed and counted.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.metrics = BlobMetrics()
+
+    def backend(self):
+        """The shared backend, or None if it cannot be initialised (retried after BLOB_INIT_RETRY_SECONDS)."""
+        if self._backend is not None or time.monotonic() < self._retry_at:
+            return self._backend
+        with self._lock:
+            if self._backend is None and time.monotonic() >= self._retry_at:
+                self._backend = self._create_backend()
+                if self._backend is None:
+                    self._retry_at = time.monotonic() + BLOB_INIT_RETRY_SECONDS
+        return self._backend
+
+    def _create_backend(self):
+        if BLOB_BACKEND == "local":
+            logger.info(f"Blob storage: local backend at {BLOB_LOCAL_ROOT}")
+            return LocalBlobBackend()
+        connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+        if not connection_string:
+            logger.error("AZURE_STORAGE_CONNECTION_STRING environment variable not set.")
+            return None
+        try:
+            backend = AzureBlobBackend(connection_string)
+            logger.info("BlobServiceClient initialized successfully.")
+            return backend
+        except ValueError as ve:
+            logger.error(f"Invalid connection string format: {ve}", exc_info=True)
+        except AzureError as ae:
+            logger.error(f"Azure connection error during BlobServiceClient initialization: {ae}", exc_info=True)
+        except Exception as e:
+            logger.error(f"Unexpected error during BlobServiceClient initialization: {e}", exc_info=True)
         return None
 
+    @property
+    def service(self):
+        backend = self.backend()
+        return backend.service if isinstance(backend, AzureBlobBackend) else None
+
+    def url(self, container_name, blob_path):
+        return self.backend().url(container_name, blob_path)
+
+    def upload(self, container_name, blob_path, data, content_type=None, metadata=None, content_md5=None) -> str:
+        """
+        Upload bytes, a path or a stream; returns the blob URL. Raises on failure.
+        content_md5 (bytes only) is checked by the service and stored with the blob.
+        """
+        backend = self.backend()
+        if backend is None:
+            raise RuntimeError("Blob storage is not configured.")
+        with _Timed(self.metrics, "upload") as timed:
+            if isinstance(data, str) and os.path.exists(data):
+                with open(data, "rb") as f:
+                    timed.nbytes = backend.upload(container_name, blob_path, f, content_type, metadata)
+            else:
+                if hasattr(data, "seek"):
+                    data.seek(0)
+                timed.nbytes = backend.upload(container_name, blob_path, data, content_type, metadata, content_md5)
+        return backend.url(container_name, blob_path)
+
+    def staged_upload(self, container_name, blob_path) -> "StagedUpload":
+        """Upload written chunk by chunk (e.g. while a request streams in); nothing is visible until commit()."""
+        backend = self.backend()
+        if backend is None:
+            raise RuntimeError("Blob storage is not configured.")
+        return StagedUpload(self, backend, container_name, blob_path)
+
+    def download_into(self, container_name, blob_path, stream) -> int:
+        """Write a blob into a writable stream (parallel ranged reads on Azure). Raises on failure."""
+        backend = self.backend()
+        if backend is None:
+            raise RuntimeError("Blob storage is not configured.")
+        with _Timed(self.metrics, "download") as timed:
+            timed.nbytes = backend.download_into(container_name, blob_path, stream)
+        return timed.nbytes
+
+    def exists(self, container_name, blob_path) -> bool:
+        backend = self.backend()
+        if backend is None:
+            raise RuntimeError("Blob storage is not configured.")
+        with _Timed(self.metrics, "exists"):
+            return backend.exists(container_name, blob_path)
+
+    def size(self, container_name, blob_path) -> int:
+        backend = self.backend()
+        if backend is None:
+            raise RuntimeError("Blob storage is not configured.")
+        with _Timed(self.metrics, "properties"):
+            return backend.size(container_name, blob_path)
+
+    def get_metrics(self) -> dict:
+        return {
+            "backend": BLOB_BACKEND,
+            "initialized": self._backend is not None,
+            "max_concurrency": BLOB_MAX_CONCURRENCY,
+            "operations": self.metrics.snapshot(),
+        }
+
+
+class StagedUpload:
+    """A gateway upload in progress; write() each chunk, then commit() for the URL or abort()."""
+
+    def __init__(self, gateway: BlobGateway, backend, container_name, blob_path):
+        self.gateway = gateway
+        self.backend = backend
+        self.container_name = container_name
+        self.blob_path = blob_path
+        self.nbytes = 0
+        self.started = time.perf_counter()
+        self._writer = backend.staged_upload(container_name, blob_path)
+
+    def write(self, chunk: bytes):
+        self._writer.write(chunk)
+        self.nbytes += len(chunk)
+
+    def commit(self, content_type=None, metadata=None) -> str:
+        try:
+            self._writer.commit(content_type, metadata)
+        except Exception:
+            self._record(error=True)
+            raise
+        self._record()
+        return self.backend.url(self.container_name, self.blob_path)
+
+    def abort(self):
+        self._writer.abort()
+        self._record(error=True)
+
+    def _record(self, error: bool = False):
+        self.gateway.metrics.record("staged_upload", time.perf_counter() - self.started, self.nbytes, error=error)
+
+
+blob_gateway = BlobGateway()
+
+
+def get_blob_metrics() -> dict:
+    return blob_gateway.get_metrics()
+
+
+def get_blob_service_client():
+    """Returns the shared BlobServiceClient (None if not configured or using the local backend)."""
+    return blob_gateway.service
+
+
 def upload_file_to_blob(container_name, blob_path, file, content_type=None): # Added content_type parameter
     """
     Uploads a file to Azure Blob Storage.
@@ -41,35 +383,12 @@ def upload_file_to_blob(container_name, blob_path, file, content_type=None): # A
     Returns:
         str: The URL of the uploaded file or None on failure.
     """
-    blob_service_client = get_blob_service_client() # Get client instance
-    if not blob_service_client:
+    if blob_gateway.backend() is None:
         logger.error("BlobServiceClient not initialized. Cannot upload file.")
         return None
 
     try:
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-        
-        current_content_settings = None
-        if content_type:
-            current_content_settings = ContentSettings(content_type=content_type)
-
-        # Best Practice: Check if file is a path or stream
-        if isinstance(file, str) and os.path.exists(file):
-             with open(file, "rb") as data:
-                  blob_client.upload_blob(data, overwrite=True, content_settings=current_content_settings) # Use ContentSettings object
-        else:
-             # Assume it's a file-like object (stream)
-             file.seek(0) # Ensure stream is at the beginning
-             blob_client.upload_blob(file, overwrite=True, content_settings=current_content_settings) # Use ContentSettings object
-
-        # Best Practice: Construct URL reliably
-        account_name = blob_service_client.account_name
-        if not account_name: # Try extracting from connection string if needed (more complex)
-             logger.warning("Could not determine storage account name for URL construction.")
-             blob_url = blob_client.url # Fallback to client's URL property
-        else:
-             blob_url = f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}"
-
+        blob_url = blob_gateway.upload(container_name, blob_path, file, content_type=content_type)
         logger.info(f"File uploaded successfully to {blob_url}")
         return blob_url
     except ResourceNotFoundError:
@@ -91,31 +410,20 @@ def download_blob_to_tempfile(container_name, blob_path):
     Returns:
         str: The path to the temporary file containing the blob content, or None if error.
     """
-    blob_service_client = get_blob_service_client() # Get client instance
-    if not blob_service_client:
+    if blob_gateway.backend() is None:
         logger.error("BlobServiceClient not initialized. Cannot download blob.")
         return None
 
     temp_db_file = None # Initialize outside try
     try:
-        blob_client: BlobClient = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-
         # Create a temporary file securely
         temp_db_file = tempfile.NamedTemporaryFile(delete=False, suffix=".db", prefix="blobdownload_")
 
         logger.info(f"Attempting to download blob '{blob_path}' from container '{container_name}' to {temp_db_file.name}")
 
-        # Download in chunks
-        with open(temp_db_file.name, "wb") as download_file:
-            stream = blob_client.download_blob()
-            chunk_size = 4 * 1024 * 1024
-            total_bytes = 0
-            while True:
-                chunk = stream.read(chunk_size)
-                if not chunk:
-                    break
-                download_file.write(chunk)
-                total_bytes += len(chunk)
+        # Ranges are fetched in parallel and written straight into the file
+        with temp_db_file as download_file:
+            total_bytes = blob_gateway.download_into(container_name, blob_path, download_file)
             logger.info(f"Downloaded {total_bytes} bytes.")
 
         logger.info(f"Blob downloaded successfully to temporary file: {temp_db_file.name}")
@@ -140,34 +448,27 @@ def download_blob_to_tempfile(container_name, blob_path):
 def get_blob_content(container_name, blob_path):
     """
     Read a blob directly from Azure Blob Storage without downloading to a file
-    
+
     Args:
         container_name (str): The name of the Azure Blob Storage container.
         blob_path (str): The path of the blob to read.
-        
+
     Returns:
         bytes: The content of the blob or None if an error occurs.
     """
-    blob_service_client = get_blob_service_client()
-    if not blob_service_client:
+    if blob_gateway.backend() is None:
         logger.error("BlobServiceClient not initialized. Cannot read blob.")
         return None
 
     try:
-        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_path)
-        
-        # Check if blob exists before trying to download
-        if not blob_client.exists():
-            logger.error(f"Blob '{blob_path}' not found in container '{container_name}'.")
-            return None
-        
-        # Download blob content directly to memory
-        download_stream = blob_client.download_blob()
-        content = download_stream.readall()
-        
+        # A missing blob surfaces as ResourceNotFoundError, without a separate exists() round trip
+        buffer = io.BytesIO()
+        blob_gateway.download_into(container_name, blob_path, buffer)
+        content = buffer.getvalue()
+
         logger.info(f"Successfully read blob: {blob_path}")
         return content
-        
+
     except ResourceNotFoundError:
         logger.error(f"Blob '{blob_path}' not found in container '{container_name}'.", exc_info=True)
         return None
@@ -0,0 +1,343 @@
+# feed_cache.py
+import os
+import time
+import zlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.utils.batch_inference import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_ENABLED = os.getenv("FEED_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+# An entry younger than this is served without contacting the feed host.
+FEED_CACHE_TTL_SECONDS = int(os.getenv("FEED_CACHE_TTL_SECONDS", "900"))
+FEED_CACHE_MEMORY_SIZE = int(os.getenv("FEED_CACHE_MEMORY_SIZE", "256"))
+FEED_CACHE_RETENTION_DAYS = int(os.getenv("FEED_CACHE_RETENTION_DAYS", "30"))
+FEED_CACHE_COLLECTION = os.getenv("FEED_CACHE_COLLECTION", "FeedCache")
+FEED_FETCH_CONNECT_TIMEOUT = float(os.getenv("FEED_FETCH_CONNECT_TIMEOUT", "5"))
+FEED_FETCH_READ_TIMEOUT = float(os.getenv("FEED_FETCH_READ_TIMEOUT", "10"))
+# Simultaneous requests to one feed host, across foreground and background fetches.
+FEED_HOST_CONCURRENCY = int(os.getenv("FEED_HOST_CONCURRENCY", "2"))
+# Feeds read within this window count as hot and are revalidated in the background before they go stale.
+FEED_HOT_WINDOW_SECONDS = int(os.getenv("FEED_HOT_WINDOW_SECONDS", "3600"))
+FEED_REFRESH_INTERVAL_SECONDS = int(os.getenv("FEED_REFRESH_INTERVAL_SECONDS", "120"))
+FEED_REFRESH_WORKERS = int(os.getenv("FEED_REFRESH_WORKERS", "4"))
+FEED_USER_AGENT = os.getenv("FEED_USER_AGENT", "PodManager/1.0")
+
+# Background refresh starts once an entry has used this share of its TTL.
+_REFRESH_AHEAD = 0.8
+
+
+class FeedEntry:
+    """One feed URL: raw body, HTTP validators and the parse result."""
+
+    def __init__(self, url: str, body: bytes, etag: str = None, last_modified: str = None,
+                 parsed: dict = None, status: int = 200, fetched_at: float = None, checked_at: float = None):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+        self.status = status
+        self.fetched_at = fetched_at or time.time()
+        self.checked_at = checked_at or self.fetched_at
+
+    def age(self) -> float:
+        return time.time() - self.checked_at
+
+    def result(self) -> Tuple[dict, int]:
+        # Shallow copy so callers can add keys without touching the cached parse
+        return dict(self.parsed), self.status
+
+
+class FeedCache:
+    """
+    RSS feeds by URL, in memory and MongoDB. Fresh entries (checked within the
+    TTL) are served without a request; stale ones are revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged feed costs a 304 and no
+    re-parse. A failed fetch falls back to the last good copy. Concurrent
+    requests for one URL share a single fetch, and each host gets at most
+    FEED_HOST_CONCURRENCY connections.
+    """
+
+    def __init__(self, parse: Callable[[bytes, str], Tuple[dict, int]], ttl_seconds: int = FEED_CACHE_TTL_SECONDS,
+                 memory_size: int = FEED_CACHE_MEMORY_SIZE, enabled: bool = FEED_CACHE_ENABLED):
+        self.parse = parse
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.memory = BoundedCache(memory_size)
+        self._collection = None
+        self._collection_failed = False
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._host_slots = {}
+        self._last_access = {}
+        self._session = None
+        self._refresher = None
+        self._executor = None
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "not_modified": 0, "fetched": 0, "errors": 0,
+                      "stale_served": 0, "shared": 0, "background_refreshes": 0, "uncached": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _mongo(self):
+        if self._collection is not None or self._collection_failed:
+            return self._collection
+        with self._lock:
+            if self._collection is None and not self._collection_failed:
+                try:
+                    from backend.database.mongo_connection import get_db
+                    collection = get_db()[FEED_CACHE_COLLECTION]
+                    collection.create_index("expiresAt", expireAfterSeconds=0)
+                    self._collection = collection
+                except Exception as e:
+                    logger.warning(f"Feed cache: MongoDB tier disabled ({e})")
+                    self._collection_failed = True
+        return self._collection
+
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(1, FEED_HOST_CONCURRENCY))
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers["User-Agent"] = FEED_USER_AGENT
+                    self._session = session
+        return self._session
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(max(1, FEED_HOST_CONCURRENCY))
+            return slot
+
+    # --- storage tiers ---
+
+    def _load(self, url: str) -> Optional[FeedEntry]:
+        entry = self.memory.get(url)
+        if entry is not None:
+            return entry
+        collection = self._mongo()
+        if collection is None:
+            return None
+        try:
+            doc = collection.find_one({"_id": url})
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Feed cache read failed for {url}: {e}")
+            return None
+        if not doc or doc.get("parsed") is None:
+            return None
+        entry = FeedEntry(url, zlib.decompress(bytes(doc["body"])), doc.get("etag"), doc.get("lastModified"),
+                          doc["parsed"], doc.get("status", 200), doc.get("fetchedAt"), doc.get("checkedAt"))
+        self.memory.put(url, entry)
+        return entry
+
+    def _save(self, entry: FeedEntry, body_changed: bool = True):
+        self.memory.put(entry.url, entry)
+        collection = self._mongo()
+        if collection is None:
+            return
+        fields = {
+            "checkedAt": entry.checked_at,
+            "expiresAt": datetime.utcnow() + timedelta(days=FEED_CACHE_RETENTION_DAYS),
+        }
+        if body_changed:
+            from bson.binary import Binary
+            fields.update(
+                body=Binary(zlib.compress(entry.body, 6)),
+                etag=entry.etag,
+                lastModified=entry.last_modified,
+                parsed=entry.parsed,
+                status=entry.status,
+                fetchedAt=entry.fetched_at,
+            )
+        try:
+            collection.update_one({"_id": entry.url}, {"$set": fields}, upsert=True)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Feed cache write failed for {entry.url}: {e}")
+
+    # --- fetching ---
+
+    def _revalidate(self, url: str, cached: Optional[FeedEntry], store: bool = True) -> Tuple[dict, int]:
+        """Conditional GET; returns the (parsed, status) pair fetch_rss_feed callers expect. store=False keeps a new feed out of the cache."""
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            with self._host_slot(url):
+                response = self.session().get(url, headers=headers,
+                                              timeout=(FEED_FETCH_CONNECT_TIMEOUT, FEED_FETCH_READ_TIMEOUT))
+            if cached is not None and response.status_code == 304:
+                cached.checked_at = time.time()
+                self._save(cached, body_changed=False)
+                self._count("not_modified")
+                return cached.result()
+            if not response.ok:
+                logger.error(f"Response not OK for {url}. Status: {response.status_code}. "
+                             f"Response text (first 500 chars): {response.text[:500] if response.text else 'No response text'}")
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self._count("errors")
+            if cached is not None:
+                self._count("stale_served")
+                logger.warning(f"Feed fetch failed for {url} ({type(e).__name__}); serving copy from "
+                               f"{int(cached.age())}s ago")
+                return cached.result()
+            logger.error(f"HTTP request failed for RSS feed {url}. Type: {type(e).__name__}, Error: {e}", exc_info=True)
+            return {"error": f"Failed to fetch RSS feed: {type(e).__name__} - {str(e)}"}, 500
+
+        self._count("fetched")
+        body = response.content
+        if cached is not None and body == cached.body:
+            # Servers without validators: same bytes, so keep the existing parse
+            cached.checked_at = time.time()
+            cached.etag = response.headers.get("ETag") or cached.etag
+            cached.last_modified = response.headers.get("Last-Modified") or cached.last_modified
+            self._save(cached, body_changed=False)
+            return cached.result()
+
+        parsed, status = self.parse(body, url)
+        if status != 200:
+            return parsed, status
+        entry = FeedEntry(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"), parsed, status)
+        if store or cached is not None:
+            self._save(entry)
+        return entry.result()
+
+    def _single_flight(self, url: str, cached: Optional[FeedEntry], store: bool = True) -> Tuple[dict, int]:
+        with self._lock:
+            pending = self._in_flight.get(url)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[url] = Future()
+        if not owner:
+            self._count("shared")
+            data, status = pending.result()
+            return dict(data), status
+
+        try:
+            result = self._revalidate(url, cached, store)
+            pending.set_result(result)
+            return result
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(url, None)
+
+    def get(self, url: str, max_age: float = None, cache: bool = True) -> Tuple[dict, int]:
+        """
+        Parsed feed for url as (data, status), fetching or revalidating only when the copy is stale.
+        cache=False is for bulk or one-shot reads (scraper, activation): a fresh copy already in
+        memory is still used, but a newly fetched feed is not stored and the feed is not marked hot.
+        """
+        if not self.enabled:
+            return self._revalidate(url, None)
+
+        if cache:
+            with self._lock:
+                self._last_access[url] = time.time()
+        max_age = self.ttl_seconds if max_age is None else max_age
+
+        entry = self.memory.get(url)
+        if entry is not None and entry.age() < max_age:
+            self._count("memory_hits")
+            return entry.result()
+        if entry is None and not cache:
+            self._count("uncached")
+            return self._single_flight(url, None, store=False)
+        if entry is None:
+            entry = self._load(url)
+            if entry is not None and entry.age() < max_age:
+                self._count("mongo_hits")
+                return entry.result()
+        return self._single_flight(url, entry)
+
+    # --- background refresh ---
+
+    def refresh_hot(self) -> int:
+        """Revalidate recently read feeds that are close to going stale; returns how many were queued."""
+        now = time.time()
+        with self._lock:
+            for url in [u for u, t in self._last_access.items() if now - t > FEED_HOT_WINDOW_SECONDS]:
+                del self._last_access[url]
+            hot = list(self._last_access)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=FEED_REFRESH_WORKERS, thread_name_prefix="feed-refresh")
+
+        queued = 0
+        for url in hot:
+            entry = self.memory.get(url)
+            if entry is None or entry.age() < self.ttl_seconds * _REFRESH_AHEAD:
+                continue
+            with self._lock:
+                if url in self._in_flight:
+                    continue
+            self._executor.submit(self._background_refresh, url, entry)
+            queued += 1
+        return queued
+
+    def _background_refresh(self, url: str, entry: FeedEntry):
+        try:
+            self._single_flight(url, entry)
+            self._count("background_refreshes")
+        except Exception as e:
+            logger.warning(f"Background feed refresh failed for {url}: {e}")
+
+    def start_refresher(self, interval_seconds: int = FEED_REFRESH_INTERVAL_SECONDS):
+        """Start the daemon thread that keeps hot feeds fresh (once per process)."""
+        if not self.enabled or interval_seconds <= 0:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(interval_seconds)
+                    try:
+                        queued = self.refresh_hot()
+                        if queued:
+                            logger.info(f"Feed cache: refreshing {queued} hot feeds")
+                    except Exception as e:
+                        logger.error(f"Feed cache refresher error: {e}", exc_info=True)
+
+            self._refresher = threading.Thread(target=loop, name="feed-cache-refresher", daemon=True)
+            self._refresher.start()
+        logger.info(f"Feed cache refresher started (every {interval_seconds}s)")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            hot = len(self._last_access)
+        served = stats["memory_hits"] + stats["mongo_hits"] + stats["not_modified"] + stats["fetched"]
+        stats.update(
+            enabled=self.enabled,
+            memory_entries=len(self.memory),
+            mongo_tier=self._collection is not None,
+            hot_feeds=hot,
+            hosts=len(self._host_slots),
+            hit_rate=round((stats["memory_hits"] + stats["mongo_hits"]) / served, 4) if served else 0.0,
+        )
+        return stats
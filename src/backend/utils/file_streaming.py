@@ -0,0 +1,102 @@
+# file_streaming.py
+import os
+import logging
+import threading
+from datetime import timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Response, request
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.wsgi import wrap_file
+
+logger = logging.getLogger(__name__)
+
+# Bytes per read when streaming a file out (about one GridFS chunk).
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(256 * 1024)))
+# Stored files never change under the same id, so clients may reuse them for this long.
+FILE_CACHE_MAX_AGE = int(os.getenv("FILE_CACHE_MAX_AGE", "86400"))
+# Upstream (Blob / CDN) connections kept open per host by the proxy endpoints.
+PROXY_POOL_SIZE = int(os.getenv("PROXY_POOL_SIZE", "32"))
+PROXY_CONNECT_TIMEOUT = float(os.getenv("PROXY_CONNECT_TIMEOUT", "10"))
+PROXY_READ_TIMEOUT = float(os.getenv("PROXY_READ_TIMEOUT", "60"))
+
+# Headers that let the upstream answer seeks and revalidation itself.
+_FORWARDED_REQUEST_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+_PASSED_RESPONSE_HEADERS = ("Content-Type", "Content-Length", "Content-Range", "Accept-Ranges",
+                            "ETag", "Last-Modified", "Cache-Control")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_proxy_session() -> requests.Session:
+    """Process-wide session, so proxied requests reuse pooled keep-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=PROXY_POOL_SIZE, pool_maxsize=PROXY_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def gridfs_etag(grid_out) -> str:
+    """Content hash recorded at ingest when there is one, else id and length (GridFS files are immutable)."""
+    metadata = grid_out.metadata or {}
+    return metadata.get("sha256") or f"{grid_out._id}-{grid_out.length}"
+
+
+def send_gridfs_file(grid_out, mimetype: str = None, as_attachment: bool = True) -> Response:
+    """
+    Stream a GridFS file chunk by chunk with Range (206), If-None-Match /
+    If-Modified-Since (304) and ETag support. Seeking in a player fetches
+    only the requested bytes; nothing is read into memory up front.
+    """
+    mimetype = mimetype or getattr(grid_out, "content_type", None) or "application/octet-stream"
+    rv = Response(wrap_file(request.environ, grid_out, STREAM_CHUNK_BYTES), mimetype=mimetype,
+                  direct_passthrough=True)
+    rv.content_length = grid_out.length
+    rv.set_etag(gridfs_etag(grid_out))
+    if grid_out.upload_date:
+        rv.last_modified = grid_out.upload_date.replace(tzinfo=timezone.utc)
+    rv.cache_control.private = True
+    rv.cache_control.max_age = FILE_CACHE_MAX_AGE
+    if as_attachment:
+        rv.headers["Content-Disposition"] = f"attachment; filename={grid_out.filename}"
+    try:
+        return rv.make_conditional(request, accept_ranges=True, complete_length=grid_out.length)
+    except RequestedRangeNotSatisfiable as e:
+        rv.close()
+        return e.get_response()
+
+
+def proxy_stream(url: str, mimetype: str = None, default_mimetype: str = "application/octet-stream") -> Response:
+    """
+    Relay a remote file (e.g. a Blob URL) through a pooled connection without
+    buffering it. Range and validator headers are forwarded, so the upstream
+    answers 206/304 itself. Raises requests.HTTPError for upstream errors.
+    """
+    headers = {name: request.headers[name] for name in _FORWARDED_REQUEST_HEADERS if name in request.headers}
+    # Relay the stored bytes as-is so Content-Length stays valid.
+    headers["Accept-Encoding"] = "identity"
+    upstream = get_proxy_session().get(url, headers=headers, stream=True,
+                                       timeout=(PROXY_CONNECT_TIMEOUT, PROXY_READ_TIMEOUT))
+    if upstream.status_code >= 400 and upstream.status_code != 416:
+        upstream.close()
+        upstream.raise_for_status()
+
+    body = [] if upstream.status_code in (304, 416) else upstream.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+    rv = Response(body, status=upstream.status_code, direct_passthrough=True)
+    for name in _PASSED_RESPONSE_HEADERS:
+        if name in upstream.headers:
+            rv.headers[name] = upstream.headers[name]
+    if mimetype:
+        rv.headers["Content-Type"] = mimetype
+    elif "Content-Type" not in upstream.headers:
+        rv.headers["Content-Type"] = default_mimetype
+    rv.call_on_close(upstream.close)
+    return rv
@@ -0,0 +1,214 @@
+# model_registry.py
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Name -> transformers pipeline spec. Models are only downloaded/loaded on first use.
+MODEL_SPECS = {
+    "emotion": {
+        "task": "text-classification",
+        "model": "bhadresh-savani/distilbert-base-uncased-emotion",
+    },
+    "zero_shot": {
+        "task": "zero-shot-classification",
+        "model": "facebook/bart-large-mnli",
+    },
+}
+
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "")  # e.g. "emotion,zero_shot" or "all"
+MODEL_MAX_LOADED = int(os.getenv("MODEL_MAX_LOADED", "0"))  # 0 = no limit
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))  # 0 = no limit
+MODEL_IDLE_TTL_SECONDS = float(os.getenv("MODEL_IDLE_TTL_SECONDS", "0"))  # 0 = never unload idle
+
+
+def _estimate_pipeline_memory_mb(pipe) -> float:
+    """Approximate resident size of a pipeline from its model parameters and buffers."""
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0.0
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return total / (1024 * 1024)
+    except Exception as e:
+        logger.warning(f"Could not estimate model memory: {e}")
+        return 0.0
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of transformers pipelines.
+    - Loads each model lazily on first use (one copy shared by all threads).
+    - Evicts least recently used models when max_loaded or memory_budget_mb is exceeded.
+    - Unloads models that have been idle longer than idle_ttl seconds.
+    - Keeps load time / memory / usage metrics per model.
+    """
+
+    def __init__(self, specs: dict, max_loaded: int = 0, memory_budget_mb: float = 0, idle_ttl: float = 0):
+        self.specs = specs
+        self.max_loaded = max_loaded
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_ttl = idle_ttl
+        self._loaded = OrderedDict()  # name -> pipeline, ordered from least to most recently used
+        self._lock = threading.Lock()
+        self._model_locks = {name: threading.Lock() for name in specs}
+        self._stats = {
+            name: {
+                "loaded": False,
+                "loads": 0,
+                "unloads": 0,
+                "uses": 0,
+                "last_load_seconds": None,
+                "memory_mb": 0.0,
+                "last_used": None,
+            }
+            for name in specs
+        }
+
+    def get(self, name: str):
+        """Return the pipeline for `name`, loading it on first use."""
+        if name not in self.specs:
+            raise KeyError(f"Unknown model '{name}'. Registered models: {list(self.specs)}")
+
+        self.unload_idle()
+
+        with self._lock:
+            pipe = self._loaded.get(name)
+            if pipe is not None:
+                self._touch(name)
+                return pipe
+
+        # Per-model lock so two threads never load the same model twice,
+        # while loading one model does not block lookups of another.
+        with self._model_locks[name]:
+            with self._lock:
+                pipe = self._loaded.get(name)
+                if pipe is not None:
+                    self._touch(name)
+                    return pipe
+
+            pipe, seconds, memory_mb = self._load(name)
+
+            with self._lock:
+                self._loaded[name] = pipe
+                stats = self._stats[name]
+                stats.update({
+                    "loaded": True,
+                    "loads": stats["loads"] + 1,
+                    "last_load_seconds": round(seconds, 3),
+                    "memory_mb": round(memory_mb, 1),
+                })
+                self._touch(name)
+                self._enforce_limits(keep=name)
+            return pipe
+
+    def preload(self, names=None):
+        """Load the given models (default: all registered) up front."""
+        for name in names or list(self.specs):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Failed to preload model '{name}': {e}", exc_info=True)
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            return self._unload_locked(name)
+
+    def unload_idle(self, max_idle_seconds: float = None) -> list:
+        """Unload every model not used within max_idle_seconds (defaults to idle_ttl)."""
+        ttl = self.idle_ttl if max_idle_seconds is None else max_idle_seconds
+        if not ttl:
+            return []
+        now = time.time()
+        with self._lock:
+            idle = [
+                name for name in self._loaded
+                if now - (self._stats[name]["last_used"] or 0) > ttl
+            ]
+            for name in idle:
+                self._unload_locked(name)
+        return idle
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "loaded_models": list(self._loaded),
+                "total_memory_mb": round(self._total_memory_mb(), 1),
+                "max_loaded": self.max_loaded,
+                "memory_budget_mb": self.memory_budget_mb,
+                "models": {name: dict(stats, **self.specs[name]) for name, stats in self._stats.items()},
+            }
+
+    # --- internals ---
+
+    def _load(self, name: str):
+        from transformers import pipeline  # heavy import, deferred until a model is actually needed
+
+        spec = self.specs[name]
+        logger.info(f"Loading model '{name}' ({spec['model']})...")
+        started = time.perf_counter()
+        pipe = pipeline(spec["task"], model=spec["model"])
+        seconds = time.perf_counter() - started
+        memory_mb = _estimate_pipeline_memory_mb(pipe)
+        logger.info(f"Model '{name}' loaded in {seconds:.2f}s (~{memory_mb:.0f} MB)")
+        return pipe, seconds, memory_mb
+
+    def _touch(self, name: str):
+        self._loaded.move_to_end(name)
+        self._stats[name]["uses"] += 1
+        self._stats[name]["last_used"] = time.time()
+
+    def _total_memory_mb(self) -> float:
+        return sum(self._stats[name]["memory_mb"] for name in self._loaded)
+
+    def _enforce_limits(self, keep: str):
+        def over_limit():
+            if self.max_loaded and len(self._loaded) > self.max_loaded:
+                return True
+            return bool(self.memory_budget_mb) and self._total_memory_mb() > self.memory_budget_mb
+
+        for name in list(self._loaded):
+            if not over_limit():
+                break
+            if name != keep:
+                self._unload_locked(name)
+
+    def _unload_locked(self, name: str) -> bool:
+        # Callers still holding a reference keep working; the registry just drops its copy.
+        if self._loaded.pop(name, None) is None:
+            return False
+        stats = self._stats[name]
+        stats["loaded"] = False
+        stats["unloads"] += 1
+        logger.info(f"Unloaded model '{name}' (~{stats['memory_mb']:.0f} MB)")
+        return True
+
+
+registry = ModelRegistry(
+    MODEL_SPECS,
+    max_loaded=MODEL_MAX_LOADED,
+    memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+    idle_ttl=MODEL_IDLE_TTL_SECONDS,
+)
+
+
+def get_pipeline(name: str):
+    return registry.get(name)
+
+
+def preload_models(names: str = None):
+    """Preload models listed in MODEL_PRELOAD (comma separated, or 'all')."""
+    value = (MODEL_PRELOAD if names is None else names).strip()
+    if not value:
+        return
+    selected = None if value.lower() == "all" else [n.strip() for n in value.split(",") if n.strip()]
+    logger.info(f"Preloading models: {selected or 'all'}")
+    registry.preload(selected)
+
+
+def get_model_metrics() -> dict:
+    return registry.metrics()
@@ -474,7 +474,7 @@ def fetch_podcastindex_data(max_feeds=1000) -> List[Dict[str, Any]]:
                 )
                 rss_fetch_attempts += 1
                 # Use RSSService to fetch and parse the feed
-                feed_data, status_code = RSSService.fetch_rss_feed(rss_url)
+                feed_data, status_code = RSSService().fetch_rss_feed(rss_url, cache=False)
                 if status_code == 200 and feed_data.get("email"):
                     rss_email = feed_data.get("email")
                     # Validate the email found via RSS fetch
@@ -0,0 +1,38 @@
+# rate_limiter.py
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedRateLimiter:
+    """
+    Token bucket per key (e.g. per user): up to `burst` calls at once, refilled
+    at `rate_per_minute`. acquire() blocks until a token is free, so callers on a
+    thread pool are simply spread out instead of failing.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, key) -> float:
+        """Take a token for key and return how long the caller must wait before using it."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def acquire(self, key=None):
+        if self.rate <= 0:
+            return
+        wait = self._reserve(key)
+        if wait > 0:
+            logger.info(f"Rate limit for {key or 'anonymous'}: waiting {wait:.1f}s")
+            time.sleep(wait)
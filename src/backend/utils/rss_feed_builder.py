@@ -0,0 +1,199 @@
+# rss_feed_builder.py
+import io
+import os
+import re
+import hashlib
+import logging
+import datetime
+from email.utils import format_datetime
+from xml.sax.saxutils import XMLGenerator
+
+from backend.utils.batch_inference import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+# Rendered <item> fragments kept per episode; only episodes whose fields changed are re-rendered.
+RSS_ITEM_CACHE_SIZE = int(os.getenv("RSS_ITEM_CACHE_SIZE", "20000"))
+
+NAMESPACES = {
+    "xmlns:itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd",
+    "xmlns:content": "http://purl.org/rss/1.0/modules/content/",
+    "xmlns:atom": "http://www.w3.org/2005/Atom",
+}
+
+# Characters XML 1.0 does not allow at all, even escaped.
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_MIN_DATE = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+item_cache = BoundedCache(RSS_ITEM_CACHE_SIZE)
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    return _INVALID_XML_CHARS.sub("", str(value))
+
+
+def to_utc(value):
+    """publishDate as stored (datetime or ISO string) as an aware datetime, or None."""
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime.datetime):
+        return None
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+
+def episode_sort_key(ep):
+    """Newest first when used with reverse=True; undated episodes sort last."""
+    return to_utc(ep.get("publishDate")) or _MIN_DATE
+
+
+def format_duration(seconds) -> str:
+    if not seconds or not isinstance(seconds, (int, float)) or seconds < 0:
+        return "00:00:00"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02}:{(seconds % 3600) // 60:02}:{seconds % 60:02}"
+
+
+class _Writer:
+    """XMLGenerator with one-call elements; all text and attribute values are escaped."""
+
+    def __init__(self, out):
+        self.gen = XMLGenerator(out, "utf-8", short_empty_elements=True)
+
+    def element(self, name, text=None, attrs=None):
+        self.gen.startElement(name, {k: _clean(v) for k, v in (attrs or {}).items()})
+        if text not in (None, ""):
+            self.gen.characters(_clean(text))
+        self.gen.endElement(name)
+
+
+def _item_values(ep, podcast) -> tuple:
+    """Everything an <item> is rendered from, so the same values always give the same fragment."""
+    pub_date = to_utc(ep.get("publishDate"))
+    keywords = ep.get("keywords")
+    return (
+        ep.get("title", "No Title"),
+        ep.get("description", ""),
+        ep.get("summary", ep.get("description", "")),
+        ep.get("subtitle", ""),
+        ep.get("audioUrl", ""),
+        ep.get("fileSize", 0) or 0,
+        ep.get("fileType", "audio/mpeg"),
+        ep.get("_id", ""),
+        format_datetime(pub_date) if pub_date else "",
+        format_duration(ep.get("duration")),
+        "yes" if ep.get("explicit") else "no",
+        ep.get("episode", ""),
+        ep.get("season", ""),
+        ep.get("episodeType", "full"),
+        ep.get("imageUrl", podcast.get("logoUrl", "")),
+        ep.get("link"),
+        ", ".join(keywords) if isinstance(keywords, list) else "",
+        ep.get("author", podcast.get("author", podcast.get("ownerName", ""))),
+    )
+
+
+def render_item(values: tuple) -> bytes:
+    (title, description, summary, subtitle, audio_url, file_size, file_type, guid, pub_date, duration,
+     explicit, episode, season, episode_type, image, link, keywords, author) = values
+    out = io.BytesIO()
+    w = _Writer(out)
+    w.gen.startElement("item", {})
+    w.element("title", title)
+    w.element("description", description)
+    w.element("itunes:summary", summary)
+    w.element("itunes:subtitle", subtitle)
+    w.element("enclosure", attrs={"url": audio_url, "length": file_size, "type": file_type})
+    w.element("guid", guid, {"isPermaLink": "false"})
+    w.element("pubDate", pub_date)
+    w.element("itunes:duration", duration)
+    w.element("itunes:explicit", explicit)
+    w.element("itunes:episode", episode)
+    w.element("itunes:season", season)
+    w.element("itunes:episodeType", episode_type)
+    if image:
+        w.element("itunes:image", attrs={"href": image})
+    if link:
+        w.element("link", link)
+    if keywords:
+        w.element("itunes:keywords", keywords)
+    w.element("itunes:author", author)
+    w.gen.endElement("item")
+    return out.getvalue()
+
+
+def item_fragment(ep, podcast) -> bytes:
+    """The <item> for an episode, from the cache unless one of its rendered fields changed."""
+    values = _item_values(ep, podcast)
+    fingerprint = hashlib.sha1(repr(values).encode("utf-8")).digest()
+    key = str(ep.get("_id"))
+    cached = item_cache.get(key)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+    fragment = render_item(values)
+    item_cache.put(key, (fingerprint, fragment))
+    return fragment
+
+
+def _categories(w, category):
+    if isinstance(category, str) and category.strip():
+        w.element("itunes:category", attrs={"text": category.strip()})
+    elif isinstance(category, list):
+        for cat_obj in category:
+            if not (isinstance(cat_obj, dict) and cat_obj.get("text")):
+                continue
+            w.gen.startElement("itunes:category", {"text": _clean(cat_obj["text"].strip())})
+            sub = cat_obj.get("subcategory")
+            if isinstance(sub, dict) and sub.get("text"):
+                w.element("itunes:category", attrs={"text": sub["text"].strip()})
+            w.gen.endElement("itunes:category")
+
+
+def build_feed(podcast: dict, episodes: list, feed_url: str = None, out=None) -> bytes:
+    """
+    RSS 2.0 / iTunes feed for a podcast. Channel elements are written through
+    XMLGenerator; items come from item_fragment, so a publish re-renders only
+    new or edited episodes. `episodes` should already be filtered and sorted.
+    Writes to `out` when given, otherwise returns the document.
+    """
+    target = out or io.BytesIO()
+    w = _Writer(target)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    w.gen.startDocument()
+    w.gen.startElement("rss", {"version": "2.0", **NAMESPACES})
+    w.gen.startElement("channel", {})
+    w.element("title", podcast.get("podName", "No Podcast Title"))
+    w.element("link", podcast.get("podUrl", ""))
+    w.element("description", podcast.get("description", ""))
+    w.element("language", podcast.get("language", "en-us"))
+    w.element("copyright", podcast.get("copyright_info", f"© {now.year} {podcast.get('ownerName', '')}"))
+    w.element("lastBuildDate", format_datetime(now))
+    if feed_url:
+        w.element("atom:link", attrs={"href": feed_url, "rel": "self", "type": "application/rss+xml"})
+    w.element("itunes:author", podcast.get("author", podcast.get("ownerName", "")))
+    w.element("itunes:summary", podcast.get("description", ""))
+    w.element("itunes:type", podcast.get("itunes_type", "episodic"))
+    w.gen.startElement("itunes:owner", {})
+    w.element("itunes:name", podcast.get("ownerName", ""))
+    w.element("itunes:email", podcast.get("email", ""))
+    w.gen.endElement("itunes:owner")
+    if podcast.get("logoUrl"):
+        w.element("itunes:image", attrs={"href": podcast["logoUrl"]})
+    w.element("itunes:explicit", "yes" if podcast.get("explicit") else "no")
+    _categories(w, podcast.get("category"))
+
+    hits_before = item_cache.hits
+    for ep in episodes:
+        target.write(item_fragment(ep, podcast))
+    reused = item_cache.hits - hits_before
+
+    w.gen.endElement("channel")
+    w.gen.endElement("rss")
+    w.gen.endDocument()
+    logger.info(f"RSS: built feed with {len(episodes)} items ({reused} reused from cache)")
+    return None if out is not None else target.getvalue()
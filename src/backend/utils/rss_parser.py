@@ -0,0 +1,246 @@
+# rss_parser.py
+import io
+import re
+import html
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+ITUNES_NS = "{http://www.itunes.com/dtds/podcast-1.0.dtd}"
+MEDIA_NS = "{http://search.yahoo.com/mrss/}"
+PSC_NS = "{http://podlove.org/simple-chapters}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+_TAG_RE = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>|<[^>]*>", re.S | re.I)
+
+
+def strip_html(content: Optional[str]) -> Optional[str]:
+    """Text of an HTML fragment (tags dropped, entities decoded); plain text is returned untouched."""
+    if not content:
+        return None
+    if "<" in content:
+        content = _TAG_RE.sub("", content)
+    if "&" in content:
+        content = html.unescape(content)
+    return content
+
+
+def parse_duration(duration_str: Optional[str]) -> Optional[int]:
+    """'HH:MM:SS', 'MM:SS' or plain seconds as total seconds."""
+    if not duration_str:
+        return None
+    try:
+        parts = [int(float(p)) for p in duration_str.strip().split(":")]
+    except ValueError:
+        return None
+    if len(parts) > 3:
+        return None
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """RFC 822 (RSS) or ISO 8601 date as an aware UTC datetime."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _text(elem) -> Optional[str]:
+    text = elem.text
+    return text.strip() if text and text.strip() else None
+
+
+def _categories(elem) -> dict:
+    """An itunes:category with its nested subcategories."""
+    return {
+        "main": elem.get("text"),
+        "subcategories": [sub.get("text") for sub in elem if sub.tag == ITUNES_NS + "category" and sub.get("text")],
+    }
+
+
+def _parse_item(item, since: Optional[datetime]) -> Optional[dict]:
+    """One <item> subtree as an episode dict, or None if it is older than `since`."""
+    fields = {}
+    keywords = []
+    enclosures = []
+    media = []
+    chapters = []
+    for child in item:
+        tag = child.tag
+        if tag == "enclosure":
+            enclosures.append(child.attrib)
+        elif tag == MEDIA_NS + "content":
+            media.append(child.attrib)
+        elif tag == MEDIA_NS + "group":
+            media.extend(c.attrib for c in child if c.tag == MEDIA_NS + "content")
+        elif tag == "category":
+            if child.text and child.text.strip():
+                keywords.append(child.text.strip())
+        elif tag == ITUNES_NS + "keywords":
+            keywords.extend(k.strip() for k in (child.text or "").split(",") if k.strip())
+        elif tag == ITUNES_NS + "image":
+            fields.setdefault("image", child.get("href"))
+        elif tag == PSC_NS + "chapters":
+            chapters = [dict(c.attrib) for c in child if c.tag == PSC_NS + "chapter"]
+        elif tag not in fields:
+            fields[tag] = _text(child)
+
+    pub_date = parse_date(fields.get("pubDate") or fields.get(DC_NS + "date"))
+    if since and pub_date and pub_date <= since:
+        return None
+
+    # Sanitized once: description and summary carry the same text, as they did with feedparser
+    description = strip_html(fields.get("description") or fields.get(ITUNES_NS + "summary"))
+
+    audio = None
+    for enc in enclosures:
+        enc_type = enc.get("type", "")
+        if enc.get("url") and (not enc_type or enc_type.startswith("audio/")):
+            audio = {"url": enc["url"], "type": enc_type, "length": _int_or_none(enc.get("length"))}
+            if enc_type:
+                break
+    if audio is None:
+        for content in media:
+            media_type = content.get("type", "")
+            if not content.get("url"):
+                continue
+            if media_type.startswith("audio/"):
+                audio = {"url": content["url"], "type": media_type, "length": _int_or_none(content.get("fileSize"))}
+                break
+            if media_type.startswith("video/") and audio is None:
+                audio = {"url": content["url"], "type": media_type, "length": _int_or_none(content.get("fileSize")),
+                         "isVideo": True}
+
+    return {
+        "title": fields.get("title"),
+        "description": description,
+        "summary": description,
+        "subtitle": strip_html(fields.get(ITUNES_NS + "subtitle")),
+        "pubDate": pub_date.isoformat() if pub_date else None,
+        "link": fields.get("link"),
+        "guid": fields.get("guid") or fields.get("link"),
+        "author": fields.get(ITUNES_NS + "author") or fields.get("author") or fields.get(DC_NS + "creator"),
+        "duration": parse_duration(fields.get(ITUNES_NS + "duration")),
+        "explicit": fields.get(ITUNES_NS + "explicit"),
+        "season": fields.get(ITUNES_NS + "season"),
+        "episode": fields.get(ITUNES_NS + "episode"),
+        "episodeType": fields.get(ITUNES_NS + "episodeType"),
+        "image": fields.get("image"),
+        "audio": audio,
+        "chapters": chapters,
+        "keywords": keywords,
+    }
+
+
+def parse_feed(feed_content: Union[bytes, str], feed_url: str, limit: int = None,
+               since: Union[datetime, str, None] = None) -> dict:
+    """
+    Parse an RSS 2.0 podcast feed in a single iterparse pass. Channel fields,
+    iTunes tags and enclosures are read as each element closes, and every
+    <item> is converted and then dropped from the tree, so time is linear in
+    the feed and memory holds one item at a time.
+
+    limit stops after that many episodes (channel tags placed after the items
+    are then not seen); since skips episodes published at or before it, for
+    incremental imports. Raises ET.ParseError for malformed XML and
+    ValueError for documents that are not RSS.
+    """
+    if isinstance(feed_content, str):
+        feed_content = feed_content.encode("utf-8")
+    if isinstance(since, str):
+        since = parse_date(since)
+    elif since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    channel = {}
+    categories = []
+    owner = {}
+    episodes = []
+    depth = 0
+    channel_elem = None
+    for event, elem in ET.iterparse(io.BytesIO(feed_content), events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1 and elem.tag != "rss":
+                raise ValueError(f"Not an RSS document (root element {elem.tag})")
+            if depth == 2 and elem.tag == "channel":
+                channel_elem = elem
+            continue
+
+        depth -= 1
+        # Only direct children of <channel> (depth 2 after closing) are of interest here
+        if depth != 2 or channel_elem is None:
+            continue
+        tag = elem.tag
+        if tag == "item":
+            episode = _parse_item(elem, since)
+            channel_elem.remove(elem)
+            if episode is not None:
+                episodes.append(episode)
+                if limit and len(episodes) >= limit:
+                    break
+            continue
+        if tag == ITUNES_NS + "category":
+            categories.append(_categories(elem))
+        elif tag == "category":
+            if elem.text and elem.text.strip():
+                categories.append({"main": elem.text.strip(), "subcategories": []})
+        elif tag == ITUNES_NS + "owner":
+            for sub in elem:
+                if sub.tag in (ITUNES_NS + "name", ITUNES_NS + "email"):
+                    owner[sub.tag[len(ITUNES_NS):]] = _text(sub)
+        elif tag == ITUNES_NS + "image":
+            channel.setdefault("itunesImage", elem.get("href"))
+        elif tag == "image":
+            channel.setdefault("image", elem.findtext("url"))
+        elif tag not in channel:
+            channel[tag] = _text(elem)
+
+    last_build = parse_date(channel.get("lastBuildDate") or channel.get("pubDate"))
+    author = channel.get(ITUNES_NS + "author") or channel.get("managingEditor") or channel.get(DC_NS + "creator")
+    owner_name = owner.get("name") or channel.get(ITUNES_NS + "author")
+    owner_email = owner.get("email")
+
+    logger.info(f"Parsed {len(episodes)} episodes from feed: {feed_url}")
+    return {
+        "title": channel.get("title"),
+        "description": strip_html(channel.get("description") or channel.get(ITUNES_NS + "summary")
+                                  or channel.get(ITUNES_NS + "subtitle")),
+        "imageUrl": channel.get("itunesImage") or channel.get("image"),
+        "feedUrl": feed_url,
+        "link": channel.get("link"),
+        "language": channel.get("language"),
+        "copyright_info": channel.get("copyright"),
+        "lastBuildDate": last_build.isoformat() if last_build else None,
+        "generator": channel.get("generator"),
+        "author": author,
+        "itunesOwner": {"name": owner_name, "email": owner_email} if (owner_name or owner_email) else None,
+        "itunesType": channel.get(ITUNES_NS + "type"),
+        "categories": categories,
+        "socialMedia": [],
+        "episodes": episodes,
+    }
@@ -0,0 +1,142 @@
+# sfx_generation.py
+import os
+import zlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.utils.asset_store import AssetStore, asset_key
+from backend.utils.audio_io import PcmAudio
+from backend.utils.rate_limiter import KeyedRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# "elevenlabs" in production; "local" synthesises placeholder audio without network access (tests, dev).
+SFX_PROVIDER = os.getenv("SFX_PROVIDER", "elevenlabs")
+SFX_FETCH_WORKERS = int(os.getenv("SFX_FETCH_WORKERS", "4"))
+SFX_USER_RATE_PER_MINUTE = float(os.getenv("SFX_USER_RATE_PER_MINUTE", "30"))
+SFX_USER_BURST = int(os.getenv("SFX_USER_BURST", "4"))
+SFX_REQUEST_TIMEOUT = int(os.getenv("SFX_REQUEST_TIMEOUT", "120"))
+
+
+class SfxGenerationError(RuntimeError):
+    pass
+
+
+class ElevenLabsSfxProvider:
+    """ElevenLabs sound generation over one pooled keep-alive session."""
+
+    name = "elevenlabs"
+    content_type = "audio/mpeg"
+    url = "https://api.elevenlabs.io/v1/sound-generation"
+
+    def __init__(self, api_key: str = None, pool_size: int = SFX_FETCH_WORKERS):
+        self.api_key = api_key
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+
+    def generate(self, text: str, duration_seconds: float, prompt_influence: float = 1) -> bytes:
+        res = self.session.post(
+            self.url,
+            headers={"xi-api-key": self.api_key or os.getenv("ELEVENLABS_API_KEY"), "Content-Type": "application/json"},
+            json={"text": text, "duration_seconds": duration_seconds, "prompt_influence": prompt_influence},
+            timeout=SFX_REQUEST_TIMEOUT,
+        )
+        if "audio/mpeg" not in res.headers.get("Content-Type", ""):
+            raise SfxGenerationError(f"Sound generation failed ({res.status_code}): {res.text[:200]}")
+        return res.content
+
+
+class LocalSfxProvider:
+    """Deterministic stand-in: a soft tone whose pitch depends on the prompt. No network, no API key."""
+
+    name = "local"
+    content_type = "audio/wav"
+
+    def __init__(self, sample_rate: int = 44100):
+        self.sample_rate = sample_rate
+        self.calls = 0
+
+    def generate(self, text: str, duration_seconds: float, prompt_influence: float = 1) -> bytes:
+        self.calls += 1
+        frequency = 200 + zlib.crc32(text.encode("utf-8")) % 600
+        t = np.arange(int(self.sample_rate * duration_seconds), dtype=np.float32) / self.sample_rate
+        tone = (np.sin(2 * np.pi * frequency * t) * 0.2 * 32767).astype(np.int16)
+        return PcmAudio(tone, self.sample_rate).to_wav_bytes()
+
+
+_PROVIDERS = {"elevenlabs": ElevenLabsSfxProvider, "local": LocalSfxProvider}
+_provider = None
+
+sfx_store = AssetStore("sfx")
+user_rate_limiter = KeyedRateLimiter(SFX_USER_RATE_PER_MINUTE, SFX_USER_BURST)
+
+
+def get_sfx_provider():
+    global _provider
+    if _provider is None:
+        if SFX_PROVIDER not in _PROVIDERS:
+            raise ValueError(f"Unknown SFX_PROVIDER '{SFX_PROVIDER}'")
+        _provider = _PROVIDERS[SFX_PROVIDER]()
+    return _provider
+
+
+def set_sfx_provider(provider):
+    """Swap the provider (e.g. LocalSfxProvider() in tests); returns the previous one."""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
+
+
+def current_user_id() -> Optional[str]:
+    """g.user_id when called inside a request or job context, else None."""
+    try:
+        from flask import g
+        return getattr(g, "user_id", None)
+    except RuntimeError:
+        return None
+
+
+def generate_sfx(text: str, duration_seconds: float, user_id: str = None, cache_parts: tuple = None) -> bytes:
+    """
+    Audio for one prompt, reused from the asset store when the same effect was
+    made before. Only real generations count against the user's rate limit.
+    cache_parts overrides what the asset is keyed by (defaults to the prompt and duration).
+    """
+    provider = get_sfx_provider()
+    key = asset_key("sfx", provider.name, *(cache_parts or (text, duration_seconds)))
+
+    def create():
+        user_rate_limiter.acquire(user_id)
+        return provider.generate(text, duration_seconds)
+
+    return sfx_store.get_or_create(key, create, provider.content_type)
+
+
+def generate_sfx_many(prompts: List[Tuple[str, float]], user_id: str = None, max_workers: int = None) -> List[Optional[bytes]]:
+    """
+    generate_sfx for many (text, duration) prompts concurrently. Results keep
+    the input order; a prompt that fails yields None and is logged.
+    """
+    def fetch(prompt):
+        text, duration = prompt
+        try:
+            return generate_sfx(text, duration, user_id)
+        except Exception as e:
+            logger.error(f"SFX generation failed for '{text[:80]}': {e}")
+            return None
+
+    if len(prompts) <= 1:
+        return [fetch(p) for p in prompts]
+    workers = min(max_workers or SFX_FETCH_WORKERS, len(prompts))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fetch, prompts))
+
+
+def get_sfx_store_metrics() -> dict:
+    return sfx_store.metrics()
@@ -0,0 +1,324 @@
+# speech_to_text.py
+import os
+import re
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.audio_analysis import frame_levels_db
+from backend.utils.audio_io import PcmAudio, decode_audio, decode_audio_file
+from backend.utils.transcript_store import audio_fingerprint, sentence_spans, transcript_store
+
+logger = logging.getLogger(__name__)
+
+# "elevenlabs" (default), "whisper", or "local" (offline fake for tests/dev).
+STT_PROVIDER = os.getenv("STT_PROVIDER", "elevenlabs")
+STT_CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "300"))
+STT_CHUNK_OVERLAP_SECONDS = float(os.getenv("STT_CHUNK_OVERLAP_SECONDS", "2"))
+# How far around each nominal boundary to look for the quietest moment to split at.
+STT_SPLIT_SEARCH_SECONDS = float(os.getenv("STT_SPLIT_SEARCH_SECONDS", "30"))
+STT_MAX_WORKERS = int(os.getenv("STT_MAX_WORKERS", "4"))
+# Chunks are sent as 16 kHz mono WAV: what the models use internally, and a fraction of the upload.
+STT_SAMPLE_RATE = 16000
+
+_SPLIT_FRAME_MS = 50
+_WORD_NORMALIZE_RE = re.compile(r"[^\w']+")
+
+
+class TranscribedWord(NamedTuple):
+    text: str
+    start: float
+    end: float
+    speaker_id: Optional[str] = None
+
+
+class TranscriptResult:
+    """Provider-independent transcript with the same .text/.words shape as the ElevenLabs response."""
+
+    def __init__(self, text: str, words: List[TranscribedWord], sentences: List[Tuple[int, int]] = None):
+        self.text = text
+        self.words = words
+        self._sentences = sentences
+
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """(first_word, last_word) index pairs per sentence; read from the transcript store or computed once."""
+        if self._sentences is None:
+            self._sentences = sentence_spans(self.words)
+        return self._sentences
+
+
+class ElevenLabsSttProvider:
+    name = "elevenlabs"
+
+    def __init__(self, model_id: str = "scribe_v1"):
+        from elevenlabs.client import ElevenLabs
+        self.client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        self.model_id = model_id
+
+    def transcribe(self, audio: bytes, diarize: bool = False, num_speakers: int = None) -> TranscriptResult:
+        kwargs = {"num_speakers": num_speakers, "diarize": True} if diarize else {}
+        result = self.client.speech_to_text.convert(
+            file=audio, model_id=self.model_id, timestamps_granularity="word", **kwargs
+        )
+        words = [
+            TranscribedWord(w.text, w.start, w.end, getattr(w, "speaker_id", None))
+            for w in result.words
+            if getattr(w, "start", None) is not None and getattr(w, "end", None) is not None
+        ]
+        return TranscriptResult(result.text or "", words)
+
+
+class WhisperSttProvider:
+    name = "whisper"
+
+    def __init__(self, model_id: str = "whisper-1"):
+        from openai import OpenAI
+        self.client = OpenAI()
+        self.model_id = model_id
+
+    def transcribe(self, audio: bytes, diarize: bool = False, num_speakers: int = None) -> TranscriptResult:
+        response = self.client.audio.transcriptions.create(
+            model=self.model_id,
+            file=("audio.wav", audio),
+            response_format="verbose_json",
+            timestamp_granularities=["word"],
+        )
+        words = [TranscribedWord(w.word, w.start, w.end) for w in (getattr(response, "words", None) or [])]
+        return TranscriptResult(response.text or "", words)
+
+
+class LocalSttProvider:
+    """
+    Offline stand-in: every voiced stretch of audio becomes one word, named by
+    its order and length, with a sentence break every eight words. Deterministic
+    for a given signal, so chunked and whole-file results can be compared.
+    """
+
+    name = "local"
+    model_id = "local"
+
+    def __init__(self, silence_db: float = -40.0):
+        self.silence_db = silence_db
+        self.calls = 0
+
+    def transcribe(self, audio: bytes, diarize: bool = False, num_speakers: int = None) -> TranscriptResult:
+        self.calls += 1
+        pcm = decode_audio(audio)
+        levels = frame_levels_db(pcm, _SPLIT_FRAME_MS)
+        voiced = np.concatenate(([False], levels >= self.silence_db, [False]))
+        edges = np.flatnonzero(np.diff(voiced.astype(np.int8)))
+        frame_seconds = _SPLIT_FRAME_MS / 1000
+        words = []
+        for index, (first, last) in enumerate(zip(edges[0::2], edges[1::2])):
+            text = f"w{last - first}" + ("." if index % 8 == 7 else "")
+            words.append(TranscribedWord(text, round(first * frame_seconds, 3), round(last * frame_seconds, 3),
+                                         "speaker_0" if diarize else None))
+        return TranscriptResult(" ".join(w.text for w in words), words)
+
+
+_PROVIDERS = {"elevenlabs": ElevenLabsSttProvider, "whisper": WhisperSttProvider, "local": LocalSttProvider}
+_providers = {}
+
+
+def get_stt_provider(name: str = None):
+    name = name or STT_PROVIDER
+    if name not in _providers:
+        if name not in _PROVIDERS:
+            raise ValueError(f"Unknown speech-to-text provider '{name}'")
+        _providers[name] = _PROVIDERS[name]()
+    return _providers[name]
+
+
+def set_stt_provider(name: str, provider):
+    """Replace a provider (e.g. set_stt_provider("elevenlabs", LocalSttProvider()) in tests)."""
+    _providers[name] = provider
+
+
+class _Chunk(NamedTuple):
+    start: float
+    end: float
+    # The part of the timeline this chunk is authoritative for; the rest is overlap.
+    own_start: float
+    own_end: float
+
+
+def _needs_chunking(duration: float, chunk_seconds: float = None) -> bool:
+    # A little slack so an episode just over one chunk isn't split into a long and a tiny piece.
+    return duration > (chunk_seconds or STT_CHUNK_SECONDS) * 1.25
+
+
+def plan_chunks(pcm: PcmAudio, chunk_seconds: float = None, overlap_seconds: float = None,
+                search_seconds: float = None) -> List[_Chunk]:
+    """
+    Split points at the quietest frame within search_seconds of every
+    chunk_seconds boundary, so cuts land in pauses rather than mid-word;
+    among equally quiet frames the one nearest the boundary wins. Each chunk is padded by overlap_seconds on both sides.
+    """
+    chunk_seconds = chunk_seconds or STT_CHUNK_SECONDS
+    overlap = STT_CHUNK_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+    search = STT_SPLIT_SEARCH_SECONDS if search_seconds is None else search_seconds
+    duration = pcm.duration
+    if not _needs_chunking(duration, chunk_seconds):
+        return [_Chunk(0.0, duration, 0.0, duration)]
+
+    levels = frame_levels_db(pcm, _SPLIT_FRAME_MS)
+    frame_seconds = _SPLIT_FRAME_MS / 1000
+    cuts = [0.0]
+    while _needs_chunking(duration - cuts[-1], chunk_seconds):
+        target = cuts[-1] + chunk_seconds
+        lo = int(max(cuts[-1] + chunk_seconds / 2, target - search) / frame_seconds)
+        hi = int(min(duration, target + search) / frame_seconds)
+        window = levels[lo:hi]
+        if not window.size:
+            cuts.append(target)
+            continue
+        # Of equally quiet frames (digital silence, a flat noise floor) take the one nearest the
+        # target, not the first: that would cut every chunk short by up to search_seconds
+        quietest = np.flatnonzero(window == window.min()) + lo
+        best = quietest[np.argmin(np.abs(quietest - target / frame_seconds))]
+        cuts.append((int(best) + 0.5) * frame_seconds)
+    cuts.append(duration)
+
+    return [
+        _Chunk(max(0.0, a - overlap), min(duration, b + overlap), a, b)
+        for a, b in zip(cuts, cuts[1:])
+    ]
+
+
+def _normalize(text: str) -> str:
+    return _WORD_NORMALIZE_RE.sub("", text.lower())
+
+
+def _speaker_mapping(previous: List[TranscribedWord], current: List[TranscribedWord], window: tuple,
+                     known: List[str]) -> dict:
+    """
+    Diarization labels restart in every chunk. Words heard in both chunks'
+    overlap vote on which earlier speaker each new label corresponds to;
+    labels without votes take the remaining known speakers in order of
+    appearance, and only get a new name when there are none left.
+    """
+    lo, hi = window
+    earlier = defaultdict(list)
+    for w in previous:
+        if lo <= w.start <= hi and w.speaker_id is not None:
+            earlier[_normalize(w.text)].append(w)
+
+    votes = defaultdict(Counter)
+    for w in current:
+        if not (lo <= w.start <= hi) or w.speaker_id is None:
+            continue
+        for match in earlier.get(_normalize(w.text), ()):
+            if abs(match.start - w.start) < 0.5:
+                votes[w.speaker_id][match.speaker_id] += 1
+                break
+    mapping = {label: counts.most_common(1)[0][0] for label, counts in votes.items()}
+
+    remaining = [label for label in known if label not in mapping.values()]
+    for label in dict.fromkeys(w.speaker_id for w in current if w.speaker_id is not None):
+        if label not in mapping:
+            mapping[label] = remaining.pop(0) if remaining else f"{label}_{len(known)}"
+            if mapping[label] not in known:
+                known.append(mapping[label])
+    return mapping
+
+
+def _stitch(chunks: List[_Chunk], results: List[TranscriptResult]) -> TranscriptResult:
+    """Shift chunk timestamps onto the episode timeline and keep each word only from the chunk that owns it."""
+    words, previous, known = [], [], []
+    for index, (chunk, result) in enumerate(zip(chunks, results)):
+        shifted = [
+            TranscribedWord(w.text, round(w.start + chunk.start, 3), round(w.end + chunk.start, 3), w.speaker_id)
+            for w in result.words
+        ]
+
+        if index == 0:
+            known.extend(dict.fromkeys(w.speaker_id for w in shifted if w.speaker_id is not None))
+        else:
+            mapping = _speaker_mapping(previous, shifted, (chunk.start, chunks[index - 1].end), known)
+            shifted = [w._replace(speaker_id=mapping.get(w.speaker_id, w.speaker_id)) for w in shifted]
+
+        last = index == len(chunks) - 1
+        for w in shifted:
+            middle = (w.start + w.end) / 2
+            if chunk.own_start <= middle and (middle < chunk.own_end or last) and w.text.strip():
+                words.append(w)
+        previous = shifted
+
+    words.sort(key=lambda w: w.start)
+    return TranscriptResult(" ".join(w.text.strip() for w in words), words)
+
+
+def _transcribe_chunked(stt, pcm: PcmAudio, diarize: bool, num_speakers: int, max_workers: int = None,
+                        chunk_seconds: float = None) -> TranscriptResult:
+    chunks = plan_chunks(pcm, chunk_seconds)
+    if len(chunks) == 1:
+        return stt.transcribe(pcm.to_wav_bytes(), diarize, num_speakers)
+
+    logger.info(f"Transcribing {pcm.duration:.0f}s of audio in {len(chunks)} chunks with {stt.name}")
+
+    def transcribe_chunk(chunk: _Chunk) -> TranscriptResult:
+        return stt.transcribe(pcm.slice(chunk.start, chunk.end).to_wav_bytes(), diarize, num_speakers)
+
+    workers = min(max_workers or STT_MAX_WORKERS, len(chunks))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(transcribe_chunk, chunks))
+    return _stitch(chunks, results)
+
+
+def _stored_or_transcribe(stt, pcm: PcmAudio, transcribe, diarize: bool, num_speakers: int,
+                          any_provider: bool) -> TranscriptResult:
+    """Look the audio up in the transcript store first; only a miss reaches the provider."""
+    fingerprint = audio_fingerprint(pcm.samples, pcm.sample_rate)
+    stored = transcript_store.get(fingerprint, stt.name, stt.model_id, diarize, num_speakers, any_provider)
+    if stored is not None:
+        logger.info(f"Reusing stored transcript for {pcm.duration:.0f}s of audio")
+        return stored
+
+    result = transcribe()
+    if result.text:
+        transcript_store.put(fingerprint, stt.name, stt.model_id, result, diarize, num_speakers, round(pcm.duration, 3))
+    return result
+
+
+def transcribe_pcm(pcm: PcmAudio, diarize: bool = False, num_speakers: int = None, provider: str = None,
+                   max_workers: int = None, chunk_seconds: float = None, any_provider: bool = False) -> TranscriptResult:
+    """
+    Transcribe decoded audio. Anything longer than one chunk is split on
+    silences into overlapping chunks that are transcribed concurrently and
+    stitched back with episode-relative word timestamps.
+    """
+    stt = get_stt_provider(provider)
+    return _stored_or_transcribe(
+        stt, pcm, lambda: _transcribe_chunked(stt, pcm, diarize, num_speakers, max_workers, chunk_seconds),
+        diarize, num_speakers, any_provider
+    )
+
+
+def transcribe_audio_bytes(data: bytes, diarize: bool = False, num_speakers: int = None, provider: str = None,
+                           suffix: str = ".bin", any_provider: bool = False) -> TranscriptResult:
+    """
+    transcribe_pcm for encoded audio/video bytes. The audio is decoded once
+    to 16 kHz mono, which is also what the transcript store fingerprints, so
+    the same recording is recognised whichever route or container it came
+    through. Short files are sent unchanged in one request; long ones are chunked.
+    any_provider accepts a stored transcript from another provider (for callers that only need text).
+    """
+    stt = get_stt_provider(provider)
+    pcm = decode_audio(data, sample_rate=STT_SAMPLE_RATE, channels=1, suffix=suffix)
+
+    def transcribe():
+        if not _needs_chunking(pcm.duration):
+            return stt.transcribe(data, diarize, num_speakers)
+        return _transcribe_chunked(stt, pcm, diarize, num_speakers)
+
+    return _stored_or_transcribe(stt, pcm, transcribe, diarize, num_speakers, any_provider)
+
+
+def transcribe_audio_file(path: str, diarize: bool = False, num_speakers: int = None, provider: str = None,
+                          any_provider: bool = False) -> TranscriptResult:
+    """transcribe_audio_bytes for a file on disk (e.g. an ingested upload); only the 16 kHz PCM is held in memory."""
+    pcm = decode_audio_file(path, sample_rate=STT_SAMPLE_RATE, channels=1)
+    return transcribe_pcm(pcm, diarize, num_speakers, provider, any_provider=any_provider)
@@ -0,0 +1,146 @@
+# transcript_chunking.py
+import os
+import re
+import logging
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Transcript tokens per request; leaves room for the instructions and the answer in an 8k context.
+TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "3000"))
+TRANSCRIPT_CHUNK_WORKERS = int(os.getenv("TRANSCRIPT_CHUNK_WORKERS", "4"))
+
+_LINE_RE = re.compile(r"[^\n]*\n+|[^\n]+$")
+_SENTENCE_RE = re.compile(r".+?(?:[.!?]+[\"')\]]*(?:\s+|$)|$)", re.S)
+
+
+class Chunk(NamedTuple):
+    text: str
+    # Whitespace that followed the chunk in the original transcript, used to reassemble output.
+    separator: str
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    return len(_encoding(model).encode(text))
+
+
+def _split_long_unit(unit: str, max_tokens: int, model: str) -> List[str]:
+    """Break a speaker turn into sentences, and a runaway sentence into token windows."""
+    pieces = []
+    for sentence in (m.group(0) for m in _SENTENCE_RE.finditer(unit) if m.group(0)):
+        if count_tokens(sentence, model) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        enc = _encoding(model)
+        tokens = enc.encode(sentence)
+        pieces.extend(enc.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens))
+    return pieces
+
+
+def split_transcript(text: str, max_tokens: int = None, model: str = "gpt-4") -> List[Chunk]:
+    """
+    Split a transcript into chunks of at most max_tokens tokens.
+    Chunks break between lines (speaker turns) where possible, then between
+    sentences; nothing is dropped, so joining the chunks gives back the text.
+    """
+    max_tokens = max_tokens or TRANSCRIPT_CHUNK_TOKENS
+    if not text:
+        return []
+    if count_tokens(text, model) <= max_tokens:
+        return [Chunk(text, "")]
+
+    units = []
+    for line in (m.group(0) for m in _LINE_RE.finditer(text)):
+        if count_tokens(line, model) <= max_tokens:
+            units.append(line)
+        else:
+            units.extend(_split_long_unit(line, max_tokens, model))
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = count_tokens(unit, model)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("".join(current))
+
+    result = []
+    for chunk in chunks:
+        body = chunk.rstrip()
+        result.append(Chunk(body, chunk[len(body):] or " "))
+    return result
+
+
+def reassemble(chunks: List[Chunk], outputs: List[str]) -> str:
+    """Join per-chunk outputs in order, keeping the original line/sentence breaks between chunks."""
+    parts = []
+    for chunk, output in zip(chunks, outputs):
+        parts.append((output or "").strip())
+        parts.append(chunk.separator)
+    return "".join(parts).strip()
+
+
+def map_chunks(texts: List[str], fn: Callable[[str], str], max_workers: int = None) -> List[str]:
+    """Apply fn to every text on a bounded thread pool; results come back in input order."""
+    if len(texts) <= 1:
+        return [fn(t) for t in texts]
+    workers = min(max_workers or TRANSCRIPT_CHUNK_WORKERS, len(texts))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, texts))
+
+
+def _reduce(parts: List[str], reduce_fn: Callable[[List[str]], str], max_tokens: int, model: str, max_workers: int) -> str:
+    """Combine partial results, first in groups that fit max_tokens when they are too long for one request."""
+    while len(parts) > 1 and count_tokens("\n\n".join(parts), model) > max_tokens:
+        groups, current, current_tokens = [], [], 0
+        for part in parts:
+            part_tokens = count_tokens(part, model)
+            if current and current_tokens + part_tokens > max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+        groups.append(current)
+        if len(groups) == len(parts):
+            break  # every part is already at the limit; the final reduce gets truncated downstream
+        parts = map_chunks(groups, reduce_fn, max_workers)
+    return reduce_fn(parts)
+
+
+def map_reduce(text: str, map_fn: Callable[[str], str], reduce_fn: Optional[Callable[[List[str]], str]] = None,
+               single_fn: Optional[Callable[[str], str]] = None, max_tokens: int = None,
+               max_workers: int = None, model: str = "gpt-4") -> str:
+    """
+    Run map_fn over transcript chunks concurrently.
+    - Without reduce_fn the outputs are stitched back together in order
+      (filler removal, translation).
+    - With reduce_fn the partial outputs are combined into one answer
+      (show notes, quotes, summaries).
+    Transcripts that fit in one chunk are sent as-is to single_fn (or map_fn),
+    so short episodes make exactly the request they always did.
+    """
+    max_tokens = max_tokens or TRANSCRIPT_CHUNK_TOKENS
+    chunks = split_transcript(text, max_tokens, model)
+    if len(chunks) <= 1:
+        return (single_fn or map_fn)(text)
+
+    logger.info(f"Processing transcript in {len(chunks)} chunks of <= {max_tokens} tokens")
+    outputs = map_chunks([c.text for c in chunks], map_fn, max_workers)
+    if reduce_fn is None:
+        return reassemble(chunks, outputs)
+    return _reduce([o.strip() for o in outputs if o and o.strip()], reduce_fn, max_tokens, model, max_workers)
@@ -0,0 +1,252 @@
+# transcript_store.py
+import os
+import re
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy as np
+from bson.binary import Binary
+
+from backend.utils.batch_inference import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_STORE_ENABLED = os.getenv("TRANSCRIPT_STORE_ENABLED", "true").lower() in ("true", "1", "yes")
+TRANSCRIPT_STORE_MEMORY_SIZE = int(os.getenv("TRANSCRIPT_STORE_MEMORY_SIZE", "64"))
+TRANSCRIPT_STORE_TTL_DAYS = int(os.getenv("TRANSCRIPT_STORE_TTL_DAYS", "180"))
+TRANSCRIPT_STORE_COLLECTION = os.getenv("TRANSCRIPT_STORE_COLLECTION", "Transcripts")
+
+# Word texts are packed into one string; this separator never occurs in transcripts.
+_WORD_SEPARATOR = "\x1f"
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+
+def audio_fingerprint(samples: np.ndarray, sample_rate: int) -> str:
+    """Content hash of decoded PCM, so the same recording matches whatever container it arrived in."""
+    digest = hashlib.sha256()
+    digest.update(f"{sample_rate}:{samples.shape[1] if samples.ndim > 1 else 1}:".encode())
+    digest.update(np.ascontiguousarray(samples).data)
+    return digest.hexdigest()
+
+
+def sentence_spans(words) -> List[Tuple[int, int]]:
+    """(first_word, last_word) index pairs, breaking after words that end a sentence."""
+    spans, first = [], 0
+    for index, word in enumerate(words):
+        if _SENTENCE_END_RE.search(word.text.strip()):
+            spans.append((first, index))
+            first = index + 1
+    if first < len(words):
+        spans.append((first, len(words) - 1))
+    return spans
+
+
+def _pack(values, dtype) -> Binary:
+    return Binary(np.asarray(values, dtype=dtype).tobytes())
+
+
+def _unpack(data, dtype) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=dtype)
+
+
+def encode_transcript(result) -> dict:
+    """
+    Columnar form of a TranscriptResult: word texts in one string, start/end
+    as int32 milliseconds, speakers as indexes into a label list, sentences as
+    word-index pairs. An hour of speech is a few hundred KB.
+    """
+    words = result.words
+    speakers = list(dict.fromkeys(w.speaker_id for w in words if w.speaker_id is not None))
+    speaker_index = {label: i for i, label in enumerate(speakers)}
+    spans = result.sentence_spans()
+    return {
+        "text": result.text,
+        "wordCount": len(words),
+        "words": _WORD_SEPARATOR.join(w.text for w in words),
+        "startMs": _pack([round(w.start * 1000) for w in words], "<i4"),
+        "endMs": _pack([round(w.end * 1000) for w in words], "<i4"),
+        "speakers": speakers,
+        "speakerIndex": _pack([speaker_index.get(w.speaker_id, -1) for w in words], "<i2"),
+        "sentenceStart": _pack([a for a, _ in spans], "<i4"),
+        "sentenceEnd": _pack([b for _, b in spans], "<i4"),
+    }
+
+
+def decode_transcript(doc: dict):
+    """TranscriptResult from encode_transcript's form, sentence spans included (see sentence_spans())."""
+    from backend.utils.speech_to_text import TranscribedWord, TranscriptResult
+
+    count = doc["wordCount"]
+    texts = doc["words"].split(_WORD_SEPARATOR) if count else []
+    starts = _unpack(doc["startMs"], "<i4") / 1000.0
+    ends = _unpack(doc["endMs"], "<i4") / 1000.0
+    speakers = doc.get("speakers") or []
+    speaker_index = _unpack(doc["speakerIndex"], "<i2")
+    words = [
+        TranscribedWord(texts[i], float(starts[i]), float(ends[i]),
+                        speakers[speaker_index[i]] if speaker_index[i] >= 0 else None)
+        for i in range(count)
+    ]
+    sentences = None
+    if doc.get("sentenceStart") is not None:
+        sentences = list(zip(_unpack(doc["sentenceStart"], "<i4").tolist(), _unpack(doc["sentenceEnd"], "<i4").tolist()))
+    return TranscriptResult(doc["text"], words, sentences)
+
+
+class TranscriptStore:
+    """
+    Transcripts by audio fingerprint and provider/model, in MongoDB with a small
+    in-process LRU in front. A diarized transcript also answers requests that
+    don't need speakers; callers that only need text can accept any provider.
+    """
+
+    def __init__(self, memory_size: int = TRANSCRIPT_STORE_MEMORY_SIZE, ttl_days: int = TRANSCRIPT_STORE_TTL_DAYS,
+                 enabled: bool = TRANSCRIPT_STORE_ENABLED):
+        self.memory = BoundedCache(memory_size)
+        # fingerprint -> {doc_id: (provider, model, diarized, num_speakers)} of the transcripts in memory,
+        # so memory lookups find the same candidates as the MongoDB query (any provider, diarized for plain)
+        self._variants = BoundedCache(memory_size)
+        self.ttl_days = ttl_days
+        self.enabled = enabled
+        self._collection = None
+        self._collection_failed = False
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _mongo(self):
+        if self._collection is not None or self._collection_failed:
+            return self._collection
+        with self._lock:
+            if self._collection is None and not self._collection_failed:
+                try:
+                    from backend.database.mongo_connection import get_db
+                    collection = get_db()[TRANSCRIPT_STORE_COLLECTION]
+                    collection.create_index([("fingerprint", 1), ("provider", 1), ("diarized", -1)])
+                    collection.create_index("expiresAt", expireAfterSeconds=0)
+                    self._collection = collection
+                except Exception as e:
+                    logger.warning(f"Transcript store: MongoDB tier disabled ({e})")
+                    self._collection_failed = True
+        return self._collection
+
+    @staticmethod
+    def _doc_id(fingerprint: str, provider: str, model: str, diarize: bool, num_speakers) -> str:
+        return f"{fingerprint}:{provider}:{model}:{'d' + str(num_speakers or '') if diarize else 'plain'}"
+
+    @staticmethod
+    def _rank(provider: str, requested_provider: str, diarized: bool) -> tuple:
+        # Prefer the requested provider, then diarized transcripts (they carry more information)
+        return provider != requested_provider, not diarized
+
+    def _remember(self, fingerprint: str, doc_id: str, variant: tuple, result):
+        self.memory.put(doc_id, result)
+        with self._lock:
+            variants = dict(self._variants.get(fingerprint) or {})
+            variants[doc_id] = variant
+            self._variants.put(fingerprint, variants)
+
+    def _from_memory(self, fingerprint: str, provider: str, model: str, diarize: bool, num_speakers,
+                     any_provider: bool):
+        variants = self._variants.get(fingerprint) or {}
+        candidates = [
+            (doc_id, v) for doc_id, v in variants.items()
+            if (any_provider or (v[0], v[1]) == (provider, model)) and (not diarize or (v[2] and v[3] == num_speakers))
+        ]
+        candidates.sort(key=lambda c: self._rank(c[1][0], provider, c[1][2]))
+        for doc_id, _ in candidates:
+            result = self.memory.get(doc_id)
+            if result is not None:
+                return result
+        return None
+
+    def get(self, fingerprint: str, provider: str, model: str, diarize: bool = False,
+            num_speakers: int = None, any_provider: bool = False):
+        if not self.enabled:
+            return None
+
+        result = self._from_memory(fingerprint, provider, model, diarize, num_speakers, any_provider)
+        if result is not None:
+            self._count("memory_hits")
+            return result
+
+        collection = self._mongo()
+        if collection is not None:
+            query = {"fingerprint": fingerprint, "expiresAt": {"$gt": datetime.utcnow()}}
+            if not any_provider:
+                query.update(provider=provider, model=model)
+            if diarize:
+                query.update(diarized=True, numSpeakers=num_speakers)
+            try:
+                docs = list(collection.find(query).sort("diarized", -1).limit(5))
+                docs.sort(key=lambda d: self._rank(d.get("provider"), provider, d.get("diarized")))
+                if docs:
+                    doc = docs[0]
+                    result = decode_transcript(doc)
+                    self._remember(fingerprint, doc["_id"], (doc.get("provider"), doc.get("model"),
+                                                             bool(doc.get("diarized")), doc.get("numSpeakers")), result)
+                    self._count("mongo_hits")
+                    return result
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"Transcript store read failed: {e}")
+
+        self._count("misses")
+        return None
+
+    def put(self, fingerprint: str, provider: str, model: str, result, diarize: bool = False,
+            num_speakers: int = None, duration: float = None):
+        if not self.enabled:
+            return
+        doc_id = self._doc_id(fingerprint, provider, model, diarize, num_speakers)
+        self._remember(fingerprint, doc_id, (provider, model, bool(diarize), num_speakers if diarize else None), result)
+        self._count("stores")
+
+        collection = self._mongo()
+        if collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            collection.replace_one(
+                {"_id": doc_id},
+                {
+                    "fingerprint": fingerprint,
+                    "provider": provider,
+                    "model": model,
+                    "diarized": bool(diarize),
+                    "numSpeakers": num_speakers if diarize else None,
+                    "duration": duration,
+                    "createdAt": now,
+                    "expiresAt": now + timedelta(days=self.ttl_days),
+                    **encode_transcript(result),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Transcript store write failed: {e}")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["mongo_hits"] + stats["misses"]
+        stats.update(
+            enabled=self.enabled,
+            memory_entries=len(self.memory),
+            mongo_tier=self._collection is not None,
+            hit_rate=round((stats["memory_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else 0.0,
+        )
+        return stats
+
+
+transcript_store = TranscriptStore()
+
+
+def get_transcript_store_metrics() -> dict:
+    return transcript_store.metrics()
@@ -0,0 +1,89 @@
+# tts_synthesis.py
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+
+from backend.utils.asset_store import AssetStore, asset_key
+from backend.utils.audio_io import PcmAudio, decode_audio
+
+logger = logging.getLogger(__name__)
+
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "6"))
+# Output rate of the dubbed track (matches the mp3_44100_128 TTS format).
+TTS_SAMPLE_RATE = 44100
+# Overlap-add window used when speech has to be compressed into its slot.
+STRETCH_WINDOW_MS = 40
+
+tts_store = AssetStore("tts")
+
+
+def time_stretch(samples: np.ndarray, target_frames: int, sample_rate: int = TTS_SAMPLE_RATE) -> np.ndarray:
+    """
+    Fit mono float32 speech into target_frames without changing its pitch.
+    Windowed frames are read at a hop scaled by the speed factor and
+    overlap-added at half-window spacing; all frames are gathered and summed
+    as whole arrays, so the cost is one vectorized pass over the clip.
+    """
+    if target_frames <= 0:
+        return np.zeros(0, dtype=np.float32)
+    if samples.shape[0] <= target_frames:
+        out = np.zeros(target_frames, dtype=np.float32)
+        out[:samples.shape[0]] = samples
+        return out
+
+    window_len = max(2, int(sample_rate * STRETCH_WINDOW_MS / 1000) // 2 * 2)
+    hop = window_len // 2
+    if samples.shape[0] < window_len or target_frames < window_len:
+        # Too short to window; plain linear resampling is inaudible at this length.
+        positions = np.linspace(0, samples.shape[0] - 1, target_frames, dtype=np.float32)
+        return np.interp(positions, np.arange(samples.shape[0], dtype=np.float32), samples).astype(np.float32)
+
+    n_frames = int(np.ceil(target_frames / hop))
+    speed = (samples.shape[0] - window_len) / max(1, (n_frames - 1) * hop)
+    starts = np.minimum((np.arange(n_frames) * hop * speed).astype(np.int64), samples.shape[0] - window_len)
+    frames = samples[starts[:, None] + np.arange(window_len)] * np.hanning(window_len + 1)[:-1].astype(np.float32)
+
+    # With 50% overlap each output block is the second half of one frame plus the first half of the next.
+    blocks = np.zeros((n_frames + 1, hop), dtype=np.float32)
+    blocks[:n_frames] += frames[:, :hop]
+    blocks[1:] += frames[:, hop:]
+    return blocks.ravel()[:target_frames].copy()
+
+
+def synthesize_cached(synthesize: Callable[[str, str], bytes], text: str, voice_id: str, model_id: str, output_format: str) -> bytes:
+    """TTS audio for (voice, text), reused when the same line was voiced before with the same settings."""
+    key = asset_key("tts", voice_id, model_id, output_format, text)
+    return tts_store.get_or_create(key, lambda: synthesize(text, voice_id), "audio/mpeg")
+
+
+def render_dub(segments: List[dict], synthesize: Callable[[str, str], bytes], model_id: str, output_format: str,
+               max_workers: int = None) -> PcmAudio:
+    """
+    Voice every {"start", "end", "text", "voice_id"} segment and place it at its
+    start time in one preallocated track. Segments are synthesized
+    concurrently (bounded by TTS_MAX_WORKERS), so wall-clock time approaches the
+    slowest call rather than the sum. Speech longer than its slot is
+    time-compressed to fit; shorter speech is left followed by silence.
+    """
+    total_frames = int(round(max(s["end"] for s in segments) * TTS_SAMPLE_RATE))
+    track = np.zeros(total_frames, dtype=np.float32)
+
+    def voice(segment):
+        data = synthesize_cached(synthesize, segment["text"], segment["voice_id"], model_id, output_format)
+        return decode_audio(data, sample_rate=TTS_SAMPLE_RATE, channels=1).samples[:, 0].astype(np.float32)
+
+    workers = max(1, min(max_workers or TTS_MAX_WORKERS, len(segments)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for segment, speech in zip(segments, pool.map(voice, segments)):
+            start = int(round(segment["start"] * TTS_SAMPLE_RATE))
+            end = min(int(round(segment["end"] * TTS_SAMPLE_RATE)), total_frames)
+            if speech.shape[0] > end - start:
+                speech = time_stretch(speech, end - start)
+            track[start:start + speech.shape[0]] += speech
+
+    np.rint(track, out=track)
+    np.clip(track, -32768, 32767, out=track)
+    return PcmAudio(track.astype(np.int16), TTS_SAMPLE_RATE)
@@ -0,0 +1,303 @@
+# upload_ingest.py
+import io
+import os
+import json
+import struct
+import hashlib
+import logging
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Optional
+
+from backend.utils.audio_io import AudioDecodeError, parse_wav_layout
+
+logger = logging.getLogger(__name__)
+
+# Read size per step; also the Azure block size for staged uploads.
+INGEST_CHUNK_BYTES = int(os.getenv("INGEST_CHUNK_BYTES", str(4 * 1024 * 1024)))
+# Local copies of uploads go to disk (not tmpfs): an episode can be several GB.
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR") or None
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+FFPROBE_TIMEOUT_SECONDS = int(os.getenv("FFPROBE_TIMEOUT_SECONDS", "60"))
+
+# Enough of the file to sniff the container and parse a WAV header.
+_HEAD_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "mp3": "audio/mpeg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "aiff": "audio/aiff",
+    "m4a": "audio/mp4",
+    "mp4": "video/mp4",
+    "mov": "video/quicktime",
+    "webm": "video/webm",
+}
+VIDEO_FORMATS = {"mp4", "mov", "webm"}
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Container format from the first bytes of a file, or None if unrecognised."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"M4A ", b"M4B "):
+            return "m4a"
+        return "mov" if brand == b"qt  " else "mp4"
+    if head[:3] == b"ID3":
+        return "mp3"
+    if len(head) >= 2 and head[0] == 0xFF:
+        if head[1] & 0xF6 == 0xF0:
+            return "aac"
+        if head[1] & 0xE0 == 0xE0:
+            return "mp3"
+    return None
+
+
+def _wav_duration(head: bytes, total_size: int) -> Optional[float]:
+    """Duration from the WAV header; streamed WAVs with placeholder sizes run to end of file."""
+    try:
+        layout = parse_wav_layout(head)
+    except AudioDecodeError:
+        return None
+    byte_rate = layout["sample_rate"] * layout["channels"] * layout["bits"] // 8
+    if not byte_rate:
+        return None
+    declared = struct.unpack_from("<I", head, layout["data_offset"] - 4)[0]
+    available = total_size - layout["data_offset"]
+    data_size = declared if 0 < declared <= available else available
+    return data_size / byte_rate
+
+
+def probe_file(path: str) -> dict:
+    """Format name and duration of a file on disk via ffprobe (reads the index, not the media)."""
+    cmd = [FFPROBE_BIN, "-v", "error", "-show_entries", "format=format_name,duration", "-of", "json", path]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=FFPROBE_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"ffprobe failed for {path}: {e}")
+        return {}
+    if proc.returncode != 0:
+        logger.warning(f"ffprobe failed for {path}: {proc.stderr.decode(errors='replace').strip()[-300:]}")
+        return {}
+    fmt = json.loads(proc.stdout or b"{}").get("format", {})
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, TypeError, ValueError):
+        duration = None
+    return {"format_name": fmt.get("format_name"), "duration": duration}
+
+
+def _check_duration(duration: Optional[float], max_duration_seconds: float) -> float:
+    if duration is None:
+        raise ValueError("Invalid audio file format.")
+    logger.info(f"Audio duration: {round(duration, 2)} seconds")
+    if duration > max_duration_seconds:
+        raise ValueError(
+            f"Audio too long ({round(duration / 60, 2)} minutes). Max allowed is {max_duration_seconds / 60} minutes."
+        )
+    return duration
+
+
+class IngestedUpload:
+    """
+    What an ingest pass learned about an upload: where it was stored, its
+    size, SHA-256 and probed format/duration. With keep_local the upload is
+    also on disk at `path` until close().
+    """
+
+    def __init__(self, filename: str, size: int, sha256: str, fmt: Optional[str], duration: Optional[float],
+                 file_id: str = None, url: str = None, path: str = None):
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.format = fmt
+        self.duration = duration
+        self.file_id = file_id
+        self.url = url
+        self.path = path
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES.get(self.format, "application/octet-stream")
+
+    @property
+    def is_video(self) -> bool:
+        return self.format in VIDEO_FORMATS
+
+    def check_duration(self, max_duration_seconds: float) -> float:
+        """Same contract as check_audio_duration: the duration, or ValueError if unreadable/too long."""
+        return _check_duration(self.duration, max_duration_seconds)
+
+    def read_bytes(self) -> bytes:
+        """The whole upload, for steps that still need it in memory."""
+        if not self.path:
+            raise RuntimeError("Upload was not kept locally; ingest with keep_local=True")
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self.filename,
+            "size": self.size,
+            "sha256": self.sha256,
+            "format": self.format,
+            "duration": self.duration,
+            "file_id": self.file_id,
+            "url": self.url,
+        }
+
+
+class _GridFSSink:
+    """Writes chunks straight into a GridFS file; metadata is completed on close."""
+
+    def __init__(self, filename: str, metadata: dict):
+        from backend.database.mongo_connection import get_fs
+        self.metadata = metadata
+        self.grid_in = get_fs().new_file(filename=filename, metadata=metadata)
+
+    def write(self, chunk: bytes):
+        self.grid_in.write(chunk)
+
+    def finish(self, info: dict, content_type: str):
+        self.grid_in.contentType = content_type
+        self.grid_in.metadata = {**self.metadata, **info}
+        self.grid_in.close()
+        return str(self.grid_in._id), None
+
+    def abort(self):
+        self.grid_in.abort()
+
+
+class _BlobSink:
+    """Blob upload through the gateway's staged upload: one block per chunk, committed once the stream ends."""
+
+    def __init__(self, container: str, blob_path: str, metadata: dict):
+        from backend.utils.blob_storage import blob_gateway
+        self.metadata = metadata
+        self.upload = blob_gateway.staged_upload(container, blob_path)
+
+    def write(self, chunk: bytes):
+        self.upload.write(chunk)
+
+    def finish(self, info: dict, content_type: str):
+        metadata = {k: str(v) for k, v in {**self.metadata, **info}.items() if v is not None}
+        return None, self.upload.commit(content_type, metadata)
+
+    def abort(self):
+        self.upload.abort()
+
+
+def ingest_upload(upload, filename: str = None, target: str = None, metadata: dict = None,
+                  container: str = None, blob_path: str = None, keep_local: bool = False,
+                  probe: bool = True, max_duration: float = None) -> IngestedUpload:
+    """
+    Stream an upload (werkzeug FileStorage, file-like object or bytes) in
+    INGEST_CHUNK_BYTES pieces into GridFS (target="gridfs"), Azure Blob
+    (target="blob") or nowhere (target=None), hashing it on the way.
+
+    The format is sniffed from the first chunk. WAV duration comes from the
+    header; other formats are spooled to disk and probed with ffprobe, which
+    reads the container index rather than decoding. keep_local keeps that
+    disk copy for the caller (close the result to remove it). With
+    max_duration, an unreadable or too long upload raises ValueError (as
+    check_duration) before anything is committed to the target. Memory use
+    is one chunk whatever the size of the upload.
+    """
+    filename = filename or getattr(upload, "filename", None) or "upload.bin"
+    if isinstance(upload, (bytes, bytearray, memoryview)):
+        upload = io.BytesIO(upload)
+    metadata = dict(metadata or {})
+    metadata.setdefault("upload_timestamp", datetime.utcnow())
+
+    if target == "gridfs":
+        sink = _GridFSSink(filename, metadata)
+    elif target == "blob":
+        sink = _BlobSink(container, blob_path, metadata)
+    elif target is None:
+        sink = None
+    else:
+        raise ValueError(f"Unknown ingest target: {target}")
+
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    fmt = None
+    spool, spool_path = None, None
+    try:
+        while True:
+            chunk = upload.read(INGEST_CHUNK_BYTES)
+            if not chunk:
+                break
+            if len(head) < _HEAD_BYTES:
+                head += chunk[:_HEAD_BYTES - len(head)]
+            if size == 0:
+                fmt = sniff_format(head)
+                if keep_local or (probe and fmt != "wav"):
+                    suffix = os.path.splitext(filename)[1] or (f".{fmt}" if fmt else ".bin")
+                    fd, spool_path = tempfile.mkstemp(suffix=suffix, prefix="ingest_", dir=INGEST_SPOOL_DIR)
+                    spool = os.fdopen(fd, "wb")
+            size += len(chunk)
+            digest.update(chunk)
+            if spool:
+                spool.write(chunk)
+            if sink:
+                sink.write(chunk)
+        if spool:
+            spool.close()
+
+        duration = None
+        if probe:
+            if fmt == "wav":
+                duration = _wav_duration(head, size)
+            elif spool_path and size:
+                duration = probe_file(spool_path).get("duration")
+
+        if max_duration is not None:
+            _check_duration(duration, max_duration)
+
+        file_id, url = None, None
+        if sink:
+            file_id, url = sink.finish(
+                {"sha256": digest.hexdigest(), "size": size, "format": fmt, "duration": duration},
+                CONTENT_TYPES.get(fmt, "application/octet-stream"),
+            )
+    except Exception:
+        if sink:
+            sink.abort()
+        if spool:
+            spool.close()
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise
+
+    if spool_path and not keep_local:
+        os.remove(spool_path)
+        spool_path = None
+
+    result = IngestedUpload(filename, size, digest.hexdigest(), fmt, duration, file_id=file_id, url=url, path=spool_path)
+    logger.info(f"Ingested {filename}: {size} bytes, format={fmt}, duration={duration}, target={target or 'local'}")
+    return result
@@ -0,0 +1,162 @@
+# waveform_peaks.py
+import os
+import json
+import struct
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+from backend.utils.audio_io import iter_audio_blocks
+
+logger = logging.getLogger(__name__)
+
+# Finest zoom level: audio samples per min/max pair (audiowaveform's default is 256).
+WAVEFORM_BASE_SAMPLES_PER_PIXEL = int(os.getenv("WAVEFORM_BASE_SAMPLES_PER_PIXEL", "256"))
+# Coarser levels halve the resolution until the whole file fits in this many pixels.
+WAVEFORM_MIN_PIXELS = int(os.getenv("WAVEFORM_MIN_PIXELS", "1000"))
+WAVEFORM_MAX_LEVELS = int(os.getenv("WAVEFORM_MAX_LEVELS", "12"))
+# 8-bit peaks (like `audiowaveform -b 8`) halve storage; 16 keeps full precision.
+WAVEFORM_BITS = int(os.getenv("WAVEFORM_BITS", "8"))
+
+_DAT_VERSION = 1
+_DAT_FLAG_8BIT = 0x1
+_DAT_HEADER = struct.Struct("<iIiiI")
+
+
+class PeakLevel:
+    """One zoom level: interleaved min/max pairs, one pair per samples_per_pixel input samples."""
+
+    def __init__(self, samples_per_pixel: int, mins: np.ndarray, maxs: np.ndarray):
+        self.samples_per_pixel = samples_per_pixel
+        self.mins = mins
+        self.maxs = maxs
+
+    def __len__(self):
+        return self.mins.shape[0]
+
+    def interleaved(self, bits: int) -> np.ndarray:
+        out = np.empty(len(self) * 2, dtype=np.int16)
+        out[0::2], out[1::2] = self.mins, self.maxs
+        return (out >> 8).astype(np.int8) if bits == 8 else out
+
+
+class WaveformPeaks:
+    def __init__(self, sample_rate: int, frames: int, levels: List[PeakLevel], bits: int = WAVEFORM_BITS):
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.levels = levels
+        self.bits = bits
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def level_for(self, samples_per_pixel: int = None, pixels: int = None) -> PeakLevel:
+        """The coarsest level at least as detailed as requested (by zoom or by target width in pixels)."""
+        if pixels:
+            candidates = [lvl for lvl in self.levels if len(lvl) >= pixels]
+            return candidates[-1] if candidates else self.levels[0]
+        if samples_per_pixel:
+            candidates = [lvl for lvl in self.levels if lvl.samples_per_pixel <= samples_per_pixel]
+            return candidates[-1] if candidates else self.levels[0]
+        return self.levels[0]
+
+    def to_dat(self, level: PeakLevel) -> bytes:
+        """audiowaveform binary format, version 1."""
+        header = _DAT_HEADER.pack(_DAT_VERSION, _DAT_FLAG_8BIT if self.bits == 8 else 0,
+                                  self.sample_rate, level.samples_per_pixel, len(level))
+        return header + level.interleaved(self.bits).astype("<i2" if self.bits == 16 else "i1").tobytes()
+
+    def to_json(self, level: PeakLevel) -> dict:
+        """audiowaveform JSON format, version 2 (single channel)."""
+        return {
+            "version": 2,
+            "channels": 1,
+            "sample_rate": self.sample_rate,
+            "samples_per_pixel": level.samples_per_pixel,
+            "bits": self.bits,
+            "length": len(level),
+            "data": level.interleaved(self.bits).tolist(),
+        }
+
+    def serialize(self) -> bytes:
+        """All levels as consecutive .dat records, preceded by a small JSON index."""
+        records = [self.to_dat(level) for level in self.levels]
+        index = json.dumps({
+            "sample_rate": self.sample_rate,
+            "frames": self.frames,
+            "bits": self.bits,
+            "levels": [level.samples_per_pixel for level in self.levels],
+            "sizes": [len(r) for r in records],
+        }).encode("utf-8")
+        return struct.pack("<I", len(index)) + index + b"".join(records)
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "WaveformPeaks":
+        index_len = struct.unpack_from("<I", data)[0]
+        index = json.loads(data[4:4 + index_len])
+        offset = 4 + index_len
+        levels = []
+        for size in index["sizes"]:
+            _, flags, _, samples_per_pixel, length = _DAT_HEADER.unpack_from(data, offset)
+            body = offset + _DAT_HEADER.size
+            dtype = "i1" if flags & _DAT_FLAG_8BIT else "<i2"
+            values = np.frombuffer(data, dtype=dtype, count=length * 2, offset=body).astype(np.int16)
+            if flags & _DAT_FLAG_8BIT:
+                values = values << 8
+            levels.append(PeakLevel(samples_per_pixel, values[0::2], values[1::2]))
+            offset += size
+        return cls(index["sample_rate"], index["frames"], levels, index["bits"])
+
+
+def _reduce_level(level: PeakLevel) -> PeakLevel:
+    """Next zoom level out: merge neighbouring pairs (an odd last pair stands alone)."""
+    mins, maxs = level.mins, level.maxs
+    if len(mins) % 2:
+        mins, maxs = np.append(mins, mins[-1]), np.append(maxs, maxs[-1])
+    return PeakLevel(level.samples_per_pixel * 2, mins.reshape(-1, 2).min(axis=1), maxs.reshape(-1, 2).max(axis=1))
+
+
+def compute_peaks(data: bytes = None, base_samples_per_pixel: int = None, bits: int = None,
+                  suffix: str = ".bin", input_path: str = None) -> Optional[WaveformPeaks]:
+    """
+    Min/max peaks of an audio file in one streaming pass. Decoded blocks are
+    bucketed straight into the finest level (channels combined, leftover
+    samples carried to the next block), so memory stays at one block plus the
+    peaks; every coarser level is derived from the one below it, never from the
+    audio. Reads input_path instead of data when given. Returns None for
+    audio with no samples.
+    """
+    spp = base_samples_per_pixel or WAVEFORM_BASE_SAMPLES_PER_PIXEL
+    blocks = iter_audio_blocks(data, block_frames=spp * 1024, suffix=suffix, input_path=input_path)
+    sample_rate, channels = next(blocks)
+    # Frames are interleaved, so one bucket is spp * channels consecutive values: channels are
+    # combined by the same min/max reduction, with no per-frame pass.
+    bucket = spp * channels
+
+    mins, maxs = [], []
+    carry = np.empty(0, dtype=np.int16)
+    frames = 0
+    for block in blocks:
+        frames += block.shape[0]
+        flat = np.ascontiguousarray(block).reshape(-1)
+        if carry.size:
+            flat = np.concatenate((carry, flat))
+        whole = flat.shape[0] // bucket * bucket
+        if whole:
+            buckets = flat[:whole].reshape(-1, bucket)
+            mins.append(buckets.min(axis=1))
+            maxs.append(buckets.max(axis=1))
+        carry = flat[whole:]
+    if carry.size:
+        mins.append(carry.min(keepdims=True))
+        maxs.append(carry.max(keepdims=True))
+
+    if not frames:
+        return None
+
+    levels = [PeakLevel(spp, np.concatenate(mins), np.concatenate(maxs))]
+    while len(levels) < WAVEFORM_MAX_LEVELS and len(levels[-1]) > WAVEFORM_MIN_PIXELS:
+        levels.append(_reduce_level(levels[-1]))
+    return WaveformPeaks(sample_rate, frames, levels, bits or WAVEFORM_BITS)
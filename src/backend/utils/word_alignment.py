@@ -0,0 +1,143 @@
+# word_alignment.py
+import re
+import difflib
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How far past the expected position a sentence start may be searched for.
+ANCHOR_SLACK_WORDS = 40
+# Number of leading sentence tokens used to anchor a sentence.
+ANCHOR_PROBE_TOKENS = 3
+# How many transcript words may be skipped between two matched sentence tokens.
+EXTEND_LOOKAHEAD = 3
+
+FALLBACK_TIMESTAMPS = {"start": 0.0, "end": 0.5}
+
+_STRIP_RE = re.compile(r"^[\W_]+|[\W_]+$", re.UNICODE)
+
+
+def _normalize(token: str) -> str:
+    return _STRIP_RE.sub("", token.strip().lower())
+
+
+def _anchor(tokens: List[str], words: List[str], lo: int, hi: int):
+    """Best start index in words[lo:hi] for the first few sentence tokens."""
+    probe = tokens[:ANCHOR_PROBE_TOKENS]
+    best_index, best_hits = None, 0
+    for i in range(lo, hi):
+        if words[i] != probe[0] and best_hits > 0:
+            continue
+        hits = sum(1 for k, token in enumerate(probe) if i + k < len(words) and words[i + k] == token)
+        if hits > best_hits:
+            best_index, best_hits = i, hits
+            if hits == len(probe):
+                break
+    return best_index
+
+
+def _extend(tokens: List[str], words: List[str], start: int):
+    """Walk sentence tokens forward from start; return (first, last, matched) word indices."""
+    first = last = None
+    matched = 0
+    j = start
+    for token in tokens:
+        for k in range(j, min(j + EXTEND_LOOKAHEAD + 1, len(words))):
+            if words[k] == token:
+                if first is None:
+                    first = k
+                last = k
+                matched += 1
+                j = k + 1
+                break
+    return first, last, matched
+
+
+def _fuzzy_window(tokens: List[str], words: List[str], lo: int, hi: int, threshold: float):
+    """
+    Fallback: the old SequenceMatcher window search, but limited to words[lo:hi]
+    instead of the whole episode.
+    """
+    sentence_str = " ".join(tokens)
+    best_score, best = 0.0, None
+    for i in range(lo, hi):
+        for j in range(i + 1, min(i + len(tokens) + 5, hi + 1)):
+            score = difflib.SequenceMatcher(None, sentence_str, " ".join(words[i:j])).ratio()
+            if score > best_score and score >= threshold:
+                best_score, best = score, (i, j - 1)
+    return best
+
+
+def align_sentence_spans(sentences: List[str], word_timings: List[dict], threshold: float = 0.7) -> List[Optional[Tuple[int, int]]]:
+    """
+    Map every sentence onto the word timings in one monotonic forward pass.
+
+    Each sentence is anchored on its first tokens near the current cursor and then
+    extended token by token; the cursor only moves forward, so the whole transcript
+    costs O(words + tokens) comparisons instead of O(words x sentence_len x sentences).
+    Sentences that do not align well enough fall back to a fuzzy match inside a
+    bounded window.
+
+    Returns, per sentence, the (first, last) indices into word_timings, or None
+    if the sentence could not be placed.
+    """
+    # Keep indices into word_timings; drop spacing/punctuation-only entries.
+    positions, words = [], []
+    for idx, w in enumerate(word_timings):
+        normalized = _normalize(w.get("word", ""))
+        if normalized:
+            positions.append(idx)
+            words.append(normalized)
+
+    spans = []
+    cursor = 0
+    unaligned_backlog = 0  # words belonging to sentences we could not place yet
+
+    for sentence in sentences:
+        tokens = [t for t in (_normalize(t) for t in sentence.split()) if t]
+        if not tokens or cursor >= len(words):
+            spans.append(None)
+            continue
+
+        hi = min(len(words), cursor + unaligned_backlog + len(tokens) + ANCHOR_SLACK_WORDS)
+        span = None
+
+        start = _anchor(tokens, words, cursor, hi)
+        if start is not None:
+            first, last, matched = _extend(tokens, words, start)
+            if first is not None and matched / len(tokens) >= threshold:
+                span = (first, last)
+
+        if span is None:
+            fuzzy_hi = min(len(words), hi + len(tokens))
+            span = _fuzzy_window(tokens, words, cursor, fuzzy_hi, threshold)
+
+        if span is None:
+            unaligned_backlog += len(tokens)
+            spans.append(None)
+            continue
+
+        first, last = span
+        spans.append((positions[first], positions[last]))
+        cursor = last + 1
+        unaligned_backlog = 0
+
+    missed = spans.count(None)
+    if missed:
+        logger.info(f"Word alignment: {missed}/{len(sentences)} sentences could not be placed")
+    return spans
+
+
+def align_sentences(sentences: List[str], word_timings: List[dict], threshold: float = 0.7) -> List[dict]:
+    """
+    Same alignment as align_sentence_spans, returned as one {"start", "end"} dict
+    per sentence like get_sentence_timestamps_fuzzy (0.0-0.5 when not found).
+    """
+    results = []
+    for span in align_sentence_spans(sentences, word_timings, threshold):
+        if span is None:
+            results.append(dict(FALLBACK_TIMESTAMPS))
+        else:
+            results.append({"start": word_timings[span[0]]["start"], "end": word_timings[span[1]]["end"]})
+    return results